@@ -3,6 +3,7 @@
 import pygame
 
 from Cockpit import Cockpit
+from MK2.Platform import configure_sdl
 
 
 # ---> CONSTANTS
@@ -16,6 +17,9 @@ SCREEN_HEIGHT = 400
 
 # ---> Functions
 def pygame_init():
+    # select the SDL video driver of the platform ( dummy in headless mode )
+    configure_sdl()
+
     # activate the pygame library
     # initiate pygame and give permission
     # to use pygame's functionality.
@@ -10,9 +10,9 @@ import cv2  # If not working, add the path manually to the interpreter
 # from djitellopy import tello
 from submodules.DJITelloPy.djitellopy import tello
 from time import sleep
-from win32api import GetSystemMetrics
 
 from submodules.PyUtils.Logging.ZAGLogger import ZAGLogger
+from MK2.Platform import get_screen_size, get_captures_dir, is_headless
 
 
 ####################################################################################################################
@@ -161,8 +161,9 @@ class TelloMK1(tello.Tello):
         if img is None:
             return img
 
-        width = int(GetSystemMetrics(0) / 2)
-        height = int(GetSystemMetrics(1) / 2)
+        screen_width, screen_height = get_screen_size()
+        width = int(screen_width / 2)
+        height = int(screen_height / 2)
 
         if resize_x > 0:
             width = resize_x
@@ -172,8 +173,10 @@ class TelloMK1(tello.Tello):
 
         resized_img = cv2.resize(img, (width, height))
 
-        cv2.imshow("Tello Frame", resized_img)
-        cv2.waitKey(1)
+        # No window in headless mode
+        if not is_headless():
+            cv2.imshow("Tello Frame", resized_img)
+            cv2.waitKey(1)
 
         return img
 
@@ -186,13 +189,12 @@ class TelloMK1(tello.Tello):
             self._logx.print_log(logging.ERROR, "Unable to save Img. No frame captured")
             return
 
-        img_name = f'\\{time.time()}.jpg'
-        out_path = os.path.join(os.path.join(os.environ['USERPROFILE']), 'Desktop')
-        out_path = out_path + '\\TelloCaptures'
+        img_name = f'{time.time()}.jpg'
+        out_path = get_captures_dir()
         if not os.path.isdir(out_path):
             os.makedirs(out_path)
 
-        out_path = out_path + img_name
+        out_path = os.path.join(out_path, img_name)
 
         cv2.imwrite(out_path, img)
         time.sleep(0.3)
@@ -0,0 +1,103 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import queue
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable
+
+
+####################################################################################################################
+# CORE
+class DeferredQueueHandler(QueueHandler):
+    """
+        QueueHandler which enqueues the record as it is.
+        The base class merges msg and args on the calling thread, here it is left to the listener,
+        so the arguments must not be modified after the call ( numbers and strings are fine )
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SinkHandler(logging.Handler):
+    """
+        Passes the records to a sink with the signature of ZAGLogger.print_log( level, msg )
+    """
+
+    def __init__(self, sink: Callable[..., None], with_created: bool = False):
+        super().__init__()
+        self._sink = sink
+        self._with_created = with_created
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if self._with_created:
+                self._sink(record.levelno, record.getMessage(), record.created)
+            else:
+                self._sink(record.levelno, record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+class AsyncLog:
+    """
+        Asynchronous logging backend of TelloMK2.
+
+        log() checks the level before doing anything, then puts a record with the unformatted
+        message and its %-style arguments in a queue. A QueueListener thread formats the message
+        and passes it to the sinks ( console and file of ZAGLogger, buffer of the GUI ),
+        so formatting and disk I/O never run on the control thread.
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self, name: str, level: int = logging.DEBUG):
+        self._name = name
+        self._level = level
+
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = DeferredQueueHandler(self._queue)
+        self._handlers = []
+        self._listener = None
+
+    # ---> FUNCTIONS
+    def add_sink(self, sink: Callable[..., None], with_created: bool = False):
+        """
+            Adds a sink called on the listener thread with ( level, msg ),
+            or with ( level, msg, created ) if with_created, where created is the time.time() of the call.
+            Sinks must be added before start()
+        """
+        self._handlers.append(SinkHandler(sink, with_created))
+
+    def start(self):
+        if self._listener is not None:
+            return
+
+        self._listener = QueueListener(self._queue, *self._handlers)
+        self._listener.start()
+
+    def stop(self):
+        """
+            Stops the listener after all the queued records have been passed to the sinks
+        """
+        if self._listener is None:
+            return
+
+        self._listener.stop()
+        self._listener = None
+
+    def set_level(self, level: int):
+        self._level = level
+
+    def get_level(self) -> int:
+        return self._level
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= self._level
+
+    def log(self, level: int, msg: str, *args):
+        if level < self._level:
+            return
+
+        record = logging.LogRecord(self._name, level, "", 0, msg, args, None)
+        self._queue_handler.handle(record)
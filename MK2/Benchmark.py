@@ -0,0 +1,640 @@
+####################################################################################################################
+# IMPORTS
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+
+import pygame
+import tkinter as tk
+
+from djitellopy import tello
+from TelloMK2 import TelloMK2
+from Cockpit import Cockpit
+from CaptureWriter import CaptureWriter
+from DisplayStage import DisplayStage
+from FlightRecorder import FlightRecorder, FlightReader
+from LogBuffer import LogBuffer
+from LogView import LogView
+from TelloSimulator import TelloSimulator
+from TelloFleet import TelloFleet
+from Mission import Mission
+from ControlShaper import ControlShaper
+from InputBackend import InputBackend, InputSampler
+import Platform
+
+
+####################################################################################################################
+# MOCKS
+class MockFrameRead:
+    """
+        Replaces djitellopy BackgroundFrameRead: a new test frame is available every 1 / fps seconds
+    """
+
+    def __init__(self, fps: float, size: tuple[int, int] = TelloSimulator.VIDEO_SIZE):
+        self._period = 1.0 / fps
+        self._frames = [np.full((size[1], size[0], 3), indx * 40, dtype=np.uint8) for indx in range(4)]
+        self._start = time.monotonic()
+
+    @property
+    def frame(self):
+        indx = int((time.monotonic() - self._start) / self._period)
+        return self._frames[indx % len(self._frames)]
+
+    def stop(self):
+        pass
+
+
+class MockTello(TelloMK2):
+    """
+        TelloMK2 without network: commands are acknowledged immediately and a state packet
+        is pushed on connection, so only the code of the project is measured
+    """
+
+    MOCK_STATE = {"bat": 100, "yaw": 0, "vgx": 0, "vgy": 0, "vgz": 0, "tof": 10, "baro": 0.0}
+
+    def __init__(self, fps: float = 30):
+        super().__init__()
+        self._mock_fps = fps
+
+    def send_command_with_return(self, command: str, timeout: float = tello.Tello.RESPONSE_TIMEOUT) -> str:
+        if command == "command":
+            tello.drones[self.address[0]]["state"] = dict(self.MOCK_STATE)
+        return "ok"
+
+    def send_control_command(self, command: str, timeout: int = tello.Tello.RESPONSE_TIMEOUT) -> bool:
+        return True
+
+    def send_command_without_return(self, command: str):
+        pass
+
+    def get_frame_read(self, with_queue=False, max_queue_len=32):
+        if self.background_frame_read is None:
+            self.background_frame_read = MockFrameRead(self._mock_fps)
+        return self.background_frame_read
+
+
+class MockLogText:
+    """
+        Replaces the Tk text widget of LogView when no display is available
+    """
+
+    def tag_configure(self, tag, **options):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, *args):
+        pass
+
+    def delete(self, first, last=None):
+        pass
+
+    def see(self, index):
+        pass
+
+
+class MockInputBackend(InputBackend):
+    """
+        Input that moves the first axis to full stroke and back every period seconds, as a keypress
+    """
+
+    def __init__(self, period: float):
+        super().__init__("mock")
+        self._period = period
+        self._start = time.perf_counter()
+
+    def read(self) -> np.ndarray:
+        pressed = int((time.perf_counter() - self._start) / self._period) % 2
+        return np.array([pressed, 0, 0, 0], dtype=float)
+
+    def get_change_time(self) -> float:
+        """
+            Returns the time of the last change of the input
+        """
+        elapsed = time.perf_counter() - self._start
+        return self._start + (elapsed // self._period) * self._period
+
+
+####################################################################################################################
+# CORE
+def summarize(samples: list[float]) -> dict:
+    """
+        Returns count, mean and percentiles in milliseconds of a list of durations in seconds
+    """
+    if not samples:
+        return {"count": 0}
+
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+    }
+
+
+def create_tello(target: str,
+                 sim_host: str,
+                 sim_port: int,
+                 record_dir: str,
+                 video_backend: str) -> tuple[TelloMK2, TelloSimulator | None]:
+    simulator = None
+    if target == "sim":
+        simulator = TelloSimulator(host=sim_host, command_port=sim_port, state_rate_hz=20, video="h264")
+        simulator.start()
+        drone = TelloMK2(host=sim_host, command_port=sim_port)
+    else:
+        drone = MockTello()
+
+    drone.set_flight_recorder(FlightRecorder(out_dir=record_dir))
+    if target == "sim":
+        drone.set_video_backend(video_backend)
+    drone.initialize()
+    return drone, simulator
+
+
+def bench_exe_command(cockpit: Cockpit, drone: TelloMK2, ticks: int) -> dict:
+    # Flying without pressed keys: every tick reads the keyboard and sends a setpoint
+    drone.is_flying = True
+    samples = []
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick_start = time.perf_counter()
+        pygame.event.pump()
+        cockpit.update_pressed(pygame.key.get_pressed())
+        cockpit.exe_command()
+        samples.append(time.perf_counter() - tick_start)
+    elapsed = time.perf_counter() - start
+
+    result = summarize(samples)
+    result["ticks_per_s"] = ticks / elapsed
+    return result
+
+
+def bench_rc_latency(drone: TelloMK2, samples_count: int) -> dict:
+    # The command is considered on the wire when djitellopy sends it on the socket
+    wire_event = threading.Event()
+    expected = {"command": None, "time": 0.0}
+    original_send = drone.send_command_without_return
+
+    def traced_send(command: str):
+        original_send(command)
+        if command == expected["command"]:
+            expected["time"] = time.perf_counter()
+            wire_event.set()
+
+    drone.send_command_without_return = traced_send
+
+    samples = []
+    try:
+        for indx in range(samples_count):
+            velocity = indx % 100 + 1
+            wire_event.clear()
+            expected["command"] = f'rc {velocity} 0 0 0'
+
+            start = time.perf_counter()
+            drone.send_rc_controlx(velocity, 0, 0, 0, 0)
+            if wire_event.wait(1.0):
+                samples.append(expected["time"] - start)
+    finally:
+        drone.send_command_without_return = original_send
+        drone.send_rc_controlx(0, 0, 0, 0, 0)
+
+    result = summarize(samples)
+    result["lost"] = samples_count - len(samples)
+    return result
+
+
+def wait_new_frame(drone: TelloMK2, last_seq: int, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        frame_view = drone.get_frame()
+        if frame_view is not None and frame_view.seq > last_seq:
+            return frame_view
+        time.sleep(0.001)
+    return None
+
+
+def bench_show_img(drone: TelloMK2, frames: int) -> dict:
+    # Latency from the capture of the frame to the end of show_img, every frame is shown
+    drone.set_display_options(fps=0)
+    samples = []
+    last_seq = 0
+    try:
+        for _ in range(frames):
+            frame_view = wait_new_frame(drone, last_seq)
+            if frame_view is None:
+                break
+            last_seq = frame_view.seq
+
+            drone.show_img(0, 0)
+            samples.append(time.monotonic() - frame_view.timestamp)
+    except Exception as ex:
+        return {"count": 0, "skipped": f'{type(ex).__name__}: {ex}'}
+
+    return summarize(samples)
+
+
+def bench_display_resize(frames: int, size: tuple[int, int] = TelloSimulator.VIDEO_SIZE) -> dict:
+    # Resize of show_img without window: allocating cv2.resize versus the display buffer, per interpolation
+    img = np.random.randint(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    screen_size = (1920, 1080)
+    target = (screen_size[0] // 2, screen_size[1] // 2)
+
+    results = {}
+    interpolations = {"nearest": cv2.INTER_NEAREST, "linear": cv2.INTER_LINEAR, "area": cv2.INTER_AREA}
+    for name, interpolation in interpolations.items():
+        samples = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            cv2.resize(img, target, interpolation=interpolation)
+            samples.append(time.perf_counter() - start)
+        results["alloc_" + name] = summarize(samples)
+
+        display = DisplayStage(screen_size, interpolation=interpolation)
+        samples = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            display.resize(img)
+            samples.append(time.perf_counter() - start)
+        results["cached_" + name] = summarize(samples)
+
+    return results
+
+
+def bench_save_img(drone: TelloMK2, frames: int) -> dict:
+    # Time the caller is blocked by save_img, the writing is done in background
+    with tempfile.TemporaryDirectory() as out_dir:
+        drone.set_capture_writer(CaptureWriter(out_dir=out_dir, log_fn=drone.print_log))
+
+        samples = []
+        last_seq = 0
+        for _ in range(frames):
+            frame_view = wait_new_frame(drone, last_seq)
+            if frame_view is None:
+                break
+            last_seq = frame_view.seq
+
+            start = time.perf_counter()
+            drone.save_img(frame_view)
+            samples.append(time.perf_counter() - start)
+
+        drone.set_capture_writer(CaptureWriter(log_fn=drone.print_log))
+
+    return summarize(samples)
+
+
+def bench_replay(cockpit: Cockpit, drone: TelloMK2, runs: int) -> dict:
+    # Synthetic recorded path flown by Cockpit.follow_path, then flown back by Cockpit.return_home
+    path = cockpit.get_recorded_path()
+    path.clear()
+    timestamp = time.monotonic()
+    for _ in range(runs):
+        setpoint = [random.choice((-100, 0, 100)) for _ in range(4)]
+        for _ in range(random.randint(1, 10)):
+            path.append(*setpoint, timestamp)
+            timestamp += 0.02
+
+    # Return home flies back only the moves of the follow path, not the ticks of the other benchmarks
+    cockpit.get_movement_list().clear()
+    drone.is_flying = True
+
+    cockpit.follow_path()
+    follow_path = cockpit.wait_replay()
+    cockpit.return_home()
+    return_home = cockpit.wait_replay()
+
+    return {
+        "follow_path": follow_path,
+        "return_home": return_home,
+    }
+
+
+def bench_mission_plan(cockpit: Cockpit, drone: TelloMK2, compiles: int) -> dict:
+    """
+        Compile time of the mission of Cockpit.MISSION_FILE, and timing of a short mission
+        flown by Cockpit.run_mission: a zig-zag of about 4 seconds at 50 Hz
+    """
+    mission = Mission.load(Cockpit.MISSION_FILE)
+    samples = []
+    for _ in range(compiles):
+        start = time.perf_counter()
+        plan = mission.compile()
+        samples.append(time.perf_counter() - start)
+
+    result = summarize(samples)
+    result["setpoints"] = len(plan)
+    result["duration_s"] = plan.get_duration()
+
+    zigzag = {"name": "zigzag", "rate_hz": 50, "max_speed": 60, "max_accel": 200, "smoothing": 0.1,
+              "waypoints": [{"x": 30, "y": 30}, {"x": -30, "y": 60}, {"x": 0, "y": 0}]}
+    drone.is_flying = True
+    with tempfile.TemporaryDirectory() as mission_dir:
+        mission_path = f'{mission_dir}/zigzag.json'
+        with open(mission_path, "w") as file:
+            json.dump({"mission": zigzag}, file)
+
+        cockpit.run_mission(mission_path)
+        play = cockpit.wait_replay()
+
+    return {
+        "compile": result,
+        "play": play,
+    }
+
+
+def bench_control_shaper(updates: int, rate_hz: float = 100) -> dict:
+    """
+        Cost of a shaper update, and response to a keypress of 1 second on every axis simulated at rate_hz:
+        time to reach 90% of the speed after the press and 10% after the release, largest change of a setpoint
+    """
+    shaper = ControlShaper()
+    samples = []
+    for indx in range(updates):
+        target = [ControlShaper.DEFAULTS["max_speed"] if (indx // 50) % 2 else 0] * ControlShaper.AXES
+        start = time.perf_counter()
+        shaper.update(target)
+        samples.append(time.perf_counter() - start)
+
+    shaper = ControlShaper()
+    period = 1.0 / rate_hz
+    speed = ControlShaper.DEFAULTS["max_speed"]
+    outputs = np.array([shaper.update([speed if tick < rate_hz else 0] * ControlShaper.AXES, tick * period)[0]
+                        for tick in range(int(2 * rate_hz))])
+
+    press, release = outputs[:int(rate_hz)], outputs[int(rate_hz):]
+    return {
+        "update": summarize(samples),
+        "rise_90_s": float(np.argmax(press >= 0.9 * speed) * period),
+        "fall_10_s": float(np.argmax(release <= 0.1 * speed) * period),
+        "overshoot": int(outputs.max() - speed),
+        "max_step": int(np.abs(np.diff(outputs)).max()),
+    }
+
+
+def bench_input_latency(changes: int, loop_hz: float = 100, change_period: float = 0.037) -> dict:
+    """
+        Latency from a change of the input to the setpoint of a control loop running at loop_hz.
+        As in PygameController the input is sampled at Cockpit.INPUT_RATE_HZ, after pumping the events,
+        and the setpoint is computed when the control deadline passes.
+        pump_wait is the time from the change to the sample that sees it, the latency of the
+        sampler starts from that sample
+    """
+    backend = MockInputBackend(change_period)
+    sampler = InputSampler([backend])
+    control_shaper = ControlShaper()
+
+    sample_samples, pump_waits = [], []
+    input_period = 1.0 / Cockpit.INPUT_RATE_HZ
+    control_period = 1.0 / loop_hz
+    next_sample = next_control = time.perf_counter()
+    deadline = next_sample + changes * change_period
+    while next_sample < deadline:
+        start = time.perf_counter()
+        previous = sampler.get_state()
+        state = sampler.sample()
+        sample_samples.append(time.perf_counter() - start)
+        if state.change_time != previous.change_time:
+            pump_waits.append(state.change_time - backend.get_change_time())
+
+        if start >= next_control:
+            next_control = max(next_control + control_period, start)
+            control_shaper.update([axis * Cockpit.MOVE_SPEED for axis in state.axes])
+            sampler.record_command(state)
+
+        next_sample = max(next_sample + input_period, start)
+        time.sleep(max(next_sample - time.perf_counter(), 0.0))
+
+    result = sampler.get_stats()
+    result["sample"] = summarize(sample_samples)
+    result["pump_wait"] = summarize(pump_waits)
+    return result
+
+
+def bench_log_refresh(sizes: list[int], refreshes: int, batch: int = 10) -> dict:
+    """
+        Cost of a refresh of the LogView of the GUI that finds batch new entries, with the log holding size entries.
+        The widget is a Tk text if a display is available, otherwise MockLogText ( only the LogView code is timed )
+    """
+    try:
+        root = tk.Tk()
+        root.withdraw()
+    except tk.TclError:
+        root = None
+
+    results = {"widget": "tk" if root is not None else "mock"}
+    for size in sizes:
+        log_buffer = LogBuffer(capacity=size)
+        for indx in range(size):
+            log_buffer.append(10 * (indx % 5 + 1), f'Entry {indx}')
+
+        text_widget = tk.Text(root) if root is not None else MockLogText()
+        log_view = LogView(text_widget)
+        log_view.refresh(log_buffer)
+
+        samples = []
+        for _ in range(refreshes):
+            for indx in range(batch):
+                log_buffer.append(20, f'New entry {indx}')
+
+            start = time.perf_counter()
+            log_view.refresh(log_buffer)
+            samples.append(time.perf_counter() - start)
+
+        results[str(size)] = summarize(samples)
+
+    if root is not None:
+        root.destroy()
+    return results
+
+
+def bench_flight_readback(path: str, repeats: int = 10) -> dict:
+    # Post-flight analysis: open the memory-mapped record and extract the movements
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with FlightReader(path) as reader:
+            reader.to_movement_log()
+        samples.append(time.perf_counter() - start)
+
+    return summarize(samples)
+
+
+def bench_mission(drone: TelloMK2) -> dict:
+    """
+        Mission setup and teardown on the simulator: every command waits for its ack and for the state
+        condition that completes it, so these are the dead times of a mission
+    """
+    start = time.perf_counter()
+    drone.start_streaming()
+    drone.takeoff()
+    takeoff_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    drone.land()
+    drone.stop_streaming()
+    teardown_time = time.perf_counter() - start
+
+    # The mission setup time of the drone also counts the benchmarks run after its initialization
+    return {
+        "streaming_takeoff_s": takeoff_time,
+        "teardown_s": teardown_time,
+        "commands": drone.get_command_stats(),
+    }
+
+
+def bench_fleet(size: int, sim_port: int, commands: int, record_dir: str) -> dict:
+    """
+        Fleet of simulators on 127.0.0.10, 127.0.0.11, ... driven by one TelloFleet:
+        latency of the broadcast commands, skew of the RC bursts and health of the drones
+    """
+    simulators = [TelloSimulator(host=f'127.0.0.{10 + indx}', command_port=sim_port, state_rate_hz=10)
+                  for indx in range(size)]
+    for simulator in simulators:
+        simulator.start()
+
+    fleet = TelloFleet()
+    for simulator in simulators:
+        drone = fleet.add_drone(*simulator.get_address())
+        drone.set_flight_recorder(FlightRecorder(out_dir=record_dir))
+
+    try:
+        connected = fleet.connect()
+        fleet.takeoff()
+
+        samples = []
+        for _ in range(commands):
+            start = time.perf_counter()
+            fleet.broadcast_command("battery?")
+            samples.append(time.perf_counter() - start)
+
+        # One second of setpoints changed at every tick, all the drones together
+        setpoints = np.zeros((size, 4), dtype=int)
+        for step in range(TelloFleet.RC_RATE_HZ):
+            setpoints[:, 0] = 20 if step % 2 else -20
+            fleet.set_rc_all(setpoints)
+            time.sleep(1.0 / TelloFleet.RC_RATE_HZ)
+
+        fleet.land()
+        results = {
+            "drones": size,
+            "connected": len(connected),
+            "broadcast": summarize(samples),
+            "rc": fleet.get_rc_stats(),
+            "commands": {name: fleet.get_command_stats(name) for name in fleet.get_names()},
+            "summary": fleet.get_summary(),
+        }
+    finally:
+        fleet.end()
+        for simulator in simulators:
+            simulator.stop()
+
+    return results
+
+
+def run(args) -> dict:
+    # In headless mode pygame uses the dummy driver and show_img resizes the frames without showing them
+    if args.headless:
+        Platform.set_headless(True)
+    Platform.configure_sdl()
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    record_dir = tempfile.TemporaryDirectory()
+    drone, simulator = create_tello(args.target, args.sim_host, args.sim_port, record_dir.name, args.video_backend)
+    cockpit = Cockpit(drone)
+
+    try:
+        results = {
+            "target": args.target,
+            "exe_command": bench_exe_command(cockpit, drone, args.ticks),
+        }
+
+        # Same ticks with the stage timings recorded, to measure the cost of the profiler
+        drone.set_perf_overlay(True)
+        results["exe_command_profiled"] = bench_exe_command(cockpit, drone, args.ticks)
+        results["stages"] = drone.get_profiler().get_stats()
+        drone.set_perf_overlay(False)
+
+        results.update({
+            "rc_command_to_wire": bench_rc_latency(drone, args.samples),
+            "rc_scheduler": drone.get_rc_stats(),
+        })
+
+        drone.start_streaming()
+        results["show_img"] = bench_show_img(drone, args.frames)
+        results["display_resize"] = bench_display_resize(args.frames)
+        results["save_img_stall"] = bench_save_img(drone, args.frames)
+        results["frames"] = drone.get_frame_stats()
+        drone.stop_streaming()
+
+        results["replay"] = bench_replay(cockpit, drone, args.replay_runs)
+        results["mission_plan"] = bench_mission_plan(cockpit, drone, args.replay_runs)
+        results["control_shaper"] = bench_control_shaper(args.ticks)
+        results["input"] = cockpit.get_input_stats()
+        results["input_latency"] = bench_input_latency(args.samples)
+        results["log_refresh"] = bench_log_refresh(args.log_sizes, args.refreshes)
+
+        # The mock target has no state changes to wait for
+        if args.target == "sim":
+            results["mission"] = bench_mission(drone)
+    finally:
+        drone.is_flying = False
+        drone.end()
+        if simulator is not None:
+            simulator.stop()
+        pygame.quit()
+
+    flight_recorder = drone.get_flight_recorder()
+    results["flight_recorder"] = flight_recorder.get_stats()
+    results["flight_readback"] = bench_flight_readback(flight_recorder.get_path())
+
+    if args.fleet > 0:
+        results["fleet"] = bench_fleet(args.fleet, args.sim_port, args.fleet_commands, record_dir.name)
+    record_dir.cleanup()
+
+    return results
+
+
+if __name__ == "__main__":
+    # Run from the MK2 directory, Cockpit loads ../res/kb_map.json
+    parser = argparse.ArgumentParser(description="PyTello control loop benchmark")
+    parser.add_argument("--target", choices=["mock", "sim"], default="mock")
+    parser.add_argument("--sim-host", default="127.0.0.2")
+    parser.add_argument("--sim-port", type=int, default=9889)
+    parser.add_argument("--video-backend",
+                        choices=[TelloMK2.VIDEO_BACKEND_DEFAULT, TelloMK2.VIDEO_BACKEND_LOW_LATENCY],
+                        default=TelloMK2.VIDEO_BACKEND_DEFAULT,
+                        help="video backend of the sim target, the mock target has no video stream")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--replay-runs", type=int, default=30)
+    parser.add_argument("--log-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--refreshes", type=int, default=200)
+    parser.add_argument("--fleet", type=int, default=0,
+                        help="drones of the fleet benchmark, simulated on 127.0.0.10 and following")
+    parser.add_argument("--fleet-commands", type=int, default=20)
+    parser.add_argument("--headless", action="store_true",
+                        help="no windows, automatic on Linux without a display server")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    cli_args = parser.parse_args()
+
+    report = run(cli_args)
+    if cli_args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(cli_args.output, "w") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,197 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import os
+import queue
+import threading
+import time
+import cv2  # If not working, add the path opencv2-python manually to the interpreter
+import numpy as np
+
+from pathlib import Path
+from typing import Callable
+
+from FramePipeline import FrameView
+from Platform import get_captures_dir
+
+
+####################################################################################################################
+# CORE
+class CaptureWriter:
+    """
+        Saves captured frames on disk without blocking the caller.
+
+        Frames are put in a bounded queue and encoded/written by a pool of worker threads.
+        When the queue is full the frame is dropped instead of waiting,
+        and a frame already submitted ( same sequence number ) is never saved twice.
+
+        Supported formats:
+            jpg = JPEG with configurable quality
+            png = PNG with configurable compression
+            npy = Raw NumPy array
+
+        Frames are RGB as in the FrameRing: npy files keep them RGB,
+        images are converted to BGR by the workers before cv2 encodes them.
+    """
+
+    # ---> CONSTANTS
+    FORMATS = ("jpg", "png", "npy")
+    DEFAULT_WORKERS = 2
+    DEFAULT_QUEUE_SIZE = 16
+    BATCH_SIZE = 8
+    DEDUP_HISTORY = 64
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 out_dir: str | Path | None = None,
+                 img_format: str = "jpg",
+                 jpeg_quality: int = 95,
+                 png_compression: int = 3,
+                 workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 log_fn: Callable[[int, str], None] | None = None):
+
+        if img_format not in self.FORMATS:
+            raise ValueError(f'Unsupported capture format: {img_format}')
+
+        # The default directory is resolved here and not at import time
+        self._out_dir = Path(out_dir) if out_dir is not None else get_captures_dir()
+        self._format = img_format
+        self._encode_params = []
+        if img_format == "jpg":
+            self._encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        elif img_format == "png":
+            self._encode_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+
+        self._log_fn = log_fn
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers_count = workers
+        self._workers = []
+
+        self._submitted_seqs = set()
+        self._submitted_order = []
+        self._lock = threading.Lock()
+
+        self._saved = 0
+        self._dropped = 0
+        self._duplicates = 0
+        self._errors = 0
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self._workers:
+            return
+
+        for indx in range(self._workers_count):
+            worker = threading.Thread(target=self._run, name=f'CaptureWriter-{indx}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        """
+            Waits for the queued frames to be written, then stops the workers
+        """
+        if not self._workers:
+            return
+
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+
+    def submit(self, frame_view: FrameView) -> bool:
+        """
+            Queues a frame to be saved. Never blocks.
+            Returns False if the frame has been dropped or was already submitted
+        """
+        with self._lock:
+            if frame_view.seq in self._submitted_seqs:
+                self._duplicates += 1
+                return False
+
+        # The ring slot will be overwritten by the producer, so the frame is copied once here
+        item = (frame_view.seq, frame_view.timestamp, np.array(frame_view.frame))
+
+        # A dropped frame is not remembered, so it can be submitted again
+        with self._lock:
+            if frame_view.seq in self._submitted_seqs:
+                self._duplicates += 1
+                return False
+
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._dropped += 1
+                return False
+
+            self._remember_seq(frame_view.seq)
+
+        return True
+
+    def get_out_dir(self) -> Path:
+        return self._out_dir
+
+    def get_stats(self) -> dict:
+        return {
+            "saved": self._saved,
+            "dropped": self._dropped,
+            "duplicates": self._duplicates,
+            "errors": self._errors,
+            "queued": self._queue.qsize(),
+        }
+
+    def _remember_seq(self, seq: int):
+        self._submitted_seqs.add(seq)
+        self._submitted_order.append(seq)
+        if len(self._submitted_order) > self.DEDUP_HISTORY:
+            self._submitted_seqs.discard(self._submitted_order.pop(0))
+
+    def _run(self):
+        self._out_dir.mkdir(parents=True, exist_ok=True)
+
+        running = True
+        while running:
+            # Wait for one frame, then drain what is already queued to write it in a single batch
+            # ( each worker takes a single stop marker, so the drain ends on the first one )
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in batch:
+                if item is None:
+                    running = False
+                    continue
+                self._write(*item)
+
+    def _write(self, seq: int, timestamp: float, frame: np.ndarray):
+        file_name = f'{time.time():.6f}_{seq}.{self._format}'
+        out_path = os.path.join(self._out_dir, file_name)
+
+        try:
+            if self._format == "npy":
+                np.save(out_path, frame)
+                written = True
+            else:
+                if frame.ndim == 3 and frame.shape[2] == 3:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                written = cv2.imwrite(out_path, frame, self._encode_params)
+        except Exception as ex:
+            written = False
+            self._log(logging.ERROR, f'Unable to save frame {seq}: {ex}')
+
+        with self._lock:
+            if written:
+                self._saved += 1
+            else:
+                self._errors += 1
+
+        if written:
+            self._log(logging.INFO, "Frame captured: " + out_path)
+
+    def _log(self, level: int, msg: str):
+        if self._log_fn is not None:
+            self._log_fn(level, msg)
@@ -1,10 +1,17 @@
 ####################################################################################################################
 # IMPORTS
-import pygame
 import json
+import logging
+import time
 
 from pygame.key import ScancodeWrapper
 from TelloMK2 import TelloMK2
+from KeyBindings import KeyBindings
+from ControlShaper import ControlShaper
+from InputBackend import KeyboardBackend, GamepadBackend, InputSampler
+from MovementLog import MovementLog
+from PathReplay import ReplayPlan, ReplayEngine, ReplayTask
+from Mission import Mission
 
 
 # IN CV2 Colors are not defined in RGB but in BGR
@@ -13,38 +20,67 @@ from TelloMK2 import TelloMK2
 # CORE
 class Cockpit:
     # ---> CONSTANTS
-    TELLO_SPEED = 0.05
+    MOVE_SPEED = 100
+    MOVEMENT_LOG_CAPACITY = MovementLog.DEFAULT_CAPACITY
+    EMERGENCY_STOP_LANDS = False
+    MISSION_FILE = "../res/mission.json"
+    INPUT_RATE_HZ = InputSampler.RATE_HZ
 
     # ---> CONSTRUCTOR
     def __init__(self, tello: TelloMK2):
         self._tello = tello
-        self._key_pressed = None
-        self._movement_list = []
+
+        # Movements sent since the last landing or return home, kept in memory to return home.
+        # The flight recorder keeps the whole flight on file, that is read only for offline replays
+        self._movement_list = MovementLog(self.MOVEMENT_LOG_CAPACITY)
+
+        # True while the emergency stop is the one started by the key
+        self._key_stop = False
 
         self._recording_path = False
-        self._recorded_path = []
+        self._recorded_path = MovementLog(self.MOVEMENT_LOG_CAPACITY)
+        self._replay_engine = ReplayEngine(self._send_replay_setpoint)
+        self._replay_task = None
+
+        # The video is shown in a cv2 window, unless another view ( e.g. the GUI ) shows it
+        self._video_window = True
 
         with open("../res/kb_map.json", "r") as file:
             json_content = json.load(file)
 
             # Get Keyboard mapping from json file
             self.kb_map = json_content["kb_map"]
+            control_config = json_content.get("control")
+            gamepad_config = json_content.get("gamepad")
             file.close()
 
+        # Keyboard mapping compiled once into a table of key codes
+        self._bindings = KeyBindings(self.kb_map)
+
+        # Movement axes sampled from the keyboard and the gamepad, if connected,
+        # and the shaping of the setpoints sent to the Tello
+        gamepad = GamepadBackend(gamepad_config)
+        if gamepad.is_connected():
+            tello.print_log(logging.INFO, "Gamepad connected: %s", gamepad.get_device_name())
+        self._input = InputSampler([KeyboardBackend(self._bindings), gamepad])
+        self._input_state = self._input.get_state()
+        self._control_shaper = ControlShaper.from_config(control_config)
+
+        # Stages of the control tick measured by the profiler of the Tello
+        self._profiler = tello.get_profiler()
+        self._stage_loop = self._profiler.add_stage(TelloMK2.LOOP_STAGE)
+        self._stage_input = self._profiler.add_stage("input")
+        self._stage_video = self._profiler.add_stage("video")
+        self._stage_movement = self._profiler.add_stage("movement")
+
     # ---> FUNCTIONS
     def update_pressed(self, key_pressed: ScancodeWrapper):
-        self._key_pressed = None
-        self._key_pressed = key_pressed
-
-    def if_key_pressed(self, key_name) -> bool:
-        # Check if input keyboard has been pressed
-        pressed = False
+        start = self._profiler.begin()
+        self._bindings.update(key_pressed)
 
-        my_key = getattr(pygame, 'K_{}'.format(key_name))
-        if self._key_pressed[my_key]:
-            pressed = True
-
-        return pressed
+        # The backends are sampled where pygame has just pumped the keyboard and the joystick
+        self._input.sample()
+        self._profiler.end(self._stage_input, start)
 
     def get_movements(self) -> list[int]:
         """
@@ -54,44 +90,20 @@ class Cockpit:
                 up_down = Right and Left Clockwise Movement
                 yaw_vel = Take-Off and Landing Movement
 
-            Variable name is determined by documentation of
+            Element names are determined by documentation of
             send_rc_control function of Tello library
-        """
-
-        right_left, forward_backward, up_down, yaw_vel = 0, 0, 0, 0
-        speed = 100
-
-        move = self.kb_map["move"]
-
-        # Right and Left YAW movement
-        if self.if_key_pressed(move["right_yaw"]):
-            right_left = speed
-        elif self.if_key_pressed(move["left_yaw"]):
-            right_left = -speed
 
-        # Forward and Backward movement
-        if self.if_key_pressed(move["forward"]):
-            forward_backward = speed
-        elif self.if_key_pressed(move["backward"]):
-            forward_backward = -speed
-
-        # Right and Left Clockwise Movement
-        if self.if_key_pressed(move["right_clock"]):
-            up_down = speed
-        elif self.if_key_pressed(move["left_clock"]):
-            up_down = -speed
-
-        # Take-Off and Landing Movement
-        if self.if_key_pressed(move["takeoff"]):
-            yaw_vel = speed
-        elif self.if_key_pressed(move["landing"]):
-            yaw_vel = -speed
+            The input is the state sampled by update_pressed:
+            on the axes without a key pressed the gamepad sticks are used, if connected.
+            The movements are shaped by the control shaper, so they ramp instead of stepping
+        """
 
-        movements = [right_left, forward_backward, up_down, yaw_vel]
+        self._input_state = self._input.get_state()
+        movements = self._control_shaper.update([axis * self.MOVE_SPEED for axis in self._input_state.axes])
 
-        self._movement_list.append(movements)
+        self._movement_list.append(*movements)
         if self._recording_path:
-            self._recorded_path.append(movements)
+            self._recorded_path.append(*movements)
 
         return movements
 
@@ -102,72 +114,150 @@ class Cockpit:
             -> Landing
             -> Fly where you want
             -> Start/Stop Streaming
-            -> Capture images saving on desktop
+            -> Capture images saving in the captures directory
             -> Record Path and follows it
             -> Return Home
+            -> Fly the mission of MISSION_FILE
+            -> Emergency Stop ( held until the key is released )
+            -> Release of the Emergency Stops not started by the key
+            -> Show/Hide the performance overlay
+
+            Function keys fire once per keypress, not on every tick while held,
+            also if update_pressed has been called many times since the last tick
+            Replays run in background, so the keyboard is processed also while replaying
         """
 
+        loop_start = self._profiler.begin()
         is_flying = True
-        func = self.kb_map["func"]
+        fired = self._bindings.is_fired
+
+        # --> Emergency Stop
+        # Only a stop started by the key is released with the key, the others ( e.g. the emergency
+        # landing for the battery ) need the release key
+        if fired("emergency_stop"):
+            self.emergency_stop()
+        elif fired("release_stop"):
+            self.release_emergency_stop()
+        elif self._key_stop and not self._bindings.is_held("emergency_stop") and not self.is_replaying():
+            self.release_emergency_stop()
+
+        # --> Show/Hide Performance Overlay
+        if fired("perf_overlay"):
+            self._tello.set_perf_overlay(not self._tello.is_perf_overlay())
 
         # --> Take-Off
-        if self.if_key_pressed(func["takeoff"]):
+        if fired("takeoff"):
             self._tello.start_streaming()
             self._tello.takeoff()
 
         # --> Landing
-        if self.if_key_pressed(func["landing"]):
+        if fired("landing"):
+            self._cancel_replay()
             self._tello.land()
             self._tello.stop_streaming()
-            self._movement_list.clear()
+            self._reset_home()
+            self._control_shaper.reset()
             is_flying = False
 
         # --> Start/Stop Streaming
-        if self.if_key_pressed(func["stream"]):
+        if fired("stream"):
             if not self._tello.stream_on:
                 self._tello.start_streaming()
             else:
                 self._tello.stop_streaming()
 
-        # --> Capture Image and Save on Desktop
+        # --> Capture Image and Save in the captures directory
         if self._tello.stream_on:
-            img = self._tello.show_img(0, 0)
-            if self.if_key_pressed(func["save_img"]):
-                self._tello.save_img(img)
+            start = self._profiler.begin()
+            if self._video_window:
+                self._tello.show_img(0, 0)
+            if fired("save_img"):
+                self._tello.save_img()
+            self._profiler.end(self._stage_video, start)
 
         # ### In Flying functions ### #
         if self._tello.is_flying:
-            movement = self.get_movements()
 
-            # --> Move Tello with keyboard
-            self._tello.send_rc_controlx(movement[0],
-                                         movement[1],
-                                         movement[2],
-                                         movement[3],
-                                         self.TELLO_SPEED)
+            # --> Move Tello with keyboard (non-blocking: the RC scheduler sends it)
+            # While replaying, setpoints are sent by the replay
+            if not self.is_replaying():
+                start = self._profiler.begin()
+                movement = self.get_movements()
+                self._tello.send_rc_controlx(movement[0],
+                                             movement[1],
+                                             movement[2],
+                                             movement[3],
+                                             0)
+                self._input.record_command(self._input_state)
+                self._profiler.end(self._stage_movement, start)
 
             # --> Start/Stop Recording Path
-            if self.if_key_pressed(func["recording_path"]):
+            if fired("recording_path"):
                 self.switch_recording_path()
 
             # --> Tello will fly following recorded path
-            if self.if_key_pressed(func["follow_path"]):
+            if fired("follow_path"):
                 self.follow_path()
 
             # --> Tello will come back following recorded path
-            if self.if_key_pressed(func["return"]):
+            if fired("return"):
                 self.return_home()
 
+            # --> Tello will fly the mission of MISSION_FILE
+            if fired("mission"):
+                self.run_mission()
+
+        # The keypresses seen by update_pressed since the last tick have been executed
+        self._bindings.clear_fired()
+        self._profiler.end(self._stage_loop, loop_start)
         return is_flying
 
+    def get_input_stats(self) -> dict:
+        """
+            Returns the sample rate of the input and the latency from the input to the setpoints
+        """
+        return self._input.get_stats()
+
+    def set_video_window(self, enabled: bool):
+        """
+            Enables the cv2 window of the video, driven by exe_command
+        """
+        self._video_window = enabled
+
+    def emergency_stop(self):
+        """
+            Stops the drone in hovering aborting the running replay, landing if EMERGENCY_STOP_LANDS
+        """
+        if not self._tello.is_emergency_stopped():
+            self._key_stop = True
+        self._tello.emergency_stop("from keyboard")
+        self._cancel_replay()
+        self._control_shaper.reset()
+
+        if self.EMERGENCY_STOP_LANDS:
+            self.emergency_landing()
+
+    def release_emergency_stop(self):
+        # A stop that cannot be released ( battery level too low ) is not retried on every tick
+        self._key_stop = False
+        self._tello.clear_emergency_stop()
+
     def emergency_landing(self):
+        self._cancel_replay()
         self._tello.land()
         self._tello.stop_streaming()
-        self._movement_list.clear()
+        self._reset_home()
+        self._control_shaper.reset()
 
-    def get_movement_list(self):
+    def get_movement_list(self) -> MovementLog:
+        """
+            Returns the movements sent since the last landing or return home
+        """
         return self._movement_list
 
+    def _reset_home(self):
+        self._movement_list.clear()
+
     def switch_recording_path(self):
         if not self._recording_path:
             self._enable_recording_path()
@@ -187,35 +277,117 @@ class Cockpit:
     def follow_path(self):
         path = self.get_recorded_path()
         if not path:
-            # TODO implement log
-            pass
+            self._tello.print_log(logging.WARNING, "No recorded path to follow")
+        elif self.is_replaying():
+            self._tello.print_log(logging.WARNING, "Replay already running")
         else:
             self._disable_recording_path()
-            for move in path:
-                self._movement_list.append(move)
-                self._tello.send_rc_controlx(move[0],
-                                             move[1],
-                                             move[2],
-                                             move[3],
-                                             self.TELLO_SPEED)
-            # TODO implement emergency stop
-            # TODO implement log
-            self._recorded_path.clear()
+
+            # The replayed moves are logged, so that return home can fly them back too
+            plan = ReplayPlan.from_log(path)
+            self._start_replay(plan, self._log_replayed_step, self._on_follow_path_done)
 
     def return_home(self):
         path = self.get_movement_list()
         if not path:
-            # TODO implement log
-            pass
+            self._tello.print_log(logging.WARNING, "No movements to return home")
+        elif self.is_replaying():
+            self._tello.print_log(logging.WARNING, "Replay already running")
         else:
+            plan = ReplayPlan.from_log(path, reverse=True)
+            self._start_replay(plan, None, self._on_return_home_done)
 
-            # TODO implement emergency stop
-            # TODO implement reversed path to follow
-
-            for move in path:
-                self._tello.send_rc_controlx(move[0],
-                                             move[1],
-                                             move[2],
-                                             move[3],
-                                             self.TELLO_SPEED)
-            self._movement_list.clear()
+    def run_mission(self, path: str = MISSION_FILE):
+        """
+            Flies the mission of a file, compiled before starting.
+            rc missions are played as a replay, so they are aborted in the same way,
+            go missions are queued in the command pipeline of the Tello
+        """
+        if self.is_replaying():
+            self._tello.print_log(logging.WARNING, "Replay already running")
+            return
+
+        try:
+            mission = Mission.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            self._tello.print_log(logging.ERROR, "Unable to load the mission %s: %s", path, e)
+            return
+
+        if mission.mode == Mission.MODE_GO:
+            future = self._tello.submit_commands(mission.compile_commands(), "Mission " + mission.name)
+            future.add_done_callback(lambda done: self._on_mission_commands_done(mission.name, done.result()))
+            return
+
+        start = time.perf_counter()
+        plan = mission.compile()
+        self._tello.print_log(logging.INFO, "Mission %s compiled in %.2f ms: %d setpoints, %.1f s",
+                              mission.name, (time.perf_counter() - start) * 1000, len(plan), plan.get_duration())
+
+        self._disable_recording_path()
+        self._start_replay(plan.to_replay_plan(), self._log_replayed_step,
+                           lambda report: self._log_replay_report("Mission " + mission.name, report))
+
+    def is_replaying(self) -> bool:
+        return self._replay_task is not None and self._replay_task.is_running()
+
+    def wait_replay(self, timeout: float | None = None) -> dict | None:
+        """
+            Waits for the end of the last replay started and returns its timing report,
+            None if no replay has been started or it is still running
+        """
+        if self._replay_task is None:
+            return None
+
+        self._replay_task.join(timeout)
+        return self._replay_task.get_report()
+
+    def _start_replay(self, plan: ReplayPlan, on_step, on_done):
+        # The replay starts from its own setpoints, and the keyboard from 0 after it
+        self._control_shaper.reset()
+        self._replay_task = ReplayTask(self._replay_engine,
+                                       plan,
+                                       self._tello.get_emergency_stop(),
+                                       on_step,
+                                       on_done)
+        self._replay_task.start()
+
+    def _cancel_replay(self):
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task.join()
+
+    def _on_follow_path_done(self, report: dict):
+        self._log_replay_report("Follow path", report)
+        self._recorded_path.clear()
+
+    def _on_return_home_done(self, report: dict):
+        self._log_replay_report("Return home", report)
+        if not report["aborted"]:
+            self._reset_home()
+            return
+
+        # The plan has a step per run of the movement list, played from the newest: the runs already
+        # flown back are dropped, the step in progress and the older ones are kept to return home later
+        self._movement_list.drop_newest(report["steps"] - 1)
+
+    def _on_mission_commands_done(self, name: str, result):
+        self._tello.print_log(logging.INFO if result.ok else logging.ERROR,
+                              "Mission %s %s in %.2f s", name, "completed" if result.ok else "failed", result.total_time)
+
+    def _send_replay_setpoint(self, left_right, forward_backward, up_down, yaw):
+        self._tello.send_rc_controlx(left_right, forward_backward, up_down, yaw, 0)
+
+    def _log_replayed_step(self, left_right, forward_backward, up_down, yaw, timestamp):
+        self._movement_list.append(left_right, forward_backward, up_down, yaw, timestamp)
+
+    def _log_replay_report(self, replay_name: str, report: dict):
+        self._tello.print_log(logging.INFO,
+                              "%s %s -> |steps: %d |planned: %.3fs |actual: %.3fs |"
+                              "error avg: %.2fms |error max: %.2fms |",
+                              replay_name,
+                              "aborted" if report["aborted"] else "completed",
+                              report["steps"],
+                              report["planned_s"],
+                              report["actual_s"],
+                              report["error_avg_ms"],
+                              report["error_max_ms"])
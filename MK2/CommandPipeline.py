@@ -0,0 +1,355 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import queue
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, NamedTuple
+
+
+####################################################################################################################
+# CORE
+class CommandStep(NamedTuple):
+    """
+        A step of a command sequence
+            command = SDK command, None for a step that only waits for its condition
+            until = State condition that completes the step after the ack, None to complete at the ack
+            timeout = Seconds to wait for the ack of each attempt
+            retries = Attempts after the first one, when no ack is received or the ack is an error
+            until_timeout = Seconds to wait for the condition
+            required = If the condition is not met in time the sequence fails, otherwise it continues
+            query = The ack is a value ( e.g. battery? ) instead of "ok"
+            then = Called after the ack, before waiting for the condition
+    """
+    command: str | None
+    until: Callable[[], bool] | None = None
+    timeout: float = 7.0
+    retries: int = 2
+    until_timeout: float = 2.0
+    required: bool = True
+    query: bool = False
+    then: Callable[[], None] | None = None
+
+
+class StepResult(NamedTuple):
+    """
+        Outcome of a step
+            seq = Sequence number of the step, increasing for all the steps of the pipeline
+            response = Last response received, or the error message of the last attempt
+            attempts = Commands sent, 0 for a step that only waits
+            ack_time = Seconds from the first send to the ack
+            wait_time = Seconds waited for the condition after the ack
+            ok = The ack was received and, if required, the condition was met
+    """
+    seq: int
+    command: str | None
+    response: str
+    attempts: int
+    ack_time: float
+    wait_time: float
+    ok: bool
+
+
+class SequenceResult(NamedTuple):
+    """
+        Outcome of a command sequence, which stops at the first failed step
+    """
+    name: str
+    steps: list[StepResult]
+    total_time: float
+    ok: bool
+
+
+class AckQueue(list):
+    """
+        Replaces the response list of djitellopy, which the response receiver thread fills with
+            drones[host]['responses'].append(data)
+        so the sender is woken up by the response instead of polling the list.
+
+        The responses of the Tello carry no reference to their command, so a command sent without
+        waiting for its response ( e.g. the emergency stop ) is announced with interrupt():
+        the command waiting for its response is woken up with INTERRUPTED instead of taking
+        a response that may belong to the other one, and the responses received in the next
+        window seconds are discarded by wait_quiet() before the next command is sent.
+    """
+
+    INTERRUPTED = b""
+
+    def __init__(self, content: list | None = None):
+        super().__init__(content or [])
+        self._cond = threading.Condition()
+        self._waiters = 0
+        self._interrupted = False
+        self._quiet_until = 0.0
+
+    def append(self, data):
+        with self._cond:
+            super().append(data)
+            self._cond.notify_all()
+
+    def wait_pop(self, timeout: float):
+        """
+            Returns the oldest response, waiting for it at most timeout seconds. None if none arrives,
+            INTERRUPTED if interrupt() is called while waiting
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiters += 1
+            try:
+                while not self._interrupted and not self:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+
+                if self._interrupted:
+                    return self.INTERRUPTED
+                return self.pop(0)
+            finally:
+                self._waiters -= 1
+                if self._waiters == 0:
+                    self._interrupted = False
+
+    def interrupt(self, window: float):
+        """
+            Wakes up the command waiting for its response, and marks the responses of the next
+            window seconds as not belonging to the commands sent after this call
+        """
+        with self._cond:
+            self._interrupted = self._waiters > 0
+            self._quiet_until = time.monotonic() + window
+            self._cond.notify_all()
+
+    def wait_quiet(self):
+        """
+            Waits for the end of the window of the last interrupt(), then discards the responses received
+        """
+        delay = self._quiet_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._cond:
+            self.clear()
+
+
+class CommandPipeline:
+    """
+        Runs sequences of SDK commands ( not RC ) one at a time on a worker thread.
+
+        Every step gets a sequence number, and its ack ( the response of the drone ) is tracked by it:
+        a step without a valid ack within its timeout is sent again, up to its retries.
+        After the ack, a step can wait for a state condition ( e.g. height reached after the take-off )
+        in place of a fixed sleep. The condition is checked at every state packet and at least
+        every WAIT_POLL seconds, so the step ends as soon as it is met.
+        cancel() stops the running sequence and the queued ones before their next step
+        ( e.g. on an emergency stop ), the sequences submitted after it are run normally:
+        the running step is not sent again after cancel().
+
+        send_fn = Sends a command and returns its response, or an error message after the timeout
+                  ( e.g. djitellopy send_command_with_return )
+        wait_fn = Blocks until a new state packet is received or the timeout expires
+                  ( e.g. TelemetryCache.wait_for_update ), conditions are polled if not given
+    """
+
+    # ---> CONSTANTS
+    WAIT_POLL = 0.01  # seconds
+    ACK_HISTORY = 64
+    ERROR_WORDS = ("error", "ERROR", "False", "Aborting")
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 send_fn: Callable[[str, float], str],
+                 wait_fn: Callable[[float], bool] | None = None,
+                 log_fn: Callable[[int, str], None] | None = None):
+        self._send_fn = send_fn
+        self._wait_fn = wait_fn
+        self._log_fn = log_fn
+
+        self._queue = queue.Queue()
+        self._thread = None
+
+        self._next_seq = 1
+        self._generation = 0
+        self._acks = {}
+        self._acks_order = deque()
+        self._lock = threading.Lock()
+
+        self._sequences = 0
+        self._failed = 0
+        self._commands = 0
+        self._retries = 0
+        self._unacked = 0
+        self._last_time = 0.0
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self.is_running():
+            return
+
+        self._thread = threading.Thread(target=self._run, name="CommandPipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.is_running():
+            return
+
+        # Sequences already queued are completed first
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, steps: list[CommandStep], name: str = "") -> Future:
+        """
+            Queues a sequence of steps, run after the sequences already queued.
+            The future is completed with its SequenceResult
+        """
+        future = Future()
+        self._queue.put((name, list(steps), self._generation, future))
+        return future
+
+    def run(self, steps: list[CommandStep], name: str = "") -> SequenceResult:
+        """
+            Runs a sequence of steps and waits for its result.
+            If the worker is not running, the sequence runs on the calling thread
+        """
+        if not self.is_running():
+            return self._run_sequence(name, steps, self._generation)
+
+        return self.submit(steps, name).result()
+
+    def cancel(self):
+        """
+            Cancels the running sequence and the queued ones, the current step is completed
+        """
+        self._generation += 1
+
+    def get_ack(self, seq: int) -> StepResult | None:
+        """
+            Returns the result of the step with the given sequence number, if it is still in the history
+        """
+        with self._lock:
+            return self._acks.get(seq)
+
+    def get_stats(self) -> dict:
+        return {
+            "sequences": self._sequences,
+            "failed": self._failed,
+            "commands": self._commands,
+            "retries": self._retries,
+            "unacked": self._unacked,
+            "last_sequence_s": self._last_time,
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            name, steps, generation, future = item
+            try:
+                future.set_result(self._run_sequence(name, steps, generation))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run_sequence(self, name: str, steps: list[CommandStep], generation: int) -> SequenceResult:
+        start = time.monotonic()
+
+        results = []
+        ok = True
+        for step in steps:
+            if generation != self._generation:
+                ok = False
+                self._log(logging.WARNING, f'{name}: cancelled')
+                break
+
+            result = self._run_step(step, generation)
+            results.append(result)
+            if not result.ok:
+                ok = False
+                self._log(logging.ERROR, f'{name}: step {result.seq} {step.command} failed ( {result.response} )')
+                break
+
+        total_time = time.monotonic() - start
+        self._sequences += 1
+        self._failed += not ok
+        self._last_time = total_time
+
+        return SequenceResult(name, results, total_time, ok)
+
+    def _run_step(self, step: CommandStep, generation: int) -> StepResult:
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+
+        # Ack
+        response = ""
+        attempts = 0
+        acked = step.command is None
+        start = time.monotonic()
+        while not acked and attempts <= step.retries and generation == self._generation:
+            if attempts > 0:
+                self._retries += 1
+            attempts += 1
+            self._commands += 1
+
+            response = self._send_fn(step.command, step.timeout)
+            acked = self._is_ack(response, step.query)
+
+        ack_time = time.monotonic() - start
+        if not acked:
+            self._unacked += 1
+            return self._store(StepResult(seq, step.command, response, attempts, ack_time, 0.0, False))
+
+        if step.then is not None:
+            step.then()
+
+        # State condition
+        start = time.monotonic()
+        met = step.until is None or self._wait_until(step.until, step.until_timeout)
+        wait_time = time.monotonic() - start
+        if not met:
+            self._log(logging.WARNING, f'Step {seq} {step.command}: condition not met after {wait_time:.2f} s')
+            if step.required:
+                response = "condition not met"
+
+        return self._store(StepResult(seq, step.command, response, attempts, ack_time, wait_time,
+                                      met or not step.required))
+
+    def _wait_until(self, condition: Callable[[], bool], timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            if self._wait_fn is not None:
+                self._wait_fn(min(remaining, self.WAIT_POLL))
+            else:
+                time.sleep(min(remaining, self.WAIT_POLL))
+
+        return True
+
+    def _is_ack(self, response: str, query: bool) -> bool:
+        if query:
+            return bool(response) and not any(word in response for word in self.ERROR_WORDS)
+        return "ok" in response.lower()
+
+    def _store(self, result: StepResult) -> StepResult:
+        with self._lock:
+            self._acks[result.seq] = result
+            self._acks_order.append(result.seq)
+            if len(self._acks_order) > self.ACK_HISTORY:
+                del self._acks[self._acks_order.popleft()]
+
+        return result
+
+    def _log(self, level: int, msg: str):
+        if self._log_fn is not None:
+            self._log_fn(level, msg)
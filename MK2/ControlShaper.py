@@ -0,0 +1,130 @@
+####################################################################################################################
+# IMPORTS
+import math
+import time
+import numpy as np
+
+
+####################################################################################################################
+# CORE
+class ControlShaper:
+    """
+        Shapes the RC setpoints of the input ( keyboard steps or analog axes ) before they are sent,
+        one value per axis in the order used by TelloMK2.send_rc_controlx.
+
+        On every update, for each axis:
+            target = Input clipped to the speed cap of the axis
+            smooth = Exponential smoothing of the target with time constant smoothing
+            output = Follows smooth with the acceleration limited to max_accel and
+                     its change limited to max_jerk, braking early enough not to overshoot
+        So a keypress becomes a ramp of at most max_accel units/s instead of a step of MOVE_SPEED.
+
+        The state is a few NumPy arrays of 4 elements, an update costs some microseconds.
+        Limits can be a single value for all the axes or a list of 4 values.
+    """
+
+    # ---> CONSTANTS
+    AXES = 4
+    MAX_DT = 0.1  # seconds, longer gaps between updates ( e.g. a pause of the loop ) are clamped
+    STOP_THRESHOLD = 0.5  # RC units, below it an axis with a null target is stopped
+
+    DEFAULTS = {
+        "max_speed": 100,  # RC units
+        "max_accel": 250,  # RC units / s
+        "max_jerk": 2500,  # RC units / s^2
+        "smoothing": 0.05,  # seconds, 0 to disable
+    }
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 max_speed=DEFAULTS["max_speed"],
+                 max_accel=DEFAULTS["max_accel"],
+                 max_jerk=DEFAULTS["max_jerk"],
+                 smoothing: float = DEFAULTS["smoothing"]):
+        self._max_speed = self._per_axis(max_speed)
+        self._max_accel = self._per_axis(max_accel)
+        self._max_jerk = self._per_axis(max_jerk)
+        self._smoothing = float(smoothing)
+
+        self._target = np.zeros(self.AXES)
+        self._smooth = np.zeros(self.AXES)
+        self._output = np.zeros(self.AXES)
+        self._accel = np.zeros(self.AXES)
+        self._brake = np.zeros(self.AXES)
+        self._last_time = None
+
+    # ---> FUNCTIONS
+    @classmethod
+    def from_config(cls, config: dict | None):
+        """
+            Returns a shaper with the settings of a dictionary ( e.g. the "control" section of kb_map.json ),
+            the missing settings get DEFAULTS
+        """
+        settings = dict(cls.DEFAULTS)
+        settings.update(config or {})
+        return cls(settings["max_speed"], settings["max_accel"], settings["max_jerk"], settings["smoothing"])
+
+    def reset(self):
+        """
+            Stops all the axes at once, e.g. after an emergency stop or a replay
+        """
+        self._smooth[:] = 0
+        self._output[:] = 0
+        self._accel[:] = 0
+        self._last_time = None
+
+    def update(self, target, now: float | None = None) -> list[int]:
+        """
+            Moves the output towards the target and returns it rounded to RC units
+        """
+        now = time.monotonic() if now is None else now
+        dt = 0.0 if self._last_time is None else min(now - self._last_time, self.MAX_DT)
+        self._last_time = now
+
+        np.clip(target, -self._max_speed, self._max_speed, out=self._target)
+        if dt <= 0:
+            return np.rint(self._output).astype(int).tolist()
+
+        # Exponential smoothing of the target
+        if self._smoothing > 0:
+            self._smooth += (self._target - self._smooth) * (1.0 - math.exp(-dt / self._smoothing))
+        else:
+            self._smooth[:] = self._target
+
+        # Acceleration towards the smoothed target, bounded so that it can ramp down to 0
+        # with max_jerk while the error is closed ( a = sqrt(2 * jerk * error) ), and by the
+        # acceleration that closes the error in this update
+        error = self._smooth - self._output
+        np.abs(error, out=self._brake)
+        accel = np.minimum(np.minimum(self._max_accel, np.sqrt(2.0 * self._max_jerk * self._brake)), self._brake / dt)
+        accel = np.copysign(accel, error)
+
+        # Change of the acceleration limited by the jerk
+        jerk_step = self._max_jerk * dt
+        np.clip(accel, self._accel - jerk_step, self._accel + jerk_step, out=self._accel)
+        self._output += self._accel * dt
+        np.clip(self._output, -self._max_speed, self._max_speed, out=self._output)
+
+        # An axis released is stopped once close to 0, instead of creeping towards it
+        stopped = (self._target == 0) & (np.abs(self._output) < self.STOP_THRESHOLD)
+        self._output[stopped] = 0
+        self._accel[stopped] = 0
+
+        return np.rint(self._output).astype(int).tolist()
+
+    def get_output(self) -> np.ndarray:
+        return self._output.copy()
+
+    def get_settings(self) -> dict:
+        return {
+            "max_speed": self._max_speed.tolist(),
+            "max_accel": self._max_accel.tolist(),
+            "max_jerk": self._max_jerk.tolist(),
+            "smoothing": self._smoothing,
+        }
+
+    def _per_axis(self, value) -> np.ndarray:
+        values = np.broadcast_to(np.asarray(value, dtype=float), (self.AXES,)).copy()
+        if np.any(values <= 0):
+            raise ValueError(f'Limits must be positive: {value}')
+        return values
@@ -0,0 +1,160 @@
+####################################################################################################################
+# IMPORTS
+import time
+import cv2
+import numpy as np
+
+
+####################################################################################################################
+# CORE
+class DisplayStage:
+    """
+        Display stage of the video: resizes the frames into a preallocated buffer and shows them
+        in a cv2 window, at most target_fps times per second, whatever the rate of the caller.
+
+        The target geometry is computed once and updated only when the window is resized by the user,
+        which is checked every RESIZE_POLL seconds. The buffer is reallocated only when the geometry
+        or the format of the frames changes.
+        Frames are RGB as in the FrameRing, the resized buffer is BGR as cv2 windows want it.
+        In headless mode frames are resized but never shown, so no window is opened.
+    """
+
+    # ---> CONSTANTS
+    WINDOW_NAME = "Tello Frame"
+    DEFAULT_FPS = 30
+    DEFAULT_INTERPOLATION = cv2.INTER_LINEAR
+    RESIZE_POLL = 0.5  # seconds
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 screen_size: tuple[int, int],
+                 target_fps: float = DEFAULT_FPS,
+                 interpolation: int = DEFAULT_INTERPOLATION,
+                 window_name: str = WINDOW_NAME,
+                 headless: bool = False):
+        """
+            screen_size = ( width, height ) of the screen, the default size is half of it
+            target_fps = Maximum frames shown per second, 0 to show every frame
+            interpolation = cv2 interpolation, INTER_NEAREST and INTER_AREA are the fastest to shrink
+            headless = Frames are never shown
+        """
+        self._default_size = (int(screen_size[0] / 2), int(screen_size[1] / 2))
+        self._window_name = window_name
+        self._interpolation = interpolation
+        self._headless = headless
+        self.set_target_fps(target_fps)
+
+        self._window_open = False
+        self._requested_size = (0, 0)
+        self._size = self._default_size
+        self._window_size = None
+        self._next_resize_poll = 0.0
+        self._next_show = 0.0
+
+        self._dst = None
+
+    # ---> FUNCTIONS
+    def set_target_fps(self, target_fps: float):
+        self._period = 1.0 / target_fps if target_fps > 0 else 0.0
+
+    def get_target_fps(self) -> float:
+        return 1.0 / self._period if self._period > 0 else 0.0
+
+    def set_interpolation(self, interpolation: int):
+        self._interpolation = interpolation
+
+    def get_interpolation(self) -> int:
+        return self._interpolation
+
+    def get_size(self) -> tuple[int, int]:
+        return self._size
+
+    def is_due(self) -> bool:
+        """
+            Returns True if a frame has to be shown now to keep the target FPS
+        """
+        if self._period == 0:
+            return True
+
+        now = time.monotonic()
+        if now < self._next_show:
+            return False
+
+        # Late calls do not accumulate: the next frame is due one period after this one at the latest
+        self._next_show = max(self._next_show + self._period, now)
+        return True
+
+    def resize(self, img: np.ndarray, resize_x: int = 0, resize_y: int = 0) -> np.ndarray:
+        """
+            Returns the frame resized in the display buffer, which is overwritten by the next call.
+            If resize params are zero, the size of the window is used ( half of the screen at start ).
+            Color frames are converted from RGB to BGR in the same buffer
+        """
+        self._update_geometry(resize_x, resize_y)
+
+        width, height = self._size
+        shape = (height, width) + img.shape[2:]
+        if self._dst is None or self._dst.shape != shape or self._dst.dtype != img.dtype:
+            self._dst = np.empty(shape, dtype=img.dtype)
+
+        color = img.ndim == 3 and img.shape[2] == 3
+        if img.shape == shape:
+            if color:
+                cv2.cvtColor(img, cv2.COLOR_RGB2BGR, dst=self._dst)
+                return self._dst
+            np.copyto(self._dst, img)
+        else:
+            cv2.resize(img, (width, height), dst=self._dst, interpolation=self._interpolation)
+
+        if color:
+            cv2.cvtColor(self._dst, cv2.COLOR_RGB2BGR, dst=self._dst)
+        return self._dst
+
+    def is_headless(self) -> bool:
+        return self._headless
+
+    def show(self, img: np.ndarray):
+        if self._headless:
+            return
+
+        if not self._window_open:
+            # A resizable window, its first size is the target size
+            cv2.namedWindow(self._window_name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(self._window_name, *self._size)
+            self._window_size = self._size
+            self._next_resize_poll = time.monotonic() + self.RESIZE_POLL
+            self._window_open = True
+
+        cv2.imshow(self._window_name, img)
+        cv2.waitKey(1)
+
+    def close(self):
+        if self._window_open:
+            cv2.destroyWindow(self._window_name)
+            self._window_open = False
+
+    def _update_geometry(self, resize_x: int, resize_y: int):
+        requested_size = (resize_x, resize_y)
+        if requested_size != self._requested_size:
+            # Resize params of the caller changed
+            self._requested_size = requested_size
+            self._size = (resize_x if resize_x > 0 else self._default_size[0],
+                          resize_y if resize_y > 0 else self._default_size[1])
+            if self._window_open:
+                cv2.resizeWindow(self._window_name, *self._size)
+                self._window_size = self._size
+
+        if not self._window_open or (resize_x > 0 and resize_y > 0):
+            return
+
+        now = time.monotonic()
+        if now < self._next_resize_poll:
+            return
+        self._next_resize_poll = now + self.RESIZE_POLL
+
+        # Window resized by the user: frames are resized to the new window size
+        _, _, width, height = cv2.getWindowImageRect(self._window_name)
+        if width > 0 and height > 0 and (width, height) != self._window_size:
+            self._window_size = (width, height)
+            self._size = (resize_x if resize_x > 0 else width,
+                          resize_y if resize_y > 0 else height)
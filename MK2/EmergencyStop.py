@@ -0,0 +1,62 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+
+from typing import Callable
+
+
+####################################################################################################################
+# CORE
+class EmergencyStop:
+    """
+        Latched emergency-stop channel shared by the RC scheduler and the replays.
+
+        trigger() can be called from any thread: listeners are notified synchronously,
+        so the RC scheduler is woken up immediately and the running replays are aborted.
+        The stop stays active until clear() is called.
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self):
+        self._event = threading.Event()
+        self._trigger_time = 0.0
+        self._reason = ""
+        self._listeners = []
+
+    # ---> FUNCTIONS
+    def add_listener(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def trigger(self, reason: str = ""):
+        if self._event.is_set():
+            return
+
+        self._trigger_time = time.perf_counter()
+        self._reason = reason
+        self._event.set()
+
+        for listener in list(self._listeners):
+            listener()
+
+    def clear(self):
+        self._event.clear()
+
+    def is_triggered(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._event.wait(timeout)
+
+    def get_trigger_time(self) -> float:
+        """
+            Returns the time of the last trigger ( time.perf_counter() )
+        """
+        return self._trigger_time
+
+    def get_reason(self) -> str:
+        return self._reason
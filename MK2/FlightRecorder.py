@@ -0,0 +1,390 @@
+####################################################################################################################
+# IMPORTS
+import mmap
+import struct
+import threading
+import time
+import numpy as np
+
+from datetime import datetime
+from pathlib import Path
+
+from MovementLog import MovementLog
+from Platform import get_flights_dir
+
+
+####################################################################################################################
+# FILE FORMAT
+#
+#   header  = magic "TFLR", version, start time ( time.time() ), start time ( time.monotonic() )
+#   chunk   = magic "CHNK", record count, time of the first and of the last record, records
+#   ...
+#   index   = one entry per chunk ( offset, count, t_first, t_last ), written on close
+#   trailer = magic "TFIX", offset of the index
+#
+# Records have a fixed size ( RECORD_DTYPE ), so a chunk is read as a NumPy array without parsing.
+# Each chunk is written with a single write, so a crash can only truncate the last one.
+# If the file has no trailer ( crash ) the index is rebuilt from the chunk headers.
+
+MAGIC = b"TFLR"
+VERSION = 1
+HEADER = struct.Struct("<4sHdd")
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIdd")
+TRAILER_MAGIC = b"TFIX"
+TRAILER = struct.Struct("<4sQ")
+
+# Record types
+REC_RC = 1
+REC_STATE = 2
+REC_FRAME = 3
+
+# Values of the records
+#   rc    = left_right, forward_backward, up_down, yaw ( order of TelloMK2.send_rc_controlx )
+#   state = STATE_FIELDS
+#   frame = sequence number, age of the frame when it was read ( seconds )
+STATE_FIELDS = ("pitch", "roll", "yaw", "vgx", "vgy", "vgz", "templ", "temph",
+                "tof", "h", "bat", "baro", "time", "agx", "agy", "agz")
+RECORD_VALUES = len(STATE_FIELDS)
+RECORD_DTYPE = np.dtype([("type", "u1"), ("t", "<f8"), ("values", "<f4", (RECORD_VALUES,))])
+
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("count", "<u4"), ("t_first", "<f8"), ("t_last", "<f8")])
+
+
+####################################################################################################################
+# CORE
+class FlightRecorder:
+    """
+        Records a flight in a single append-only binary file:
+        the RC setpoints sent, the packets of the state stream and the frames read.
+
+        Callers only store the record in a preallocated chunk in memory.
+        A writer thread appends the chunk to the file when it is full or every FLUSH_INTERVAL,
+        so the disk is never accessed by the control thread.
+        Times are time.monotonic(), the same clock of the frames and of the MovementLog.
+    """
+
+    # ---> CONSTANTS
+    CHUNK_RECORDS = 1024
+    FLUSH_INTERVAL = 1.0  # seconds
+    FILE_EXTENSION = "tfr"
+
+    # ---> CONSTRUCTOR
+    def __init__(self, out_dir: str | Path | None = None, chunk_records: int = CHUNK_RECORDS):
+        # The default directory is resolved here and not at import time
+        self._out_dir = Path(out_dir) if out_dir is not None else get_flights_dir()
+        self._chunk_records = chunk_records
+
+        self._lock = threading.Lock()
+        self._chunk = np.zeros(chunk_records, dtype=RECORD_DTYPE)
+        self._chunk_count = 0
+        self._full_chunks = []
+
+        self._file = None
+        self._path = None
+        self._index = []
+        self._last_frame_seq = 0
+
+        self._thread = None
+        self._wake_event = threading.Event()
+        self._write_lock = threading.Lock()
+
+        self._records = 0
+        self._bytes = 0
+
+    # ---> FUNCTIONS
+    def open(self, path: str | Path | None = None) -> Path:
+        """
+            Starts recording in a new file, by default flight_<date>.tfr in the output directory
+        """
+        if self.is_open():
+            return self._path
+
+        if path is None:
+            self._out_dir.mkdir(parents=True, exist_ok=True)
+            path = self._out_dir / f'flight_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{self.FILE_EXTENSION}'
+
+        self._path = Path(path)
+        self._file = open(self._path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time(), time.monotonic()))
+        self._file.flush()
+        self._bytes = HEADER.size
+
+        self._index = []
+        self._records = 0
+        self._last_frame_seq = 0
+
+        self._wake_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FlightRecorder", daemon=True)
+        self._thread.start()
+
+        return self._path
+
+    def close(self):
+        """
+            Writes the pending records and the index, then closes the file
+        """
+        if not self.is_open():
+            return
+
+        file = self._file
+        self._file = None
+        self._wake_event.set()
+        self._thread.join()
+        self._thread = None
+
+        with self._write_lock:
+            self._write_pending(file)
+
+            index = np.array(self._index, dtype=INDEX_DTYPE)
+            index_offset = file.tell()
+            file.write(index.tobytes())
+            file.write(TRAILER.pack(TRAILER_MAGIC, index_offset))
+            file.close()
+
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def get_path(self) -> Path | None:
+        return self._path
+
+    def record_rc(self, left_right: int, forward_backward: int, up_down: int, yaw: int):
+        self._append(REC_RC, (left_right, forward_backward, up_down, yaw))
+
+    def record_state(self, state: dict):
+        self._append(REC_STATE, [state.get(field, 0) for field in STATE_FIELDS])
+
+    def record_frame(self, seq: int, timestamp: float):
+        """
+            Records a frame read, once per sequence number
+        """
+        if seq == self._last_frame_seq:
+            return
+
+        self._last_frame_seq = seq
+        self._append(REC_FRAME, (seq, time.monotonic() - timestamp))
+
+    def flush(self):
+        """
+            Writes the records in memory on the file without waiting for the writer thread
+        """
+        file = self._file
+        if file is None:
+            return
+
+        with self._write_lock:
+            self._write_pending(file)
+
+    def get_stats(self) -> dict:
+        return {
+            "path": str(self._path) if self._path is not None else None,
+            "records": self._records,
+            "chunks": len(self._index),
+            "bytes": self._bytes,
+        }
+
+    def _append(self, rec_type: int, values):
+        if self._file is None:
+            return
+
+        with self._lock:
+            record = self._chunk[self._chunk_count]
+            record["type"] = rec_type
+            record["t"] = time.monotonic()
+            record["values"][:len(values)] = values
+            self._chunk_count += 1
+            self._records += 1
+
+            if self._chunk_count == self._chunk_records:
+                self._full_chunks.append(self._chunk)
+                self._chunk = np.zeros(self._chunk_records, dtype=RECORD_DTYPE)
+                self._chunk_count = 0
+                self._wake_event.set()
+
+    def _run(self):
+        while self._file is not None:
+            self._wake_event.wait(self.FLUSH_INTERVAL)
+            self._wake_event.clear()
+
+            file = self._file
+            if file is not None:
+                with self._write_lock:
+                    self._write_pending(file)
+
+    def _write_pending(self, file):
+        # The partial chunk is swapped with an empty one, so the callers are blocked only for the swap
+        with self._lock:
+            chunks = self._full_chunks
+            self._full_chunks = []
+            if self._chunk_count > 0:
+                chunks.append(self._chunk[:self._chunk_count])
+                self._chunk = np.zeros(self._chunk_records, dtype=RECORD_DTYPE)
+                self._chunk_count = 0
+
+        if not chunks:
+            return
+
+        for chunk in chunks:
+            offset = file.tell()
+            t_first, t_last = chunk["t"][0], chunk["t"][-1]
+            file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(chunk), t_first, t_last) + chunk.tobytes())
+            self._index.append((offset, len(chunk), t_first, t_last))
+            self._bytes = offset + CHUNK_HEADER.size + chunk.nbytes
+
+        file.flush()
+
+
+class FlightReader:
+    """
+        Reads a file of the FlightRecorder through a read-only memory map.
+
+        Chunks are returned as NumPy arrays backed by the map, so only the pages of the chunks
+        accessed are read from disk, and the index of the chunks is used to seek by time.
+        The file can be read while it is being recorded: only the chunks already written are seen.
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self, path: str | Path):
+        self._path = Path(path)
+        self._file = open(self._path, "rb")
+
+        size = self._file.seek(0, 2)
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError("Not a flight record: " + str(path))
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._start_time, self._start_monotonic = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a flight record: " + str(path))
+
+        self._index = self._read_index()
+
+    def __enter__(self) -> "FlightReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---> FUNCTIONS
+    def close(self):
+        """
+            Closes the map, the arrays returned by get_chunk() must not be used anymore
+        """
+        self._map.close()
+        self._file.close()
+
+    def get_start_time(self) -> float:
+        """
+            Returns the time.time() at which the recording started
+        """
+        return self._start_time
+
+    def to_wall_time(self, t: float | np.ndarray) -> float | np.ndarray:
+        """
+            Converts monotonic times of the records to time.time()
+        """
+        return t - self._start_monotonic + self._start_time
+
+    def get_index(self) -> np.ndarray:
+        return self._index
+
+    def get_chunk_count(self) -> int:
+        return len(self._index)
+
+    def get_chunk(self, chunk: int) -> np.ndarray:
+        """
+            Returns the records of a chunk as a read-only structured array ( RECORD_DTYPE )
+        """
+        entry = self._index[chunk]
+        return np.frombuffer(self._map, dtype=RECORD_DTYPE, count=int(entry["count"]),
+                             offset=int(entry["offset"]) + CHUNK_HEADER.size)
+
+    def records(self, rec_type: int | None = None, t_start: float = -np.inf, t_end: float = np.inf) -> np.ndarray:
+        """
+            Returns the records of a type ( all of them if None ) with time in [ t_start, t_end )
+        """
+        # Only the chunks overlapping the interval are read
+        first = np.searchsorted(self._index["t_last"], t_start, side="left")
+        last = np.searchsorted(self._index["t_first"], t_end, side="left")
+        if first >= last:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        records = np.concatenate([self.get_chunk(chunk) for chunk in range(first, last)])
+
+        mask = (records["t"] >= t_start) & (records["t"] < t_end)
+        if rec_type is not None:
+            mask &= records["type"] == rec_type
+        return records[mask]
+
+    def rc(self, t_start: float = -np.inf, t_end: float = np.inf) -> np.ndarray:
+        """
+            Returns the RC setpoints as a ( n, 5 ) array of t, left_right, forward_backward, up_down, yaw
+        """
+        records = self.records(REC_RC, t_start, t_end)
+        return np.column_stack((records["t"], records["values"][:, :4]))
+
+    def states(self, t_start: float = -np.inf, t_end: float = np.inf) -> dict[str, np.ndarray]:
+        """
+            Returns the state packets as a column per field of STATE_FIELDS, plus the time t
+        """
+        records = self.records(REC_STATE, t_start, t_end)
+        columns = {"t": records["t"]}
+        for indx, field in enumerate(STATE_FIELDS):
+            columns[field] = records["values"][:, indx]
+        return columns
+
+    def frames(self, t_start: float = -np.inf, t_end: float = np.inf) -> np.ndarray:
+        """
+            Returns the frames read as a ( n, 3 ) array of t, sequence number, age of the frame
+        """
+        records = self.records(REC_FRAME, t_start, t_end)
+        return np.column_stack((records["t"], records["values"][:, :2]))
+
+    def to_movement_log(self, since: float = -np.inf, capacity: int = MovementLog.DEFAULT_CAPACITY) -> MovementLog:
+        """
+            Returns the RC setpoints recorded after since as a run-length encoded MovementLog
+        """
+        movement_log = MovementLog(capacity)
+
+        rc = self.rc(since)
+        if len(rc) == 0:
+            return movement_log
+
+        # A run starts where the setpoint changes
+        setpoints = rc[:, 1:].astype(int)
+        changed = np.any(setpoints[1:] != setpoints[:-1], axis=1)
+        starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        ends = np.concatenate((starts[1:], [len(rc)])) - 1
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            setpoint = setpoints[start].tolist()
+            movement_log.append(*setpoint, rc[start, 0])
+            if end > start:
+                movement_log.append(*setpoint, rc[end, 0], count=end - start)
+
+        return movement_log
+
+    def _read_index(self) -> np.ndarray:
+        size = len(self._map)
+        if size >= HEADER.size + TRAILER.size:
+            magic, index_offset = TRAILER.unpack_from(self._map, size - TRAILER.size)
+            if magic == TRAILER_MAGIC:
+                count = (size - TRAILER.size - index_offset) // INDEX_DTYPE.itemsize
+                # Copied, so that no view of the map is kept open
+                return np.frombuffer(self._map, dtype=INDEX_DTYPE, count=count, offset=index_offset).copy()
+
+        # Recording not closed: the index is rebuilt walking the chunk headers
+        entries = []
+        offset = HEADER.size
+        while offset + CHUNK_HEADER.size <= size:
+            magic, count, t_first, t_last = CHUNK_HEADER.unpack_from(self._map, offset)
+            end = offset + CHUNK_HEADER.size + count * RECORD_DTYPE.itemsize
+            if magic != CHUNK_MAGIC or end > size:
+                break  # Chunk truncated by a crash
+            entries.append((offset, count, t_first, t_last))
+            offset = end
+
+        return np.array(entries, dtype=INDEX_DTYPE)
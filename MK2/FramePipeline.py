@@ -0,0 +1,202 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+import numpy as np
+
+from typing import Any, Callable, NamedTuple
+
+
+####################################################################################################################
+# CORE
+class FrameView(NamedTuple):
+    """
+        Read-only view of a frame stored in the FrameRing
+            seq = Sequence number of the frame, starting from 1
+            timestamp = Capture time of the frame ( time.monotonic() )
+            frame = Read-only NumPy view of the ring slot
+    """
+    seq: int
+    timestamp: float
+    frame: Any
+
+
+class FrameRing:
+    """
+        Ring of preallocated NumPy buffers holding the latest decoded frames.
+
+        A single producer writes into the next slot ( acquire -> fill -> commit ),
+        consumers get read-only views of the slots, so nothing is copied when reading.
+        A view stays valid until the producer wraps around the ring and overwrites its slot,
+        that is after  slots - 1  newer frames.
+
+        Color frames are RGB with every video backend ( djitellopy decodes to RGB ):
+        consumers based on cv2, which wants BGR, convert them ( see DisplayStage and CaptureWriter ).
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_SLOTS = 4
+    FPS_SMOOTHING = 0.1  # weight of the last frame period in the average
+
+    # ---> CONSTRUCTOR
+    def __init__(self, slots: int = DEFAULT_SLOTS):
+        self._slots = slots
+        self._buffers = []
+        self._views = []
+        self._seqs = [0] * slots
+        self._timestamps = [0.0] * slots
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._next_seq = 1
+
+        self._last_read_seq = 0
+        self._produced = 0
+        self._dropped = 0
+        self._last_commit = 0.0
+        self._period_avg = 0.0
+
+    # ---> FUNCTIONS
+    def acquire(self, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """
+            Returns the writable buffer of the slot that will hold the next frame.
+            Buffers are (re)allocated only when the frame geometry changes
+        """
+        if not self._buffers or self._buffers[0].shape != shape or self._buffers[0].dtype != dtype:
+            self._allocate(shape, dtype)
+
+        return self._buffers[self._next_seq % self._slots]
+
+    def commit(self, timestamp: float) -> int:
+        """
+            Publishes the slot filled after acquire() as the latest frame
+        """
+        seq = self._next_seq
+        index = seq % self._slots
+        self._seqs[index] = seq
+        self._timestamps[index] = timestamp
+
+        view = FrameView(seq, timestamp, self._views[index])
+        with self._lock:
+            self._latest = view
+            self._next_seq = seq + 1
+        self._produced += 1
+
+        # Exponential moving average of the frame period, for the frame rate
+        if self._last_commit > 0:
+            period = timestamp - self._last_commit
+            if self._period_avg == 0:
+                self._period_avg = period
+            else:
+                self._period_avg += (period - self._period_avg) * self.FPS_SMOOTHING
+        self._last_commit = timestamp
+
+        return seq
+
+    def latest(self) -> FrameView | None:
+        """
+            Returns the latest frame, None if no frame has been produced yet
+        """
+        view = self._latest
+        if view is not None and view.seq > self._last_read_seq:
+            # Frames produced after the last read and never returned are counted as dropped
+            if self._last_read_seq > 0:
+                self._dropped += view.seq - self._last_read_seq - 1
+            self._last_read_seq = view.seq
+
+        return view
+
+    def get(self, seq: int) -> FrameView | None:
+        """
+            Returns the frame with the given sequence number if it is still in the ring
+        """
+        index = seq % self._slots
+        if not self._views or self._seqs[index] != seq:
+            return None
+
+        return FrameView(seq, self._timestamps[index], self._views[index])
+
+    def get_stats(self) -> dict:
+        return {
+            "slots": self._slots,
+            "produced": self._produced,
+            "dropped": self._dropped,
+            "latest_seq": self._next_seq - 1,
+            "fps": 1.0 / self._period_avg if self._period_avg > 0 else 0.0,
+        }
+
+    def _allocate(self, shape: tuple, dtype):
+        with self._lock:
+            self._buffers = [np.empty(shape, dtype=dtype) for _ in range(self._slots)]
+            self._views = []
+            for buffer in self._buffers:
+                view = buffer.view()
+                view.flags.writeable = False
+                self._views.append(view)
+
+            self._seqs = [0] * self._slots
+            self._latest = None
+
+
+class FramePipeline:
+    """
+        Producer stage of the video: a dedicated thread takes the frames decoded by the source
+        and stores them in a FrameRing, keeping video work away from the control thread.
+
+        source = Callable returning the last decoded frame, or None.
+                 A frame is considered new when the source returns a different array object
+    """
+
+    # ---> CONSTANTS
+    POLL_INTERVAL = 0.002  # seconds
+
+    # ---> CONSTRUCTOR
+    def __init__(self, source: Callable[[], Any], slots: int = FrameRing.DEFAULT_SLOTS):
+        self._source = source
+        self._ring = FrameRing(slots)
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self.is_running():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FramePipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.is_running():
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_ring(self) -> FrameRing:
+        return self._ring
+
+    def latest(self) -> FrameView | None:
+        return self._ring.latest()
+
+    def get_stats(self) -> dict:
+        return self._ring.get_stats()
+
+    def _run(self):
+        last_frame = None
+
+        while not self._stop_event.is_set():
+            frame = self._source()
+            if frame is None or frame is last_frame:
+                self._stop_event.wait(self.POLL_INTERVAL)
+                continue
+
+            timestamp = time.monotonic()
+            last_frame = frame
+            np.copyto(self._ring.acquire(frame.shape, frame.dtype), frame)
+            self._ring.commit(timestamp)
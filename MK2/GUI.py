@@ -1,18 +1,23 @@
 ####################################################################################################################
 # IMPORTS
-import os
+import time
 from datetime import datetime
 
+import cv2
 import pygame
+import numpy as np
 
 import tkinter as tk
 import submodules.PyUtils.TkInter.ZAGThemeTk
 
-from win32api import GetSystemMetrics
 from tkinter import ttk, messagebox, scrolledtext
+from PIL import Image, ImageTk
 
 from MK2.TelloMK2 import TelloMK2
 from MK2.Cockpit import Cockpit
+from MK2.MapRenderer import MapRenderer
+from MK2.LogView import LogView
+from MK2.Platform import configure_sdl
 from submodules.PyUtils.Logging import ZAGLogger
 
 
@@ -21,30 +26,27 @@ from submodules.PyUtils.Logging import ZAGLogger
 
 class GUI:
     # ---> ATTRIBUTES
-    window_width = int(GetSystemMetrics(0))
-    window_height = int(GetSystemMetrics(1))
-    _log_entries = []
+    window_width = 0
+    window_height = 0
     _tello = None
     _cockpit = None
 
     # ---> CONSTANTS
     DARK_THEME = "dark"
     DEFAULT_THEME = "default"
-
-    # Mapping of colors for log text
-    LOG_COLORS = {
-        "DEBUG": "cyan",
-        "INFO": "green",
-        "WARNING": "yellow",
-        "ERROR": "red",
-        "CRITICAL": "magenta",
-    }
+    LOG_REFRESH_MS = 50
+    MAP_FPS = 60
+    MAP_SCALE = 0.5  # px per cm
+    MAP_STATS_EVERY = 30  # frames
+    OVERLAY_REFRESH_MS = 250
+    STREAM_FPS = 30
+    STREAM_WIDTH = 640  # px, the height follows the aspect ratio of the frames
+    STREAM_INTERPOLATION = cv2.INTER_LINEAR
 
     # ---> CONSTRUCTOR
     def __init__(self, frame_border):
         # Initialize pygame (pygame must be initialized before tkinter)
         pygame.init()
-        self._clock = pygame.time.Clock()  # Create a Clock object for controlling the update rate
 
         # Set border for all frames for easy debug
         self._show_frame_border = frame_border
@@ -66,6 +68,10 @@ class GUI:
     def _init_root(self):
         self._root = tk.Tk()
         self._root.title("Astro-Tello")
+
+        # The screen is queried through the root, the Tello gets the same size
+        self.window_width = self._root.winfo_screenwidth()
+        self.window_height = self._root.winfo_screenheight()
         self._root.state("zoomed")
 
         # Icons must have an instance attribute to avoid that garbage collector delete them
@@ -129,68 +135,176 @@ class GUI:
                             itemType=tk.RADIOBUTTON)
         menu_btn["menu"] = menu_themes
 
+        # ---> Performance Overlay
+        self._perf_overlay = tk.BooleanVar(value=False)
+        overlay_btn = ttk.Checkbutton(frame_toolbar,
+                                      text="Performance Overlay",
+                                      variable=self._perf_overlay,
+                                      command=self._switch_perf_overlay)
+        overlay_btn.pack(side="right", padx=10)
+
     def _init_frame_streaming(self, frame_streaming):
-        pass
+        # A single PhotoImage is reused for all the frames, it is replaced only when their geometry changes
+        self._stream_photo = ImageTk.PhotoImage("RGB", (self.STREAM_WIDTH, self.STREAM_WIDTH * 3 // 4))
+        self._stream_label = ttk.Label(frame_streaming, image=self._stream_photo)
+        self._stream_label.pack(side="top")
+
+        self._overlay_label = ttk.Label(frame_streaming, text="", anchor=tk.NW, justify=tk.LEFT)
+        self._overlay_label.pack(side="top", fill="x")
+
+        self._stream_seq = 0
+        self._stream_pixels = None
+        self._stream_image = None
+
+        self._update_stream()
+        self._update_overlay()
+
+    def _update_stream(self):
+        start = time.perf_counter()
+
+        # Only the latest frame of the ring is shown, and only if it has not been shown yet
+        if self._tello is not None:
+            frame_view = self._tello.get_frame()
+            if frame_view is not None and frame_view.seq != self._stream_seq:
+                self._stream_seq = frame_view.seq
+                self._draw_stream_frame(frame_view.frame)
+
+        delay_ms = max(1, int(1000 / self.STREAM_FPS - (time.perf_counter() - start) * 1000))
+        self._root.after(delay_ms, self._update_stream)
+
+    def _draw_stream_frame(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        stream_width = self.STREAM_WIDTH
+        stream_height = stream_width * height // width
+
+        if self._stream_pixels is None or self._stream_pixels.shape[:2] != (stream_height, stream_width):
+            self._stream_pixels = np.empty((stream_height, stream_width, 3), dtype=np.uint8)
+            self._stream_image = Image.new("RGB", (stream_width, stream_height))
+            if (self._stream_photo.width(), self._stream_photo.height()) != (stream_width, stream_height):
+                self._stream_photo = ImageTk.PhotoImage("RGB", (stream_width, stream_height))
+                self._stream_label.configure(image=self._stream_photo)
+
+        # Frames of the ring are RGB as Tk wants them: resized in the preallocated buffer,
+        # unpacked in the preallocated PIL image and blitted in place in the PhotoImage ( no encoding or parsing )
+        cv2.resize(frame, (stream_width, stream_height), dst=self._stream_pixels,
+                   interpolation=self.STREAM_INTERPOLATION)
+        self._stream_image.frombytes(self._stream_pixels)
+        self._stream_photo.paste(self._stream_image)
+
+    def _switch_perf_overlay(self):
+        if self._tello is not None:
+            self._tello.set_perf_overlay(self._perf_overlay.get())
+
+    def _update_overlay(self):
+        text = ""
+        if self._tello is not None:
+            # The overlay can also be switched from the keyboard of the cockpit
+            enabled = self._tello.is_perf_overlay()
+            if enabled != self._perf_overlay.get():
+                self._perf_overlay.set(enabled)
+
+            if enabled:
+                text = "\n".join(self._tello.get_overlay_lines())
+
+        if text != self._overlay_label.cget("text"):
+            self._overlay_label.config(text=text)
+
+        self._root.after(self.OVERLAY_REFRESH_MS, self._update_overlay)
 
     def _init_frame_log(self, frame_log):
         log_text = scrolledtext.ScrolledText(frame_log, state=tk.DISABLED, wrap=tk.WORD, width=150)
         log_text.pack(fill="both", expand=True)
 
-        for tag, color_code in self.LOG_COLORS.items():
-            log_text.tag_configure(tag, foreground=color_code)
-
-        self._update_log(frame_log, log_text)
+        self._log_view = LogView(log_text)
+        self._update_log(frame_log)
 
     def _init_frame_map(self, frame_map):
         text = ttk.Label(frame_map, text="MAP Route", anchor=tk.CENTER)
         text.pack()
 
+        self._map_stats_label = ttk.Label(frame_map, text="", anchor=tk.CENTER)
+        self._map_stats_label.pack()
+
         embedded_frame = ttk.Frame(frame_map, width=self.window_width / 2, height=self.window_height)
         embedded_frame.pack()
 
-        os.environ['SDL_WINDOWID'] = str(embedded_frame.winfo_id())
-        os.environ['SDL_VIDEODRIVER'] = 'windib'
+        # pygame draws inside the Tk frame: the display is initialized again with the new SDL environment
+        configure_sdl(embedded_frame.winfo_id())
+        pygame.display.quit()
+        pygame.display.init()
 
         screen = pygame.display.set_mode((embedded_frame.winfo_width(), embedded_frame.winfo_height()))
-        self._update_pygame_frame_map(screen)
 
-    def _update_pygame_frame_map(self, py_surface):
-        GRID_COLOR = (255, 255, 255)
-        GRID_LINE_WIDTH = 1
-        GRID_SPACING = 40
+        self._map_renderer = MapRenderer(screen)
+        self._map_origin = (screen.get_width() // 2, screen.get_height() // 2)
+        self._map_marker = self._map_origin
+        self._map_trail = []
+        self._map_trail_version = 0
+        self._map_frames = 0
+        self._map_render_time = 0.0
+        self._map_stats_start = time.perf_counter()
 
-        py_surface.fill((0, 0, 255))
+        self._update_pygame_frame_map()
 
-        py_width, py_height = py_surface.get_width(), py_surface.get_height()
+    def _update_pygame_frame_map(self):
+        if self._tello is not None:
+            self._update_map_pose()
 
-        py_surface.fill((0, 0, 255))
+        # Only the regions changed since the last frame are drawn and updated on the display
+        dirty_rects = self._map_renderer.update(self._map_marker, self._map_trail, self._map_trail_version)
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
 
+        render_time = self._map_renderer.get_render_time()
+        self._update_map_stats(render_time)
 
-        pygame.draw.rect(py_surface, GRID_COLOR,
-                         (GRID_SPACING, GRID_SPACING, py_width - 2 * GRID_SPACING, py_height - 2 * GRID_SPACING), 2)
+        # The frame rate is kept by the delay of the next frame, without blocking Tk
+        delay_ms = max(1, int(1000 / self.MAP_FPS - render_time * 1000))
+        self._root.after(delay_ms, self._update_pygame_frame_map)
 
-        # Disegna la griglia orizzontale
-        for y in range(GRID_SPACING, py_height - GRID_SPACING, GRID_SPACING):
-            pygame.draw.line(py_surface, GRID_COLOR, (GRID_SPACING, y), (py_width - GRID_SPACING, y), GRID_LINE_WIDTH)
+    def _update_map_pose(self):
+        # Samples received since the last frame are integrated in a single batch
+        odometry = self._tello.get_odometry()
+        odometry.integrate()
 
-        # Disegna la griglia verticale
-        for x in range(GRID_SPACING, py_width - GRID_SPACING, GRID_SPACING):
-            pygame.draw.line(py_surface, GRID_COLOR, (x, GRID_SPACING), (x, py_height - GRID_SPACING), GRID_LINE_WIDTH)
+        origin = np.array(self._map_origin)
+        scale = np.array((self.MAP_SCALE, -self.MAP_SCALE))  # The y axis of the screen points down
 
-        pygame.draw.circle(py_surface, (255, 0, 0), (20, 10), 30)
-        pygame.display.update()
+        x, y, _, _ = odometry.get_pose()
+        self._map_marker = tuple((origin + np.array((x, y)) * scale).astype(int).tolist())
 
-        self._clock.tick(60)  # Set the update rate limit to 60 FPS
-        self._root.after(1, lambda: self._update_pygame_frame_map(py_surface))
+        # The trail is converted only when it changes, its points are bounded by the odometry
+        trail_version = odometry.get_trail_version()
+        if trail_version != self._map_trail_version:
+            self._map_trail = (origin + odometry.get_trail() * scale).astype(int).tolist()
+            self._map_trail_version = trail_version
+
+    def _update_map_stats(self, render_time: float):
+        self._map_frames += 1
+        self._map_render_time += render_time
+        if self._map_frames < self.MAP_STATS_EVERY:
+            return
+
+        now = time.perf_counter()
+        fps = self._map_frames / (now - self._map_stats_start)
+        render_ms = self._map_render_time / self._map_frames * 1000
+        self._map_stats_label.config(text=f'Render: {render_ms:.2f} ms | {fps:.0f} FPS')
+
+        self._map_frames = 0
+        self._map_render_time = 0.0
+        self._map_stats_start = now
 
     def _create_tello_instance(self):
-        self._tello = TelloMK2()
+        self._tello = TelloMK2(screen_size=(self.window_width, self.window_height))
         self._root.after(100, self._init_tello_instance)
 
     def _init_tello_instance(self):
         self._tello.initialize()
         self._cockpit = Cockpit(self._tello)
 
+        # The video is shown in the streaming frame, not in the cv2 window
+        self._cockpit.set_video_window(False)
+
     def _set_border(self, frame):
         if self._show_frame_border:
             frame.configure(borderwidth=2, relief="groove")
@@ -200,25 +314,12 @@ class GUI:
         self._current_theme = self._selected_theme.get()
         self._styler.apply_theme_recurs(self._root, self._current_theme)
 
-    def _update_log(self, log_frame, log_text):
+    def _update_log(self, log_frame):
         if self._tello is not None:
-            current_indx = len(self._log_entries)
-            self._log_entries.clear()
-            self._log_entries = self._tello.get_log_entries().copy()
-            log_text.config(state=tk.NORMAL)
-
-            for log_indx in range(current_indx, len(self._log_entries)):
-                for tag, color_code in self.LOG_COLORS.items():
-                    if tag in self._log_entries[log_indx]:
-                        log_text.insert(tk.END, self._log_entries[log_indx] + "\n", tag)
-                        break
-                else:
-                    log_text.insert(tk.END, self._log_entries[log_indx] + "\n")
-
-            log_text.see(tk.END)  # Scroll to the end
-            log_text.config(state=tk.DISABLED)
-
-        log_frame.after(10, lambda: self._update_log(log_frame, log_text))
+            # Only the entries added after the last refresh are inserted
+            self._log_view.refresh(self._tello)
+
+        log_frame.after(self.LOG_REFRESH_MS, lambda: self._update_log(log_frame))
 
 
 if __name__ == "__main__":
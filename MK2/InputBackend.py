@@ -0,0 +1,235 @@
+####################################################################################################################
+# IMPORTS
+import time
+import pygame
+import numpy as np
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import NamedTuple
+
+from KeyBindings import KeyBindings
+
+
+####################################################################################################################
+# CORE
+class InputState(NamedTuple):
+    """
+        Latest sample of the input, published by the InputSampler
+            axes = Movement axes from -1 to 1, in the order used by TelloMK2.send_rc_controlx
+            sample_time = Time of the sample ( time.perf_counter )
+            change_time = Time of the first sample in which the axes had these values
+            seq = Number of the sample
+    """
+    axes: tuple[float, float, float, float]
+    sample_time: float
+    change_time: float
+    seq: int
+
+
+class InputBackend(ABC):
+    """
+        Source of the movement axes of the cockpit. Subclasses implement read(),
+        which returns the raw axes from -1 to 1 and is called by the InputSampler.
+
+        sample() applies the response curve to the raw axes:
+            deadzone = Fraction of the stroke around the center read as 0, the rest is rescaled to 0..1
+            expo = Blend from linear ( 0 ) to cubic ( 1 ), finer control around the center
+                   with the same full-stroke value
+    """
+
+    # ---> CONSTANTS
+    AXES = 4
+
+    # ---> CONSTRUCTOR
+    def __init__(self, name: str, deadzone: float = 0.0, expo: float = 0.0):
+        if not 0 <= deadzone < 1 or not 0 <= expo <= 1:
+            raise ValueError(f'Invalid curve of {name}: deadzone {deadzone}, expo {expo}')
+
+        self.name = name
+        self._deadzone = deadzone
+        self._expo = expo
+
+    # ---> FUNCTIONS
+    @staticmethod
+    def apply_curve(values: np.ndarray, deadzone: float, expo: float) -> np.ndarray:
+        magnitude = np.clip((np.abs(values) - deadzone) / (1.0 - deadzone), 0.0, 1.0)
+        magnitude = (1.0 - expo) * magnitude + expo * magnitude ** 3
+        return np.copysign(magnitude, values)
+
+    def is_connected(self) -> bool:
+        return True
+
+    @abstractmethod
+    def read(self) -> np.ndarray:
+        pass
+
+    def sample(self) -> np.ndarray:
+        return self.apply_curve(self.read(), self._deadzone, self._expo)
+
+
+class KeyboardBackend(InputBackend):
+    """
+        Movement keys of KeyBindings: every axis is -1, 0 or 1.
+        The key states are updated by the control loop with the keyboard pumped by pygame
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self, bindings: KeyBindings):
+        super().__init__("keyboard")
+        self._bindings = bindings
+
+    # ---> FUNCTIONS
+    def read(self) -> np.ndarray:
+        return np.array(self._bindings.get_movement(1), dtype=float)
+
+    def sample(self) -> np.ndarray:
+        # The curve does not change -1, 0 and 1
+        return self.read()
+
+
+class GamepadBackend(InputBackend):
+    """
+        Analog axes of the first pygame joystick, mapped on the movement axes by the "gamepad"
+        section of kb_map.json:
+            axes = Joystick axis of each movement ( left_right, forward_backward, yaw, up_down )
+            invert = Movements with the joystick axis inverted ( e.g. sticks read -1 when pushed up )
+            deadzone, expo = Response curve of InputBackend
+
+        If no joystick is connected the backend is disabled.
+        pygame updates the joystick when the events are pumped by the control loop
+    """
+
+    # ---> CONSTANTS
+    MOVE_AXES = ("left_right", "forward_backward", "yaw", "up_down")
+    DEFAULT_DEADZONE = 0.1
+    DEFAULT_EXPO = 0.3
+
+    # ---> CONSTRUCTOR
+    def __init__(self, config: dict | None):
+        config = config or {}
+        super().__init__("gamepad",
+                         float(config.get("deadzone", self.DEFAULT_DEADZONE)),
+                         float(config.get("expo", self.DEFAULT_EXPO)))
+
+        self._joystick = None
+        self._axes = []
+        self._values = np.zeros(self.AXES)
+
+        if "axes" not in config:
+            return
+
+        pygame.joystick.init()
+        if pygame.joystick.get_count() == 0:
+            return
+
+        self._joystick = pygame.joystick.Joystick(0)
+        axes = config["axes"]
+        invert = config.get("invert", [])
+
+        # Movements without a joystick axis ( or with an axis the joystick does not have ) stay at 0
+        axis_count = self._joystick.get_numaxes()
+        self._axes = [(indx, axes[name], -1.0 if name in invert else 1.0)
+                      for indx, name in enumerate(self.MOVE_AXES)
+                      if name in axes and 0 <= axes[name] < axis_count]
+
+    # ---> FUNCTIONS
+    def is_connected(self) -> bool:
+        return self._joystick is not None
+
+    def get_device_name(self) -> str:
+        return self._joystick.get_name() if self._joystick is not None else ""
+
+    def read(self) -> np.ndarray:
+        for indx, axis, sign in self._axes:
+            self._values[indx] = sign * self._joystick.get_axis(axis)
+        return self._values
+
+
+class InputSampler:
+    """
+        Samples the input backends and publishes the latest InputState.
+
+        pygame updates the keyboard and the joystick only when the events are pumped, on the thread
+        that owns the window, so the backends are sampled right after the pump ( Cockpit.update_pressed ).
+        The main loop pumps and samples at RATE_HZ, faster than it runs the commands ( PygameController ),
+        so the state read by the commands is at most 1 / RATE_HZ older than the input.
+
+        On each axis the first backend with a non-null value wins ( e.g. keys over the gamepad sticks ).
+        A change of the axes is timestamped when it is sampled, and record_command() measures
+        the latency from it to the setpoint given to the Tello.
+        The time a keypress waits for the next pump ( up to 1 / RATE_HZ ) is not included.
+    """
+
+    # ---> CONSTANTS
+    RATE_HZ = 250
+    LATENCY_HISTORY = 256
+
+    # ---> CONSTRUCTOR
+    def __init__(self, backends: list[InputBackend]):
+        self._backends = [backend for backend in backends if backend.is_connected()]
+        self._axes = np.zeros(InputBackend.AXES)
+
+        now = time.perf_counter()
+        self._state = InputState((0.0, 0.0, 0.0, 0.0), now, now, 0)
+
+        self._first_sample = None
+        self._last_change_sent = now
+        self._latencies = deque(maxlen=self.LATENCY_HISTORY)
+
+    # ---> FUNCTIONS
+    def get_backends(self) -> list[str]:
+        return [backend.name for backend in self._backends]
+
+    def get_state(self) -> InputState:
+        return self._state
+
+    def sample(self) -> InputState:
+        """
+            Samples the backends and publishes the new state, called after pumping the events
+        """
+        axes = self._axes
+        axes[:] = 0
+        for backend in self._backends:
+            values = backend.sample()
+            np.copyto(axes, values, where=(axes == 0))
+        new_axes = tuple(axes.tolist())
+
+        now = time.perf_counter()
+        if self._first_sample is None:
+            self._first_sample = now
+
+        previous = self._state
+        change_time = previous.change_time if new_axes == previous.axes else now
+        self._state = InputState(new_axes, now, change_time, previous.seq + 1)
+        return self._state
+
+    def record_command(self, state: InputState):
+        """
+            Records that a setpoint computed from state has been given to the Tello:
+            the first one after each change of the input is a latency sample
+        """
+        if state.change_time != self._last_change_sent:
+            self._last_change_sent = state.change_time
+            self._latencies.append(time.perf_counter() - state.change_time)
+
+    def get_stats(self) -> dict:
+        """
+            Returns the statistics of the input
+                rate_hz = Actual sample rate, the rate at which the events are pumped ( target RATE_HZ )
+                latency_* = From the sample with a change of the input to the first setpoint computed from it
+        """
+        samples = self._state.seq
+        elapsed = self._state.sample_time - self._first_sample if self._first_sample is not None else 0.0
+        latencies = np.array(self._latencies) * 1000 if self._latencies else np.zeros(1)
+
+        return {
+            "backends": self.get_backends(),
+            "target_hz": self.RATE_HZ,
+            "samples": samples,
+            "rate_hz": (samples - 1) / elapsed if samples > 1 and elapsed > 0 else 0.0,
+            "latency_count": len(self._latencies),
+            "latency_avg_ms": float(latencies.mean()),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "latency_max_ms": float(latencies.max()),
+        }
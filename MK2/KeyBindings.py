@@ -0,0 +1,100 @@
+####################################################################################################################
+# IMPORTS
+import operator
+import pygame
+import numpy as np
+
+from pygame.key import ScancodeWrapper
+
+
+####################################################################################################################
+# CORE
+class KeyBindings:
+    """
+        Keyboard mapping of kb_map.json compiled once into a table of pygame key codes.
+
+        On every update, all the mapped keys are read from the ScancodeWrapper with a single
+        itemgetter call and stored in an int8 array, from which the whole movement vector
+        is computed with NumPy.
+        Function keys can be edge-triggered: they fire once per keypress and not on every
+        update while the key is held.
+        A key fired stays fired until clear_fired(), so the keys can be updated more often
+        than the commands are executed without losing keypresses.
+    """
+
+    # ---> CONSTANTS
+    # Pairs of ( positive, negative ) keys of each movement axis,
+    # in the order used by TelloMK2.send_rc_controlx
+    MOVE_AXES = (
+        ("right_yaw", "left_yaw"),
+        ("forward", "backward"),
+        ("right_clock", "left_clock"),
+        ("takeoff", "landing"),
+    )
+
+    # ---> CONSTRUCTOR
+    def __init__(self, kb_map: dict, edge_triggered: bool = True):
+        self._edge_triggered = edge_triggered
+
+        move = kb_map["move"]
+        move_keys = []
+        for positive, negative in self.MOVE_AXES:
+            move_keys.append(self.compile_key(move[positive]))
+            move_keys.append(self.compile_key(move[negative]))
+
+        self._func_names = list(kb_map["func"].keys())
+        func_keys = [self.compile_key(kb_map["func"][name]) for name in self._func_names]
+        self._func_indx = {name: indx for indx, name in enumerate(self._func_names)}
+
+        self._move_count = len(move_keys)
+        self._read_keys = operator.itemgetter(*move_keys, *func_keys)
+
+        self._states = np.zeros(self._move_count + len(func_keys), dtype=np.int8)
+        self._func_prev = np.zeros(len(func_keys), dtype=np.int8)
+        self._func_fired = np.zeros(len(func_keys), dtype=np.int8)
+
+    # ---> FUNCTIONS
+    @staticmethod
+    def compile_key(key_name: str) -> int:
+        """
+            Returns the pygame key code of a key name of kb_map.json ( e.g. "w" or "RIGHT" )
+        """
+        return getattr(pygame, 'K_{}'.format(key_name))
+
+    def update(self, key_pressed: ScancodeWrapper):
+        """
+            Reads the state of all the mapped keys and computes the function keys edges
+        """
+        self._states[:] = self._read_keys(key_pressed)
+
+        func_states = self._states[self._move_count:]
+        if self._edge_triggered:
+            np.logical_or(self._func_fired, func_states > self._func_prev, out=self._func_fired, casting="unsafe")
+        else:
+            np.logical_or(self._func_fired, func_states, out=self._func_fired, casting="unsafe")
+        self._func_prev[:] = func_states
+
+    def clear_fired(self):
+        """
+            Consumes the function keys fired, called after the commands have been executed
+        """
+        self._func_fired[:] = 0
+
+    def get_movement(self, speed: int) -> list[int]:
+        """
+            Returns the movement vector. On each axis the positive key wins if both are pressed
+        """
+        positive = self._states[0:self._move_count:2]
+        negative = self._states[1:self._move_count:2]
+
+        return (np.where(positive, 1, -negative) * speed).tolist()
+
+    def is_fired(self, func_name: str) -> bool:
+        """
+            Returns if the function key has been pressed
+            ( only on the first update of the keypress when edge-triggered )
+        """
+        return bool(self._func_fired[self._func_indx[func_name]])
+
+    def is_held(self, func_name: str) -> bool:
+        return bool(self._states[self._move_count + self._func_indx[func_name]])
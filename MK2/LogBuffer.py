@@ -0,0 +1,73 @@
+####################################################################################################################
+# IMPORTS
+import itertools
+import logging
+import threading
+import time
+
+from collections import deque
+
+
+####################################################################################################################
+# CORE
+class LogBuffer:
+    """
+        Bounded, thread-safe buffer of the log entries with increasing sequence numbers.
+
+        Readers keep a cursor ( the last sequence number read ) and only get
+        the entries added after it with entries_since(), so polling costs
+        only the new entries and not the whole log.
+        Entries are stored with their level name already parsed:
+            (seq, level_name, text)
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_CAPACITY = 5000
+
+    # ---> CONSTRUCTOR
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._last_seq = 0
+
+    # ---> FUNCTIONS
+    def append(self, level: int, msg: str, created: float | None = None):
+        """
+            Adds an entry, created is the time.time() of the log call ( now if not given )
+        """
+        level_name = logging.getLevelName(level)
+        text = f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))} | {level_name} | {msg}'
+
+        with self._lock:
+            self._last_seq += 1
+            self._entries.append((self._last_seq, level_name, text))
+
+    def entries_since(self, seq: int) -> list[tuple[int, str, str]]:
+        """
+            Returns the entries with sequence number greater than seq.
+            If some of them have already been evicted, it starts from the oldest one retained
+        """
+        with self._lock:
+            new_count = min(self._last_seq - seq, len(self._entries))
+            if new_count <= 0:
+                return []
+
+            # New entries are at the right end of the deque
+            entries = list(itertools.islice(reversed(self._entries), new_count))
+
+        entries.reverse()
+        return entries
+
+    def get_texts(self, limit: int | None = None) -> list[str]:
+        """
+            Returns the text of the last limit entries retained ( all of them if limit is None )
+        """
+        with self._lock:
+            count = len(self._entries) if limit is None else min(limit, len(self._entries))
+            entries = list(itertools.islice(reversed(self._entries), count))
+
+        entries.reverse()
+        return [text for _, _, text in entries]
+
+    def get_last_seq(self) -> int:
+        return self._last_seq
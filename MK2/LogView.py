@@ -0,0 +1,72 @@
+####################################################################################################################
+# IMPORTS
+import tkinter as tk
+
+
+####################################################################################################################
+# CORE
+class LogView:
+    """
+        Shows the log entries of a LogBuffer ( or of TelloMK2 ) in a Tk text widget.
+
+        Only the entries added after the last refresh are read, and all the new lines are inserted
+        with a single call as ( text, tag ) pairs, the tag being the level name if it is in colors.
+        The widget keeps at most max_lines lines, the oldest ones are deleted.
+    """
+
+    # ---> CONSTANTS
+    MAX_LINES = 2000
+
+    # Mapping of colors for log text
+    COLORS = {
+        "DEBUG": "cyan",
+        "INFO": "green",
+        "WARNING": "yellow",
+        "ERROR": "red",
+        "CRITICAL": "magenta",
+    }
+
+    # ---> CONSTRUCTOR
+    def __init__(self, text_widget, colors: dict[str, str] = COLORS, max_lines: int = MAX_LINES):
+        self._text = text_widget
+        self._colors = colors
+        self._max_lines = max_lines
+
+        self._seq = 0
+        self._lines = 0
+
+        for tag, color_code in colors.items():
+            text_widget.tag_configure(tag, foreground=color_code)
+
+    # ---> FUNCTIONS
+    def refresh(self, source) -> int:
+        """
+            Inserts the entries of source added since the last refresh, returns how many they are.
+            source is anything with entries_since(), e.g. LogBuffer or TelloMK2
+        """
+        new_entries = source.entries_since(self._seq)
+        if not new_entries:
+            return 0
+
+        self._seq = new_entries[-1][0]
+
+        insert_args = []
+        for _, level_name, text in new_entries:
+            insert_args.append(text + "\n")
+            insert_args.append(level_name if level_name in self._colors else ())
+
+        log_text = self._text
+        log_text.config(state=tk.NORMAL)
+        log_text.insert(tk.END, *insert_args)
+
+        # Keep only the last max_lines lines in the widget
+        self._lines += len(new_entries)
+        if self._lines > self._max_lines:
+            exceeding = self._lines - self._max_lines
+            log_text.delete("1.0", f'{exceeding + 1}.0')
+            self._lines = self._max_lines
+
+        log_text.see(tk.END)  # Scroll to the end
+        log_text.config(state=tk.DISABLED)
+
+        return len(new_entries)
@@ -0,0 +1,109 @@
+####################################################################################################################
+# IMPORTS
+import time
+import pygame
+
+
+####################################################################################################################
+# CORE
+class MapRenderer:
+    """
+        Draws the route map on a pygame surface updating only the regions that changed.
+
+        The static part ( background, border and grid ) is rendered once on a cached surface.
+        On each frame the regions covered by the moving elements ( drone marker and path trail )
+        in the previous frame are restored from the cache, the elements are drawn again
+        and only those dirty rects are returned to be passed to pygame.display.update().
+    """
+
+    # ---> CONSTANTS
+    BACKGROUND_COLOR = (0, 0, 255)
+    GRID_COLOR = (255, 255, 255)
+    GRID_LINE_WIDTH = 1
+    GRID_SPACING = 40
+    MARKER_COLOR = (255, 0, 0)
+    MARKER_RADIUS = 30
+    TRAIL_COLOR = (255, 255, 0)
+    TRAIL_WIDTH = 2
+
+    # ---> CONSTRUCTOR
+    def __init__(self, surface: pygame.Surface):
+        self._surface = surface
+        self._background = None
+        self._background_size = (0, 0)
+
+        self._last_marker = None
+        self._last_trail_version = -1
+        self._last_rects = []
+
+        self._render_time = 0.0
+
+    # ---> FUNCTIONS
+    def update(self, marker_pos: tuple[int, int], trail: list, trail_version: int) -> list[pygame.Rect]:
+        """
+            Draws the frame and returns the dirty rects to update on the display.
+            The trail is redrawn only when trail_version changes
+        """
+        start = time.perf_counter()
+
+        size = self._surface.get_size()
+        if size != self._background_size:
+            # First frame or surface resized: the whole surface is dirty
+            self._render_background(size)
+            self._surface.blit(self._background, (0, 0))
+            self._last_rects = self._draw_elements(marker_pos, trail)
+            dirty_rects = [self._surface.get_rect()]
+
+        elif marker_pos == self._last_marker and trail_version == self._last_trail_version:
+            dirty_rects = []
+
+        else:
+            # Restore the background where the elements were, then draw them in the new position
+            for rect in self._last_rects:
+                self._surface.blit(self._background, rect, rect)
+
+            new_rects = self._draw_elements(marker_pos, trail)
+            dirty_rects = self._last_rects + new_rects
+            self._last_rects = new_rects
+
+        self._last_marker = marker_pos
+        self._last_trail_version = trail_version
+        self._render_time = time.perf_counter() - start
+
+        return dirty_rects
+
+    def get_render_time(self) -> float:
+        """
+            Returns the seconds spent to render the last frame
+        """
+        return self._render_time
+
+    def _draw_elements(self, marker_pos: tuple[int, int], trail: list) -> list[pygame.Rect]:
+        rects = []
+        if len(trail) > 1:
+            rects.append(pygame.draw.lines(self._surface, self.TRAIL_COLOR, False, trail, self.TRAIL_WIDTH))
+
+        rects.append(pygame.draw.circle(self._surface, self.MARKER_COLOR, marker_pos, self.MARKER_RADIUS))
+        return rects
+
+    def _render_background(self, size: tuple[int, int]):
+        py_width, py_height = size
+        background = pygame.Surface(size).convert()
+        background.fill(self.BACKGROUND_COLOR)
+
+        pygame.draw.rect(background, self.GRID_COLOR,
+                         (self.GRID_SPACING, self.GRID_SPACING,
+                          py_width - 2 * self.GRID_SPACING, py_height - 2 * self.GRID_SPACING), 2)
+
+        # Horizontal grid
+        for y in range(self.GRID_SPACING, py_height - self.GRID_SPACING, self.GRID_SPACING):
+            pygame.draw.line(background, self.GRID_COLOR,
+                             (self.GRID_SPACING, y), (py_width - self.GRID_SPACING, y), self.GRID_LINE_WIDTH)
+
+        # Vertical grid
+        for x in range(self.GRID_SPACING, py_width - self.GRID_SPACING, self.GRID_SPACING):
+            pygame.draw.line(background, self.GRID_COLOR,
+                             (x, self.GRID_SPACING), (x, py_height - self.GRID_SPACING), self.GRID_LINE_WIDTH)
+
+        self._background = background
+        self._background_size = size
@@ -0,0 +1,353 @@
+####################################################################################################################
+# IMPORTS
+import json
+import math
+import time
+import numpy as np
+
+from pathlib import Path
+
+from Odometry import Odometry
+from PathReplay import ReplayPlan
+from CommandPipeline import CommandStep
+
+
+####################################################################################################################
+# CORE
+class MissionPlan:
+    """
+        Mission compiled in RC setpoints, one for each tick of 1 / rate_hz seconds.
+
+        Columns are in the order of TelloMK2.send_rc_controlx, which forwards its third argument
+        as the yaw rate and the fourth as the vertical speed ( see TelloMK2._send_rc_setpoint ),
+        as the keyboard axes of KeyBindings do
+    """
+
+    # ---> CONSTANTS
+    COL_LEFT_RIGHT = 0
+    COL_FORWARD_BACKWARD = 1
+    COL_YAW = 2
+    COL_UP_DOWN = 3
+
+    # ---> CONSTRUCTOR
+    def __init__(self, name: str, setpoints: np.ndarray, rate_hz: float):
+        self.name = name
+        self._setpoints = setpoints
+        self._rate_hz = rate_hz
+
+    # ---> FUNCTIONS
+    def get_setpoints(self) -> np.ndarray:
+        return self._setpoints
+
+    def get_setpoint(self, tick: int) -> tuple[int, int, int, int]:
+        return tuple(int(axis) for axis in self._setpoints[tick])
+
+    def get_rate(self) -> float:
+        return self._rate_hz
+
+    def get_duration(self) -> float:
+        return len(self._setpoints) / self._rate_hz
+
+    def to_replay_plan(self) -> ReplayPlan:
+        """
+            Returns the plan as a ReplayPlan, played by ReplayEngine at the rate of the mission.
+            Consecutive identical setpoints ( e.g. a constant speed or a hold ) are merged in one step
+        """
+        plan = ReplayPlan()
+        tick = 1.0 / self._rate_hz
+        for setpoint in self._setpoints.tolist():
+            plan.add_step(tuple(setpoint), tick)
+
+        return plan
+
+    def __len__(self) -> int:
+        return len(self._setpoints)
+
+
+class HoldCondition:
+    """
+        State condition of a CommandStep met after a time from its first check: it holds the position
+        in a command sequence. It is re-armed when met, so the sequence can be run again
+    """
+
+    def __init__(self, seconds: float):
+        self._seconds = seconds
+        self._end = None
+
+    def __call__(self) -> bool:
+        now = time.monotonic()
+        if self._end is None:
+            self._end = now + self._seconds
+
+        if now < self._end:
+            return False
+
+        self._end = None
+        return True
+
+
+class Mission:
+    """
+        Scripted mission loaded from a JSON or YAML file ( next to res/kb_map.json ) and compiled before the flight,
+        so no planning is done while flying.
+
+        File format ( JSON, or the same structure in YAML ):
+            {
+              "mission": {
+                "name": "square",
+                "mode": "rc",             rc = RC setpoints streamed at rate_hz, go = SDK go / cw / ccw commands
+                "rate_hz": 20,
+                "max_speed": 40,          cm/s
+                "max_accel": 40,          cm/s^2, 0 for no limit
+                "max_yaw_rate": 45,       deg/s
+                "max_yaw_accel": 90,      deg/s^2, 0 for no limit
+                "smoothing": 0.25,        seconds of the moving average of the setpoints, 0 for none
+                "waypoints": [ {"x": 0, "y": 100, "z": 0, "yaw": 90, "hold": 1.0}, ... ]
+              }
+            }
+        Waypoints are in cm from the take-off point, in the map frame of Odometry ( y is forward at the start,
+        yaw is the heading in degrees clockwise ). Missing values are kept from the previous waypoint.
+        The drone turns to the yaw of the waypoint, then flies straight to its position and holds it.
+
+        In place of the waypoints, an rc mission can list the setpoints of a trajectory:
+            "trajectory": [ {"forward_backward": 30, "left_right": 0, "up_down": 0, "yaw": 0, "duration": 2.0}, ... ]
+
+        Compiling in rc mode, each move follows a trapezoidal speed profile within the speed and acceleration
+        limits, then the setpoints are smoothed with a moving average and rounded with the error carried
+        to the next tick, so the distance flown is not changed by the smoothing or by the rounding.
+    """
+
+    # ---> CONSTANTS
+    MODE_RC = "rc"
+    MODE_GO = "go"
+    MODES = (MODE_RC, MODE_GO)
+    DEFAULTS = {
+        "name": "mission",
+        "mode": MODE_RC,
+        "rate_hz": 20,
+        "max_speed": 40,
+        "max_accel": 40,
+        "max_yaw_rate": 45,
+        "max_yaw_accel": 90,
+        "smoothing": 0.25,
+    }
+    RC_LIMIT = 100
+
+    # SDK limits of the go command
+    GO_MAX_DISTANCE = 500  # cm on each axis
+    GO_MIN_DISTANCE = 20  # cm, shorter moves on every axis are refused
+    GO_SPEED_RANGE = (10, 100)  # cm/s
+    GO_TIMEOUT_MARGIN = 5.0  # seconds over the time of the move
+
+    # ---> CONSTRUCTOR
+    def __init__(self, content: dict):
+        """
+            content = The "mission" object of a mission file
+        """
+        settings = dict(self.DEFAULTS)
+        settings.update(content)
+
+        self.name = str(settings["name"])
+        self.mode = settings["mode"]
+        if self.mode not in self.MODES:
+            raise ValueError(f'Unsupported mission mode: {self.mode}')
+
+        self.rate_hz = float(settings["rate_hz"])
+        self.max_speed = float(settings["max_speed"])
+        self.max_accel = float(settings["max_accel"])
+        self.max_yaw_rate = float(settings["max_yaw_rate"])
+        self.max_yaw_accel = float(settings["max_yaw_accel"])
+        self.smoothing = float(settings["smoothing"])
+
+        self.waypoints = list(settings.get("waypoints", []))
+        self.trajectory = list(settings.get("trajectory", []))
+        if not self.waypoints and not self.trajectory:
+            raise ValueError(f'Mission {self.name} has no waypoints and no trajectory')
+        if self.trajectory and self.mode == self.MODE_GO:
+            raise ValueError(f'Mission {self.name}: a trajectory can only be flown in rc mode')
+
+    # ---> FUNCTIONS
+    @classmethod
+    def load(cls, path: str | Path) -> "Mission":
+        """
+            Loads a mission from a .json, .yaml or .yml file
+        """
+        path = Path(path)
+        with open(path, "r") as file:
+            if path.suffix.lower() in (".yaml", ".yml"):
+                import yaml  # Optional dependency, only needed for YAML missions
+                content = yaml.safe_load(file)
+            else:
+                content = json.load(file)
+
+        return cls(content["mission"])
+
+    def compile(self) -> MissionPlan:
+        """
+            Compiles the mission in the RC setpoints of each tick
+        """
+        if self.trajectory:
+            velocities = self._compile_trajectory()
+        else:
+            velocities = self._compile_waypoints()
+
+        # Moving average: the sum of each column, so the distance flown, is kept
+        window = max(1, int(round(self.smoothing * self.rate_hz)))
+        if window > 1 and len(velocities) > 0:
+            kernel = np.full(window, 1.0 / window)
+            velocities = np.column_stack([np.convolve(velocities[:, col], kernel) for col in range(4)])
+
+        # Rounding with the error carried to the next tick
+        totals = np.round(np.cumsum(velocities, axis=0))
+        setpoints = np.diff(totals, axis=0, prepend=np.zeros((1, 4)))
+        np.clip(setpoints, -self.RC_LIMIT, self.RC_LIMIT, out=setpoints)
+
+        return MissionPlan(self.name, setpoints.astype(np.int16), self.rate_hz)
+
+    def compile_commands(self) -> list[CommandStep]:
+        """
+            Compiles the waypoints in SDK commands for the command pipeline of TelloMK2.
+            Moves are not retried, a lost ack would fly them twice
+        """
+        speed = int(np.clip(self.max_speed, *self.GO_SPEED_RANGE))
+
+        steps = []
+        position, heading = np.zeros(3), 0.0
+        for waypoint in self.waypoints:
+            target = self._waypoint_position(waypoint, position)
+
+            if "yaw" in waypoint:
+                delta = self._yaw_delta(heading, waypoint["yaw"])
+                if round(delta) != 0:
+                    command = f'{"cw" if delta > 0 else "ccw"} {abs(round(delta))}'
+                    steps.append(CommandStep(command,
+                                             timeout=abs(delta) / self.max_yaw_rate + self.GO_TIMEOUT_MARGIN,
+                                             retries=0))
+                heading = float(waypoint["yaw"]) % 360
+
+            # go x y z: x forward, y left, z up
+            left_right, forward_backward, up_down = self._to_body_frame(target - position, heading)
+            move = np.array((forward_backward, -left_right, up_down))
+            chunks = max(1, math.ceil(np.abs(move).max() / self.GO_MAX_DISTANCE))
+            chunk = np.round(move / chunks).astype(int)
+            if np.abs(chunk).max() >= self.GO_MIN_DISTANCE:
+                timeout = np.linalg.norm(chunk) / speed + self.GO_TIMEOUT_MARGIN
+                for _ in range(chunks):
+                    steps.append(CommandStep(f'go {chunk[0]} {chunk[1]} {chunk[2]} {speed}', timeout=timeout, retries=0))
+            position = target
+
+            hold = float(waypoint.get("hold", 0))
+            if hold > 0:
+                steps.append(CommandStep(None, until=HoldCondition(hold), until_timeout=hold + 1.0, required=False))
+
+        return steps
+
+    def _compile_trajectory(self) -> np.ndarray:
+        rows = []
+        for step in self.trajectory:
+            ticks = int(round(float(step["duration"]) * self.rate_hz))
+            setpoint = np.zeros(4)
+            setpoint[MissionPlan.COL_LEFT_RIGHT] = step.get("left_right", 0)
+            setpoint[MissionPlan.COL_FORWARD_BACKWARD] = step.get("forward_backward", 0)
+            setpoint[MissionPlan.COL_UP_DOWN] = step.get("up_down", 0)
+            setpoint[MissionPlan.COL_YAW] = step.get("yaw", 0)
+            rows.append(np.repeat(setpoint[None, :], ticks, axis=0))
+
+        velocities = np.concatenate(rows) if rows else np.zeros((0, 4))
+
+        # Speed limits of the mission
+        speed_limit = self.max_speed / Odometry.RC_SPEED_SCALE
+        yaw_limit = self.max_yaw_rate / Odometry.RC_YAW_SCALE
+        limits = np.full(4, speed_limit)
+        limits[MissionPlan.COL_YAW] = yaw_limit
+        return np.clip(velocities, -limits, limits)
+
+    def _compile_waypoints(self) -> np.ndarray:
+        dt = 1.0 / self.rate_hz
+        segments = []
+
+        position, heading = np.zeros(3), 0.0
+        for waypoint in self.waypoints:
+            target = self._waypoint_position(waypoint, position)
+
+            # Turn to the yaw of the waypoint
+            if "yaw" in waypoint:
+                delta = self._yaw_delta(heading, waypoint["yaw"])
+                steps = self._profile(abs(delta), self.max_yaw_rate, self.max_yaw_accel, dt)
+                segment = np.zeros((len(steps), 4))
+                segment[:, MissionPlan.COL_YAW] = math.copysign(1.0, delta) * steps / dt / Odometry.RC_YAW_SCALE
+                segments.append(segment)
+                heading = float(waypoint["yaw"]) % 360
+
+            # Straight to the position, with the heading fixed
+            displacement = target - position
+            distance = float(np.linalg.norm(displacement))
+            if distance > 0:
+                steps = self._profile(distance, self.max_speed, self.max_accel, dt)
+                speeds = steps / dt / Odometry.RC_SPEED_SCALE
+                left_right, forward_backward, up_down = self._to_body_frame(displacement / distance, heading)
+
+                segment = np.zeros((len(steps), 4))
+                segment[:, MissionPlan.COL_LEFT_RIGHT] = speeds * left_right
+                segment[:, MissionPlan.COL_FORWARD_BACKWARD] = speeds * forward_backward
+                segment[:, MissionPlan.COL_UP_DOWN] = speeds * up_down
+                segments.append(segment)
+            position = target
+
+            hold_ticks = int(round(float(waypoint.get("hold", 0)) * self.rate_hz))
+            segments.append(np.zeros((hold_ticks, 4)))
+
+        return np.concatenate(segments) if segments else np.zeros((0, 4))
+
+    @staticmethod
+    def _waypoint_position(waypoint: dict, position: np.ndarray) -> np.ndarray:
+        target = position.copy()
+        for axis, key in enumerate(("x", "y", "z")):
+            if key in waypoint:
+                target[axis] = float(waypoint[key])
+        return target
+
+    @staticmethod
+    def _yaw_delta(heading: float, yaw: float) -> float:
+        # Shortest turn, in ( -180, 180 ]
+        delta = (float(yaw) - heading) % 360
+        return delta - 360 if delta > 180 else delta
+
+    @staticmethod
+    def _to_body_frame(vector: np.ndarray, heading: float) -> tuple[float, float, float]:
+        # Inverse of the rotation of Odometry ( heading clockwise from the y axis )
+        heading_rad = math.radians(heading)
+        sin_h, cos_h = math.sin(heading_rad), math.cos(heading_rad)
+        left_right = vector[0] * cos_h - vector[1] * sin_h
+        forward_backward = vector[0] * sin_h + vector[1] * cos_h
+        return left_right, forward_backward, vector[2]
+
+    @staticmethod
+    def _profile(distance: float, max_speed: float, max_accel: float, dt: float) -> np.ndarray:
+        """
+            Returns the distance covered in each tick by a trapezoidal speed profile
+            ( triangular if the maximum speed is not reached ), 0 max_accel for no acceleration limit
+        """
+        if distance <= 0:
+            return np.zeros(0)
+
+        if max_accel <= 0:
+            accel_time, peak = 0.0, max_speed
+        else:
+            accel_time = max_speed / max_accel
+            peak = max_speed
+            if max_accel * accel_time ** 2 > distance:
+                accel_time = math.sqrt(distance / max_accel)
+                peak = max_accel * accel_time
+
+        accel_distance = 0.5 * max_accel * accel_time ** 2 if max_accel > 0 else 0.0
+        cruise_time = (distance - 2 * accel_distance) / peak
+        total_time = 2 * accel_time + cruise_time
+
+        t = np.minimum(np.arange(math.ceil(total_time / dt) + 1) * dt, total_time)
+        covered = np.where(t < accel_time,
+                           0.5 * max_accel * t ** 2,
+                           np.where(t < accel_time + cruise_time,
+                                    accel_distance + peak * (t - accel_time),
+                                    distance - 0.5 * max_accel * (total_time - t) ** 2))
+        return np.diff(covered)
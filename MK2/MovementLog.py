@@ -0,0 +1,148 @@
+####################################################################################################################
+# IMPORTS
+import time
+
+from array import array
+from typing import Callable
+
+
+####################################################################################################################
+# CORE
+class MovementLog:
+    """
+        Columnar log of the RC setpoints sent to the drone.
+
+        Setpoints are stored in typed arrays ( one int8 column per axis ) with run-length encoding:
+        consecutive identical setpoints are merged into a single run that keeps
+        the number of ticks and the timestamps of its first and last tick.
+        Memory is bounded: when the capacity is reached, the oldest run is evicted ( ring buffer ).
+
+        Axes are in the order used by TelloMK2.send_rc_controlx
+            (left_right, forward_backward, up_down, yaw)
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_CAPACITY = 65536  # runs
+
+    # ---> CONSTRUCTOR
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._capacity = capacity
+
+        self._left_right = array('b', bytes(capacity))
+        self._forward_backward = array('b', bytes(capacity))
+        self._up_down = array('b', bytes(capacity))
+        self._yaw = array('b', bytes(capacity))
+        self._counts = array('I', bytes(4 * capacity))
+        self._start_ts = array('d', bytes(8 * capacity))
+        self._end_ts = array('d', bytes(8 * capacity))
+
+        self._head = 0  # Index of the oldest run
+        self._size = 0
+        self._ticks = 0
+        self._evicted = 0
+
+    # ---> FUNCTIONS
+    def append(self,
+               left_right: int,
+               forward_backward: int,
+               up_down: int,
+               yaw: int,
+               timestamp: float | None = None,
+               count: int = 1):
+        """
+            Logs a setpoint held for count ticks, merging it with the last run if identical
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        if self._size > 0:
+            last = (self._head + self._size - 1) % self._capacity
+            if (self._left_right[last] == left_right and self._forward_backward[last] == forward_backward
+                    and self._up_down[last] == up_down and self._yaw[last] == yaw):
+                self._counts[last] += count
+                self._end_ts[last] = timestamp
+                self._ticks += count
+                return
+
+        if self._size == self._capacity:
+            self._ticks -= self._counts[self._head]
+            self._head = (self._head + 1) % self._capacity
+            self._size -= 1
+            self._evicted += 1
+
+        indx = (self._head + self._size) % self._capacity
+        self._left_right[indx] = left_right
+        self._forward_backward[indx] = forward_backward
+        self._up_down[indx] = up_down
+        self._yaw[indx] = yaw
+        self._counts[indx] = count
+        self._start_ts[indx] = timestamp
+        self._end_ts[indx] = timestamp
+
+        self._size += 1
+        self._ticks += count
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self._ticks = 0
+
+    def drop_newest(self, runs: int):
+        """
+            Removes the newest runs, e.g. the moves already flown back by a return home that has been aborted
+        """
+        for _ in range(min(runs, self._size)):
+            last = (self._head + self._size - 1) % self._capacity
+            self._ticks -= self._counts[last]
+            self._size -= 1
+
+    def for_each(self,
+                 callback: Callable[[int, int, int, int, int, float, float], None],
+                 reverse: bool = False):
+        """
+            Calls callback(left_right, forward_backward, up_down, yaw, count, start_ts, end_ts)
+            for every run, from the oldest to the newest ( or the opposite if reverse ).
+            Values are passed as scalars, so no object is allocated per run
+        """
+        runs = range(self._size - 1, -1, -1) if reverse else range(self._size)
+        for run in runs:
+            indx = (self._head + run) % self._capacity
+            callback(self._left_right[indx],
+                     self._forward_backward[indx],
+                     self._up_down[indx],
+                     self._yaw[indx],
+                     self._counts[indx],
+                     self._start_ts[indx],
+                     self._end_ts[indx])
+
+    def get_run(self, run: int) -> tuple[int, int, int, int, int, float, float]:
+        """
+            Returns ( left_right, forward_backward, up_down, yaw, count, start_ts, end_ts ) of a run,
+            0 being the oldest
+        """
+        if not 0 <= run < self._size:
+            raise IndexError(run)
+
+        indx = (self._head + run) % self._capacity
+        return (self._left_right[indx],
+                self._forward_backward[indx],
+                self._up_down[indx],
+                self._yaw[indx],
+                self._counts[indx],
+                self._start_ts[indx],
+                self._end_ts[indx])
+
+    def get_ticks(self) -> int:
+        return self._ticks
+
+    def get_evicted(self) -> int:
+        return self._evicted
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
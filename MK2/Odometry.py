@@ -0,0 +1,270 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+import numpy as np
+
+
+####################################################################################################################
+# CORE
+class Odometry:
+    """
+        Dead-reckoning estimate of the drone pose ( x, y, z in cm and heading in degrees )
+        relative to the point where the estimate started.
+
+        Two sources of samples are accepted:
+            state  = Packets of the state stream ( vgx, vgy, vgz, yaw, tof, baro )
+            rc     = RC setpoints sent to the drone, converted to velocities with RC_SPEED_SCALE
+        The state stream is a measure, so RC setpoints are integrated only while it is not received.
+
+        Samples are only stored when added, they are integrated in NumPy batches by integrate().
+        When a buffer fills up, its batch is set aside and integrated at once by the thread that
+        filled it, so the estimate advances even if nobody calls integrate(). Samples are dropped
+        ( and counted ) only if MAX_PENDING_BATCHES batches are still waiting to be integrated.
+        The trail of the path is decimated to at most MAX_TRAIL_POINTS points:
+        when it is full, every other point is dropped and the minimum step between points is doubled.
+    """
+
+    # ---> CONSTANTS
+    BATCH_SIZE = 1024
+    MAX_PENDING_BATCHES = 4
+    RC_SPEED_SCALE = 1.0  # cm/s per RC unit
+    RC_YAW_SCALE = 1.0  # deg/s per RC unit
+    STATE_TIMEOUT = 0.5  # seconds without packets before falling back on RC setpoints
+    TOF_MIN = 10  # cm, the tof sensor reads 10 when out of range
+    MAX_TRAIL_POINTS = 512
+    TRAIL_MIN_STEP = 5.0  # cm
+
+    # Columns of the sample buffers
+    _RC_COLS = 5  # t, left_right, forward_backward, up_down, yaw
+    _STATE_COLS = 6  # t, vgx, vgy, vgz, yaw, height
+
+    # ---> CONSTRUCTOR
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._integrate_lock = threading.Lock()
+
+        self._rc_samples = np.empty((self.BATCH_SIZE, self._RC_COLS))
+        self._rc_count = 0
+        self._state_samples = np.empty((self.BATCH_SIZE, self._STATE_COLS))
+        self._state_count = 0
+        self._last_state_time = -np.inf
+
+        # Full batches waiting to be integrated
+        self._rc_batches = []
+        self._state_batches = []
+        self._dropped = 0
+
+        self.reset()
+
+    # ---> FUNCTIONS
+    def reset(self):
+        with self._lock:
+            self._rc_count = 0
+            self._state_count = 0
+            self._rc_batches.clear()
+            self._state_batches.clear()
+
+        self._position = np.zeros(3)
+        self._heading = 0.0
+        self._yaw_offset = None
+
+        self._last_rc = None  # ( t, left_right, forward_backward, up_down, yaw )
+        self._last_state = None  # ( t, vgx, vgy, vgz, yaw, height )
+
+        self._trail = np.zeros((self.MAX_TRAIL_POINTS, 2))
+        self._trail_count = 0
+        self._trail_step = self.TRAIL_MIN_STEP
+        self._trail_version = 0
+        self._trail_arc = 0.0  # cm travelled since the trail started
+        self._trail_last = np.zeros(2)
+
+    def add_setpoint(self, left_right: int, forward_backward: int, up_down: int, yaw: int):
+        """
+            Adds an RC setpoint as sent on the wire ( order of djitellopy send_rc_control )
+        """
+        with self._lock:
+            if self._rc_count == self.BATCH_SIZE and not self._set_aside_rc():
+                self._dropped += 1
+                return
+            self._rc_samples[self._rc_count] = (time.monotonic(), left_right, forward_backward, up_down, yaw)
+            self._rc_count += 1
+            full = self._rc_count == self.BATCH_SIZE and self._set_aside_rc()
+
+        if full:
+            self.integrate()
+
+    def add_state(self, state: dict):
+        """
+            Adds a packet of the state stream
+        """
+        height = state.get("tof", 0)
+        if height <= self.TOF_MIN:
+            height = state.get("baro", 0) * 100
+
+        now = time.monotonic()
+        with self._lock:
+            self._last_state_time = now
+            if self._state_count == self.BATCH_SIZE and not self._set_aside_state():
+                self._dropped += 1
+                return
+            self._state_samples[self._state_count] = (now,
+                                                      state.get("vgx", 0),
+                                                      state.get("vgy", 0),
+                                                      state.get("vgz", 0),
+                                                      state.get("yaw", 0),
+                                                      height)
+            self._state_count += 1
+            full = self._state_count == self.BATCH_SIZE and self._set_aside_state()
+
+        if full:
+            self.integrate()
+
+    def integrate(self):
+        """
+            Integrates all the samples added since the last call
+        """
+        # Batches are taken and integrated under the same lock, so they are integrated in order
+        # also when integrate() is called by the thread that filled a buffer
+        with self._integrate_lock:
+            with self._lock:
+                rc = np.concatenate(self._rc_batches + [self._rc_samples[:self._rc_count]])
+                state = np.concatenate(self._state_batches + [self._state_samples[:self._state_count]])
+                self._rc_batches.clear()
+                self._state_batches.clear()
+                self._rc_count = 0
+                self._state_count = 0
+                state_alive = time.monotonic() - self._last_state_time <= self.STATE_TIMEOUT
+
+            if len(state):
+                self._integrate_state(state)
+
+            if len(rc):
+                if state_alive:
+                    # Keep only the last setpoint, to restart from it if the state stream is lost
+                    self._last_rc = tuple(rc[-1])
+                else:
+                    self._integrate_rc(rc)
+
+    def get_dropped(self) -> int:
+        """
+            Returns the number of samples dropped because the integration was behind
+        """
+        return self._dropped
+
+    def get_pose(self) -> tuple[float, float, float, float]:
+        """
+            Returns ( x, y, z, heading ), in cm and degrees
+        """
+        return self._position[0], self._position[1], self._position[2], self._heading
+
+    def get_trail(self) -> np.ndarray:
+        """
+            Returns the decimated trail as a read-only ( n, 2 ) array of x, y in cm
+        """
+        trail = self._trail[:self._trail_count]
+        trail.flags.writeable = False
+        return trail
+
+    def get_trail_version(self) -> int:
+        """
+            Returns a number that changes every time the trail changes
+        """
+        return self._trail_version
+
+    def _set_aside_rc(self) -> bool:
+        # Called with the lock held when the buffer is full
+        if len(self._rc_batches) == self.MAX_PENDING_BATCHES:
+            return False
+
+        self._rc_batches.append(self._rc_samples[:self._rc_count].copy())
+        self._rc_count = 0
+        return True
+
+    def _set_aside_state(self) -> bool:
+        # Called with the lock held when the buffer is full
+        if len(self._state_batches) == self.MAX_PENDING_BATCHES:
+            return False
+
+        self._state_batches.append(self._state_samples[:self._state_count].copy())
+        self._state_count = 0
+        return True
+
+    def _integrate_rc(self, samples: np.ndarray):
+        # Each setpoint is held from its time to the time of the next one
+        if self._last_rc is None:
+            self._last_rc = tuple(samples[0])
+
+        held = np.vstack((self._last_rc, samples[:-1]))
+        dt = np.diff(np.concatenate(([self._last_rc[0]], samples[:, 0])))
+        self._last_rc = tuple(samples[-1])
+
+        left_right, forward_backward, up_down, yaw = held[:, 1], held[:, 2], held[:, 3], held[:, 4]
+
+        # Heading at the start of each interval
+        yaw_steps = yaw * self.RC_YAW_SCALE * dt
+        headings = self._heading + np.concatenate(([0.0], np.cumsum(yaw_steps)[:-1]))
+        heading_rad = np.radians(headings)
+        sin_h, cos_h = np.sin(heading_rad), np.cos(heading_rad)
+
+        # Body velocities rotated in the map frame ( heading clockwise from the y axis )
+        speed_dt = self.RC_SPEED_SCALE * dt
+        dx = (forward_backward * sin_h + left_right * cos_h) * speed_dt
+        dy = (forward_backward * cos_h - left_right * sin_h) * speed_dt
+        dz = up_down * speed_dt
+
+        path = self._position[:2] + np.cumsum(np.column_stack((dx, dy)), axis=0)
+        self._position[:2] = path[-1]
+        self._position[2] += dz.sum()
+        self._heading = (self._heading + yaw_steps.sum()) % 360
+
+        self._add_to_trail(path)
+
+    def _integrate_state(self, samples: np.ndarray):
+        if self._last_state is None:
+            self._last_state = tuple(samples[0])
+
+        held = np.vstack((self._last_state, samples[:-1]))
+        dt = np.diff(np.concatenate(([self._last_state[0]], samples[:, 0])))
+        self._last_state = tuple(samples[-1])
+
+        # Velocities are in dm/s, in the frame of the Tello at the start ( x forward, y left ):
+        # in the map frame x is right ( -vgy ) and y is forward ( vgx )
+        steps = np.column_stack((-held[:, 2], held[:, 1])) * 10 * dt[:, None]
+        path = self._position[:2] + np.cumsum(steps, axis=0)
+        self._position[:2] = path[-1]
+        self._position[2] = samples[-1, 5]
+
+        # The yaw of the drone is absolute: the heading is relative to the first packet
+        if self._yaw_offset is None:
+            self._yaw_offset = samples[0, 4]
+        self._heading = (samples[-1, 4] - self._yaw_offset) % 360
+
+        self._add_to_trail(path)
+
+    def _add_to_trail(self, path: np.ndarray):
+        if self._trail_count == 0:
+            self._trail[0] = path[0]
+            self._trail_count = 1
+            self._trail_arc = 0.0
+            self._trail_last = path[0]
+
+        # A point is added every time the travelled distance crosses a multiple of the trail step
+        segments = np.hypot(*np.diff(np.vstack((self._trail_last, path)), axis=0).T)
+        arc = self._trail_arc + np.cumsum(segments)
+        marks = np.floor(arc / self._trail_step)
+        crossed = marks > np.concatenate(([np.floor(self._trail_arc / self._trail_step)], marks[:-1]))
+
+        self._trail_arc = arc[-1]
+        self._trail_last = path[-1]
+
+        for point in path[crossed]:
+            if self._trail_count == self.MAX_TRAIL_POINTS:
+                kept = self._trail[::2].copy()
+                self._trail_count = len(kept)
+                self._trail[:self._trail_count] = kept
+                self._trail_step *= 2
+
+            self._trail[self._trail_count] = point
+            self._trail_count += 1
+            self._trail_version += 1
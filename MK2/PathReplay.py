@@ -0,0 +1,265 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+
+from array import array
+from typing import Callable
+
+from MovementLog import MovementLog
+from EmergencyStop import EmergencyStop
+
+
+####################################################################################################################
+# CORE
+class ReplayPlan:
+    """
+        Sequence of RC setpoints, each one held for a duration in seconds.
+        Consecutive identical setpoints are merged into a single step.
+        Steps are stored in typed arrays ( 4 int8 values per setpoint ), as the runs of MovementLog.
+
+        Axes are in the order used by TelloMK2.send_rc_controlx
+            (left_right, forward_backward, up_down, yaw)
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_TICK_PERIOD = 0.05  # seconds, used when the tick period cannot be measured from the log
+
+    # ---> CONSTRUCTOR
+    def __init__(self):
+        self._setpoints = array('b')
+        self._durations = array('d')
+
+    # ---> FUNCTIONS
+    @classmethod
+    def from_log(cls, movement_log: MovementLog, reverse: bool = False) -> "ReplayPlan":
+        """
+            Compiles a plan from the timestamped runs of a MovementLog.
+            The duration of a run is the time elapsed until the start of the next one,
+            the last run lasts its ticks plus one tick.
+
+            With reverse, the runs are played from the last to the first with all the axes inverted:
+            it is the path to fly back to the starting point
+        """
+        plan = cls()
+        if not movement_log:
+            return plan
+
+        tick_period = cls._measure_tick_period(movement_log)
+
+        # The runs are visited from the newest, so the start of the following run is always known.
+        # The reversed plan is built directly in this order, the forward one is compiled reversed
+        # and its columns are flipped at the end
+        next_start = None
+
+        def add_run(left_right, forward_backward, up_down, yaw, count, start_ts, end_ts):
+            nonlocal next_start
+            if next_start is None:
+                duration = end_ts - start_ts + tick_period
+            else:
+                duration = next_start - start_ts
+            next_start = start_ts
+
+            if reverse:
+                plan._add(-left_right, -forward_backward, -up_down, -yaw, duration)
+            else:
+                plan._add(left_right, forward_backward, up_down, yaw, duration)
+
+        movement_log.for_each(add_run, reverse=True)
+        if not reverse:
+            plan._flip()
+
+        return plan
+
+    def add_step(self, setpoint: tuple[int, int, int, int], duration: float):
+        self._add(*setpoint, duration)
+
+    def get_step(self, step: int) -> tuple[tuple[int, int, int, int], float]:
+        indx = 4 * step
+        return tuple(self._setpoints[indx:indx + 4]), self._durations[step]
+
+    def get_duration(self) -> float:
+        return sum(self._durations)
+
+    def __len__(self) -> int:
+        return len(self._durations)
+
+    def _add(self, left_right: int, forward_backward: int, up_down: int, yaw: int, duration: float):
+        last = len(self._setpoints) - 4
+        if (last >= 0 and self._setpoints[last] == left_right and self._setpoints[last + 1] == forward_backward
+                and self._setpoints[last + 2] == up_down and self._setpoints[last + 3] == yaw):
+            self._durations[-1] += duration
+        else:
+            self._setpoints.extend((left_right, forward_backward, up_down, yaw))
+            self._durations.append(duration)
+
+    def _flip(self):
+        # Reverses the order of the steps in place, then puts back in order the axes of each setpoint
+        self._setpoints.reverse()
+        self._durations.reverse()
+
+        setpoints = self._setpoints
+        for indx in range(0, len(setpoints), 4):
+            setpoints[indx], setpoints[indx + 3] = setpoints[indx + 3], setpoints[indx]
+            setpoints[indx + 1], setpoints[indx + 2] = setpoints[indx + 2], setpoints[indx + 1]
+
+    @staticmethod
+    def _measure_tick_period(movement_log: MovementLog) -> float:
+        total_time, total_ticks = 0.0, 0
+
+        def add_run(left_right, forward_backward, up_down, yaw, count, start_ts, end_ts):
+            nonlocal total_time, total_ticks
+            if count > 1:
+                total_time += end_ts - start_ts
+                total_ticks += count - 1
+
+        movement_log.for_each(add_run)
+
+        if total_ticks == 0:
+            return ReplayPlan.DEFAULT_TICK_PERIOD
+        return total_time / total_ticks
+
+
+class ReplayEngine:
+    """
+        Plays a ReplayPlan sending each setpoint at its deadline.
+
+        Deadlines are absolute times on the monotonic clock computed from the start of the replay,
+        so the time spent by the caller or by a late wake-up is recovered on the following steps
+        instead of being accumulated.
+        Waits are done on an abort event, so a replay can be interrupted at any moment.
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self, send_fn: Callable[[int, int, int, int], None]):
+        self._send_fn = send_fn
+
+    # ---> FUNCTIONS
+    def play(self,
+             plan: ReplayPlan,
+             on_step: Callable[[int, int, int, int, float], None] | None = None,
+             abort_event: threading.Event | None = None) -> dict:
+        """
+            Plays the plan and stops the drone at the end.
+            on_step(left_right, forward_backward, up_down, yaw, timestamp) is called for each step sent.
+            If abort_event is set, the replay returns immediately without sending other setpoints
+
+            Returns the timing report of the replay
+                steps = Number of steps played
+                planned_s = Planned duration
+                actual_s = Actual duration
+                error_avg_ms = Average delay of the steps from their deadline
+                error_max_ms = Maximum delay of the steps from their deadline
+                final_error_ms = Difference between actual and planned duration ( 0 if aborted )
+                aborted = True if the replay has been interrupted
+        """
+        if abort_event is None:
+            abort_event = threading.Event()
+
+        error_sum, error_max = 0.0, 0.0
+        steps, aborted = 0, False
+
+        start = time.monotonic()
+        deadline = start
+        for step in range(len(plan)):
+            setpoint, duration = plan.get_step(step)
+
+            now = self._wait_until(deadline, abort_event)
+            if abort_event.is_set():
+                aborted = True
+                break
+
+            error = now - deadline
+            error_sum += error
+            if error > error_max:
+                error_max = error
+
+            self._send_fn(*setpoint)
+            if on_step is not None:
+                on_step(*setpoint, now)
+
+            deadline += duration
+            steps += 1
+
+        end = self._wait_until(deadline, abort_event)
+        if abort_event.is_set():
+            aborted = True
+            end = time.monotonic()
+        else:
+            self._send_fn(0, 0, 0, 0)
+        if on_step is not None:
+            on_step(0, 0, 0, 0, end)
+
+        return {
+            "steps": steps,
+            "planned_s": plan.get_duration(),
+            "actual_s": end - start,
+            "error_avg_ms": error_sum / steps * 1000 if steps > 0 else 0.0,
+            "error_max_ms": error_max * 1000,
+            "final_error_ms": 0.0 if aborted else (end - deadline) * 1000,
+            "aborted": aborted,
+        }
+
+    @staticmethod
+    def _wait_until(deadline: float, abort_event: threading.Event) -> float:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            abort_event.wait(delay)
+        return time.monotonic()
+
+
+class ReplayTask:
+    """
+        Runs a ReplayPlan on a background thread, so the control loop keeps processing input.
+
+        The task is aborted by cancel() or as soon as the emergency stop is triggered.
+        on_done(report) is called on the replay thread when the replay ends
+    """
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 engine: ReplayEngine,
+                 plan: ReplayPlan,
+                 emergency_stop: EmergencyStop,
+                 on_step: Callable[[int, int, int, int, float], None] | None = None,
+                 on_done: Callable[[dict], None] | None = None):
+        self._engine = engine
+        self._plan = plan
+        self._emergency_stop = emergency_stop
+        self._on_step = on_step
+        self._on_done = on_done
+
+        self._abort_event = threading.Event()
+        self._report = None
+        self._thread = None
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self._emergency_stop.is_triggered():
+            self._abort_event.set()
+
+        self._emergency_stop.add_listener(self.cancel)
+        self._thread = threading.Thread(target=self._run, name="ReplayTask", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._abort_event.set()
+
+    def join(self, timeout: float | None = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_report(self) -> dict | None:
+        return self._report
+
+    def _run(self):
+        try:
+            self._report = self._engine.play(self._plan, self._on_step, self._abort_event)
+        finally:
+            self._emergency_stop.remove_listener(self.cancel)
+
+        if self._on_done is not None:
+            self._on_done(self._report)
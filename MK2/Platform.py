@@ -0,0 +1,122 @@
+####################################################################################################################
+# IMPORTS
+import functools
+import os
+import sys
+
+from pathlib import Path
+
+
+####################################################################################################################
+# CONSTANTS
+HEADLESS_ENV = "TELLO_HEADLESS"  # "1" forces the headless mode, "0" disables it
+DEFAULT_SCREEN_SIZE = (1920, 1080)  # Used when the screen cannot be queried ( headless )
+
+IS_WINDOWS = sys.platform.startswith("win")
+IS_LINUX = sys.platform.startswith("linux")
+IS_MAC = sys.platform == "darwin"
+
+_headless = None
+
+
+####################################################################################################################
+# CORE
+
+# ---> Functions
+def is_headless() -> bool:
+    """
+        In headless mode no window is opened: SDL uses the dummy driver and no cv2 window is shown.
+        It is enabled by set_headless(), by the TELLO_HEADLESS environment variable,
+        or automatically on Linux when there is no display server
+    """
+    if _headless is not None:
+        return _headless
+
+    env = os.environ.get(HEADLESS_ENV)
+    if env is not None:
+        return env.strip().lower() in ("1", "true", "yes")
+
+    return IS_LINUX and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY")
+
+
+def set_headless(headless: bool | None):
+    """
+        Forces the headless mode on or off, None restores the automatic detection
+    """
+    global _headless
+    _headless = headless
+
+
+@functools.lru_cache(maxsize=1)
+def _query_screen_size() -> tuple[int, int]:
+    if IS_WINDOWS:
+        import ctypes
+        user32 = ctypes.windll.user32
+        return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+
+    # Other platforms: the screen is queried once through a hidden Tk root.
+    # It must not run inside the mainloop of another root, a GUI passes the size of its own root instead
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    size = (root.winfo_screenwidth(), root.winfo_screenheight())
+    root.destroy()
+    return size
+
+
+def get_screen_size() -> tuple[int, int]:
+    """
+        Returns ( width, height ) of the main screen in pixels, queried once.
+        DEFAULT_SCREEN_SIZE is returned in headless mode or if the screen cannot be queried
+    """
+    if is_headless():
+        return DEFAULT_SCREEN_SIZE
+
+    try:
+        return _query_screen_size()
+    except Exception:
+        return DEFAULT_SCREEN_SIZE
+
+
+def get_sdl_video_driver() -> str | None:
+    """
+        Returns the SDL video driver to use, None to let SDL choose
+    """
+    if is_headless():
+        return "dummy"
+
+    if IS_WINDOWS:
+        return "windows"  # "windib" of SDL 1.2, used by pygame 1
+
+    return None
+
+
+def configure_sdl(window_id: int | None = None):
+    """
+        Sets the SDL environment before the pygame display is initialized.
+        window_id is the id of a native window where pygame draws ( e.g. a Tk frame )
+    """
+    driver = get_sdl_video_driver()
+    if driver is not None:
+        os.environ["SDL_VIDEODRIVER"] = driver
+
+    if window_id is not None and not is_headless():
+        os.environ["SDL_WINDOWID"] = str(window_id)
+
+
+def get_captures_dir() -> Path:
+    """
+        Returns the directory of the captures: TelloCaptures in the Desktop if it exists, else in the home
+    """
+    desktop = Path.home() / "Desktop"
+    if desktop.is_dir():
+        return desktop / "TelloCaptures"
+
+    return Path.home() / "TelloCaptures"
+
+
+def get_flights_dir() -> Path:
+    """
+        Returns the directory of the flight records
+    """
+    return Path.home() / "TelloFlights"
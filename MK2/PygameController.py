@@ -1,14 +1,18 @@
 ####################################################################################################################
 # IMPORTS
+import time
 import pygame
 
 from Cockpit import Cockpit
+from Platform import configure_sdl
 
 
 # ---> CONSTANTS
 TITLE = "Focus on me"
 SCREEN_WIDTH = 400
 SCREEN_HEIGHT = 400
+CONTROL_LOOP_FPS = 100
+INPUT_RATE_HZ = Cockpit.INPUT_RATE_HZ
 
 
 ####################################################################################################################
@@ -16,6 +20,9 @@ SCREEN_HEIGHT = 400
 
 # ---> Functions
 def pygame_init():
+    # select the SDL video driver of the platform ( dummy in headless mode )
+    configure_sdl()
+
     # activate the pygame library
     # initiate pygame and give permission
     # to use pygame's functionality.
@@ -56,6 +63,13 @@ def run(cockpit: Cockpit):
     # Starting main thread
     # infinite loop
 
+    # RC commands are sent by the scheduler of the Tello, so the loop only needs a rate limit.
+    # The events are pumped and the input sampled at INPUT_RATE_HZ,
+    # the commands are executed at CONTROL_LOOP_FPS
+    clock = pygame.time.Clock()
+    control_period = 1.0 / CONTROL_LOOP_FPS
+    next_control = time.perf_counter()
+
     tello_enabled = True
     while tello_enabled:
 
@@ -73,10 +87,17 @@ def run(cockpit: Cockpit):
         # if event.type != pygame.QUIT:
         if not window_closed:
             cockpit.update_pressed(key_pressed)
-            tello_enabled = cockpit.exe_command()
 
-            # Draws the surface object to the screen.
-            pygame.display.update()
+            now = time.perf_counter()
+            if now >= next_control:
+                # Deadlines follow the previous one, unless the loop is late by more than a period
+                next_control = max(next_control + control_period, now)
+                tello_enabled = cockpit.exe_command()
+
+                # Draws the surface object to the screen.
+                pygame.display.update()
+
+            clock.tick(INPUT_RATE_HZ)
 
         # If event object type is QUIT
         # then quitting the pygame
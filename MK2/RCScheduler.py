@@ -0,0 +1,209 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import threading
+import time
+
+from typing import Callable
+
+from EmergencyStop import EmergencyStop
+
+
+####################################################################################################################
+# CORE
+class RCScheduler:
+    """
+        Sends the latest RC setpoint to the drone at a fixed rate from a dedicated thread.
+
+        Callers only update the setpoint with set_setpoint(), which never blocks:
+        the scheduler thread picks it up on its next tick and keeps sending it
+        until it is replaced. The setpoint order is the same used by TelloMK2.send_rc_controlx
+            (left_right, forward_backward, up_down, yaw)
+
+        If an EmergencyStop is given, the scheduler is woken up as soon as it is triggered
+        and sends a zero setpoint without waiting for the next tick. Setpoints are ignored
+        while the stop is active, and the latency between the trigger and the zero setpoint
+        on the wire is passed to on_stop_sent.
+
+        A send that fails ( e.g. OSError of sendto while the WiFi drops ) is counted and logged once
+        per outage, and the scheduler keeps ticking: a failed zero setpoint is sent again on the next tick.
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_RATE_HZ = 50
+    ZERO_SETPOINT = (0, 0, 0, 0)
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 send_fn: Callable[[int, int, int, int], None],
+                 rate_hz: float = DEFAULT_RATE_HZ,
+                 emergency_stop: EmergencyStop | None = None,
+                 on_stop_sent: Callable[[float], None] | None = None,
+                 log_fn: Callable[[int, str], None] | None = None):
+        self._send_fn = send_fn
+        self._log_fn = log_fn
+        self._period = 1.0 / rate_hz
+        self._setpoint = self.ZERO_SETPOINT
+        self._setpoint_lock = threading.Lock()
+
+        self._thread = None
+        self._running = False
+        self._wake_event = threading.Event()
+
+        self._emergency_stop = emergency_stop
+        self._on_stop_sent = on_stop_sent
+        self._stop_pending = False
+        self._stop_latency = 0.0
+        if emergency_stop is not None:
+            emergency_stop.add_listener(self._on_emergency_stop)
+
+        self._reset_stats()
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self.is_running():
+            return
+
+        self._running = True
+        self._wake_event.clear()
+        self._reset_stats()
+        self._thread = threading.Thread(target=self._run, name="RCScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.is_running():
+            return
+
+        self._running = False
+        self._wake_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_setpoint(self, left_right: int, forward_backward: int, up_down: int, yaw: int):
+        # The check and the assignment are done under the lock taken by the stop listener, so a setpoint
+        # never overwrites the zero setpoint of a stop triggered in between.
+        # The scheduler reads the setpoint without the lock: a single tuple assignment is atomic
+        with self._setpoint_lock:
+            if self._emergency_stop is not None and self._emergency_stop.is_triggered():
+                return
+            self._setpoint = (left_right, forward_backward, up_down, yaw)
+
+    def get_setpoint(self) -> tuple[int, int, int, int]:
+        return self._setpoint
+
+    def set_rate(self, rate_hz: float):
+        self._period = 1.0 / rate_hz
+
+    def get_rate(self) -> float:
+        return 1.0 / self._period
+
+    def get_stop_latency(self) -> float:
+        """
+            Returns the latency in seconds of the last emergency stop, from trigger to zero setpoint sent
+        """
+        return self._stop_latency
+
+    def get_stats(self) -> dict:
+        """
+            Returns the statistics of the sending loop
+                sent = Number of setpoints sent
+                rate_hz = Actual send rate measured from the first to the last send
+                jitter_avg_ms = Average deviation of the send period from the target period
+                jitter_max_ms = Maximum deviation of the send period from the target period
+                overruns = Ticks in which the send took longer than the whole period
+                send_errors = Setpoints not sent because of an error
+                stop_latency_ms = Latency of the last emergency stop
+        """
+        sent = self._sent
+        elapsed = self._last_send - self._first_send
+
+        return {
+            "target_hz": self.get_rate(),
+            "sent": sent,
+            "rate_hz": (sent - 1) / elapsed if sent > 1 and elapsed > 0 else 0.0,
+            "jitter_avg_ms": self._jitter_sum / (sent - 1) * 1000 if sent > 1 else 0.0,
+            "jitter_max_ms": self._jitter_max * 1000,
+            "overruns": self._overruns,
+            "send_errors": self._send_errors,
+            "stop_latency_ms": self._stop_latency * 1000,
+        }
+
+    def _reset_stats(self):
+        self._sent = 0
+        self._first_send = 0.0
+        self._last_send = 0.0
+        self._jitter_sum = 0.0
+        self._jitter_max = 0.0
+        self._overruns = 0
+        self._send_errors = 0
+        self._send_failing = False
+
+    def _run(self):
+        next_tick = time.perf_counter()
+
+        while self._running:
+            stop_pending = self._stop_pending
+            sent = self._send(self._setpoint)
+            now = time.perf_counter()
+            if sent:
+                self._record_send(now)
+
+            if stop_pending and sent:
+                self._stop_pending = False
+                self._stop_latency = now - self._emergency_stop.get_trigger_time()
+                if self._on_stop_sent is not None:
+                    self._on_stop_sent(self._stop_latency)
+
+            # Deadlines are computed from the previous deadline and not from "now",
+            # so a late tick does not shift all the following ones
+            next_tick += self._period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                # Woken up early by stop() or by an emergency stop
+                if self._wake_event.wait(delay):
+                    self._wake_event.clear()
+                    next_tick = time.perf_counter()
+            else:
+                self._overruns += 1
+                next_tick = time.perf_counter()
+
+    def _send(self, setpoint: tuple[int, int, int, int]) -> bool:
+        try:
+            self._send_fn(*setpoint)
+        except OSError as e:
+            self._send_errors += 1
+            if not self._send_failing:
+                self._send_failing = True
+                self._log(logging.ERROR, f'RC setpoint not sent: {e!r}')
+            return False
+
+        if self._send_failing:
+            self._send_failing = False
+            self._log(logging.WARNING, f'RC setpoints sent again after {self._send_errors} errors')
+        return True
+
+    def _log(self, level: int, msg: str):
+        if self._log_fn is not None:
+            self._log_fn(level, msg)
+
+    def _on_emergency_stop(self):
+        # Called by the thread that triggered the stop, after the stop has been set
+        with self._setpoint_lock:
+            self._setpoint = self.ZERO_SETPOINT
+        self._stop_pending = True
+        self._wake_event.set()
+
+    def _record_send(self, now: float):
+        if self._sent == 0:
+            self._first_send = now
+        else:
+            jitter = abs((now - self._last_send) - self._period)
+            self._jitter_sum += jitter
+            if jitter > self._jitter_max:
+                self._jitter_max = jitter
+
+        self._last_send = now
+        self._sent += 1
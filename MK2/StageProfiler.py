@@ -0,0 +1,108 @@
+####################################################################################################################
+# IMPORTS
+import time
+import numpy as np
+
+
+####################################################################################################################
+# CORE
+class StageProfiler:
+    """
+        Timings of the stages of the hot paths ( control tick, RC send, show_img, save_img ... ).
+
+        A stage is measured with
+            start = profiler.begin()
+            ...
+            profiler.end(stage, start)
+        When the profiler is disabled, begin() returns 0 without reading the clock and end() returns
+        immediately, so the hooks can stay in the hot paths.
+
+        Each stage keeps the last `capacity` samples ( end time and duration ) in a ring of
+        preallocated NumPy arrays. Writers never lock: a sample is written in its slot before the
+        counter is advanced, and readers copy the rings, accepting a sample being overwritten while read.
+    """
+
+    # ---> CONSTANTS
+    DEFAULT_CAPACITY = 256  # samples per stage
+    MAX_STAGES = 32
+
+    # ---> CONSTRUCTOR
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, enabled: bool = False):
+        self._capacity = capacity
+        self._enabled = enabled
+
+        self._names = []
+        self._stage_indx = {}
+        self._ends = np.zeros((self.MAX_STAGES, capacity))
+        self._durations = np.zeros((self.MAX_STAGES, capacity))
+        self._counts = [0] * self.MAX_STAGES
+
+    # ---> FUNCTIONS
+    def add_stage(self, name: str) -> int:
+        """
+            Registers a stage and returns its id, the same id is returned if it is already registered
+        """
+        stage = self._stage_indx.get(name)
+        if stage is not None:
+            return stage
+
+        if len(self._names) == self.MAX_STAGES:
+            raise ValueError("Too many stages, max " + str(self.MAX_STAGES))
+
+        stage = len(self._names)
+        self._names.append(name)
+        self._stage_indx[name] = stage
+        return stage
+
+    def set_enabled(self, enabled: bool):
+        self._enabled = enabled
+
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    def begin(self) -> float:
+        if not self._enabled:
+            return 0.0
+        return time.perf_counter()
+
+    def end(self, stage: int, start: float):
+        if start == 0.0:
+            return
+
+        now = time.perf_counter()
+        count = self._counts[stage]
+        slot = count % self._capacity
+        self._ends[stage, slot] = now
+        self._durations[stage, slot] = now - start
+        self._counts[stage] = count + 1
+
+    def reset(self):
+        self._counts = [0] * self.MAX_STAGES
+
+    def get_stats(self) -> dict:
+        """
+            Returns the statistics of the stages with at least one sample, over the samples in the ring
+                count = Samples recorded since the start
+                hz = Rate of the stage, from the end times of the samples in the ring
+                avg_ms, p95_ms, max_ms = Duration of the stage
+        """
+        stats = {}
+        for stage, name in enumerate(self._names):
+            count = self._counts[stage]
+            if count == 0:
+                continue
+
+            filled = min(count, self._capacity)
+            ends = self._ends[stage, :filled].copy()
+            durations = self._durations[stage, :filled] * 1000
+
+            span = ends.max() - ends.min()
+            stats[name] = {
+                "count": count,
+                "hz": (filled - 1) / span if span > 0 else 0.0,
+                "avg_ms": float(durations.mean()),
+                "p95_ms": float(np.percentile(durations, 95)),
+                "max_ms": float(durations.max()),
+            }
+
+        return stats
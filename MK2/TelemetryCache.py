@@ -0,0 +1,172 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import threading
+import time
+
+from typing import Callable
+
+
+####################################################################################################################
+# CORE
+class TelemetryCache:
+    """
+        Keeps the last state packet received from the Tello state stream (UDP 8890).
+
+        It is updated by the state receiver once per packet, so readers on the control loop
+        only read cached values, without parsing or locking.
+        Battery thresholds are checked on every update and the registered callbacks are fired
+        once, when the level crosses the threshold.
+
+        Callbacks run on the state receiver thread of djitellopy, which stops at the first exception:
+        an exception of a callback is logged and counted, and the next callbacks are still called.
+    """
+
+    # ---> CONSTANTS
+    FRESHNESS_TIMEOUT = 0.5  # seconds
+
+    # ---> CONSTRUCTOR
+    def __init__(self, battery_crit: int, battery_warn: int, log_fn: Callable[[int, str], None] | None = None):
+        self._battery_crit = battery_crit
+        self._battery_warn = battery_warn
+        self._log_fn = log_fn
+        self._callback_errors = 0
+
+        self._state = {}
+        self._battery = -1
+        self._timestamp = 0.0
+        self._packets = 0
+
+        self._update_callbacks = []
+        self._crit_callbacks = []
+        self._warn_callbacks = []
+        self._crit_fired = False
+        self._warn_fired = False
+
+        self._updated = threading.Condition()
+
+    # ---> FUNCTIONS
+    def update(self, state: dict):
+        """
+            Stores a parsed state packet. Called by the state receiver thread
+        """
+
+        self._state = state
+        self._timestamp = time.monotonic()
+        self._packets += 1
+
+        battery = state.get("bat")
+        if battery is not None:
+            self._battery = int(battery)
+            self._check_battery()
+
+        for callback in self._update_callbacks:
+            self._call(callback, state)
+
+        with self._updated:
+            self._updated.notify_all()
+
+    def on_update(self, callback: Callable[[dict], None]):
+        """
+            Registers a callback called with every state packet, on the state receiver thread
+        """
+        self._update_callbacks.append(callback)
+
+    def on_battery_critical(self, callback: Callable[[int], None]):
+        self._crit_callbacks.append(callback)
+
+    def on_battery_warning(self, callback: Callable[[int], None]):
+        self._warn_callbacks.append(callback)
+
+    def get_battery(self) -> int:
+        """
+            Returns the last battery level received, -1 if no packet has been received yet
+        """
+        return self._battery
+
+    def get_state(self) -> dict:
+        return self._state
+
+    def get_state_field(self, key: str, default=None):
+        return self._state.get(key, default)
+
+    def get_age(self) -> float:
+        """
+            Returns the seconds elapsed since the last packet
+        """
+        if self._packets == 0:
+            return float("inf")
+        return time.monotonic() - self._timestamp
+
+    def is_fresh(self) -> bool:
+        return self.get_age() <= self.FRESHNESS_TIMEOUT
+
+    def get_packets(self) -> int:
+        return self._packets
+
+    def is_battery_critical(self) -> bool:
+        return self._crit_fired
+
+    def reset_battery_alarms(self):
+        """
+            Re-arms the battery callbacks, e.g. on a new connection: they fire again if the level is still low
+        """
+        self._crit_fired = False
+        self._warn_fired = False
+
+    def get_callback_errors(self) -> int:
+        return self._callback_errors
+
+    def wait_for_update(self, timeout: float) -> bool:
+        """
+            Blocks until a new packet is received or the timeout expires
+        """
+        with self._updated:
+            return self._updated.wait(timeout)
+
+    def _check_battery(self):
+        battery = self._battery
+
+        if battery < self._battery_crit:
+            if not self._crit_fired:
+                self._crit_fired = True
+                self._fire(self._crit_callbacks, battery)
+
+        elif battery <= self._battery_warn:
+            if not self._warn_fired:
+                self._warn_fired = True
+                self._fire(self._warn_callbacks, battery)
+
+        else:
+            # Battery back over the thresholds (e.g. after a battery swap): re-arm callbacks
+            self._crit_fired = False
+            self._warn_fired = False
+
+    def _fire(self, callbacks: list, battery: int):
+        for callback in callbacks:
+            self._call(callback, battery)
+
+    def _call(self, callback: Callable, value):
+        try:
+            callback(value)
+        except Exception as e:
+            self._callback_errors += 1
+            if self._log_fn is not None:
+                self._log_fn(logging.ERROR, f'Telemetry callback {getattr(callback, "__qualname__", callback)} failed: {e!r}')
+
+
+class StateNotifyingDict(dict):
+    """
+        Replaces the per-drone entry of djitellopy, which the state receiver thread
+        updates with  drones[host]['state'] = parsed_state  once per packet.
+        Every assignment of the 'state' key is forwarded to a listener.
+    """
+
+    def __init__(self, content: dict, on_state: Callable[[dict], None]):
+        super().__init__(content)
+        self._on_state = on_state
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key == "state":
+            self._on_state(value)
@@ -0,0 +1,701 @@
+####################################################################################################################
+# IMPORTS
+import logging
+import selectors
+import socket
+import threading
+import time
+import numpy as np
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable
+
+from djitellopy import tello
+from TelloMK2 import TelloMK2
+from EmergencyStop import EmergencyStop
+from RCScheduler import RCScheduler
+
+
+####################################################################################################################
+# CORE
+class FleetCommand:
+    """
+        SDK command queued for a drone of the fleet, completed with the response of the drone
+    """
+
+    def __init__(self, command: str, timeout: float, retries: int):
+        self.command = command
+        self.payload = command.encode("utf-8")
+        self.timeout = timeout
+        self.retries = retries
+        self.attempts = 0
+        self.sent_time = 0.0
+        self.deadline = 0.0
+        self.future = Future()
+
+
+class FleetDrone:
+    """
+        A drone of the fleet: its TelloMK2, the queue of its commands, its RC setpoint
+        and the statistics of its responses. Commands are only sent by the I/O thread of the fleet
+    """
+
+    # ---> CONSTANTS
+    LATENCY_SAMPLES = 128
+
+    # ---> CONSTRUCTOR
+    def __init__(self, name: str, tello_mk2: TelloMK2):
+        self.name = name
+        self.tello = tello_mk2
+        self.address = tuple(tello_mk2.address)
+        self.connected = False
+
+        self.commands = deque()
+        self.inflight = None
+        self.next_command = 0.0
+        self.last_response = 0.0
+
+        self.setpoint = RCScheduler.ZERO_SETPOINT
+        self.rc_payload = TelloFleet.encode_rc(*self.setpoint)
+
+        self.latencies = np.zeros(self.LATENCY_SAMPLES)
+        self.sent = 0
+        self.acked = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.unexpected = 0
+
+    # ---> FUNCTIONS
+    def record_latency(self, latency: float):
+        self.latencies[self.acked % self.LATENCY_SAMPLES] = latency
+        self.acked += 1
+
+    def get_stats(self) -> dict:
+        count = min(self.acked, self.LATENCY_SAMPLES)
+        latencies = self.latencies[:count] * 1000
+
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "retried": self.retried,
+            "timeouts": self.timeouts,
+            "unexpected": self.unexpected,
+            "pending": len(self.commands) + (self.inflight is not None),
+            "latency_avg_ms": float(latencies.mean()) if count else 0.0,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if count else 0.0,
+            "latency_max_ms": float(latencies.max()) if count else 0.0,
+        }
+
+
+class TelloFleet:
+    """
+        Drives many Tellos ( e.g. in station mode ) from a single process.
+
+        Every drone is a TelloMK2 bound to its own IP, which keeps its telemetry, odometry and
+        flight recording, but the commands of all the drones go through one UDP socket
+        on an ephemeral port, served by a single I/O thread with a selector:
+            - SDK commands are queued per drone and sent one at a time, since the responses have no id.
+              A response is matched to the drone by its source address, and the time from the send
+              to the response is the command latency of the drone
+            - RC setpoints are sent to every connected drone in one burst per tick. The datagrams are
+              encoded when the setpoints change, so a burst is only a loop of sendto and the skew
+              between the first and the last drone stays bounded. The first drone of the burst rotates,
+              so no drone is always the last one
+        Setpoints given together with set_rc_all() are published as one, so a burst never mixes
+        old and new setpoints.
+
+        The state packets of all the drones are received by the single state thread of djitellopy.
+        Drones of a fleet must be moved with the fleet: their own RC scheduler is not started.
+        log_fn is called as TelloMK2.print_log, with the msg and its % args
+
+        A fleet emergency stop zeroes the setpoints of all the drones and sends them without waiting
+        for the next tick, the emergency stop of a single drone ( e.g. low battery ) zeroes only its setpoint.
+    """
+
+    # ---> CONSTANTS
+    RC_RATE_HZ = 50
+    MAX_SKEW = 0.002  # seconds, bursts with a larger skew are counted as skew overruns
+    COMMAND_TIMEOUT = tello.Tello.RESPONSE_TIMEOUT  # seconds, for each attempt
+    COMMAND_RETRIES = tello.Tello.RETRY_COUNT - 1  # attempts after the first one
+    COMMAND_INTERVAL = tello.Tello.TIME_BTW_COMMANDS  # seconds between a response and the next command
+    STATE_TIMEOUT = 1.0  # seconds, to receive the first state packet after the connection
+    SELECT_TIMEOUT = 0.1  # seconds
+    RECV_BUFFER = 1024
+
+    # Columns of get_telemetry(), the last column is the age of the state in seconds
+    TELEMETRY_FIELDS = ("bat", "h", "tof", "yaw", "vgx", "vgy", "vgz", "time")
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 rc_rate_hz: float = RC_RATE_HZ,
+                 max_skew: float = MAX_SKEW,
+                 log_fn: Callable[..., None] | None = None):
+        self._period = 1.0 / rc_rate_hz
+        self._max_skew = max_skew
+        self._log_fn = log_fn
+
+        self._drones = []
+        self._by_name = {}
+        self._by_address = {}
+
+        # Published setpoints: tuple of ( payload, address, drone ), replaced as a whole
+        self._rc_burst = ()
+        self._rc_lock = threading.Lock()
+
+        self._emergency_stop = EmergencyStop()
+        self._emergency_stop.add_listener(self._on_emergency_stop)
+        self._stop_pending = False
+
+        self._sock = None
+        self._selector = None
+        self._wake_recv = None
+        self._wake_send = None
+        self._thread = None
+        self._running = False
+
+        self._reset_stats()
+
+    # ---> FUNCTIONS
+    def add_drone(self, host: str, command_port: int | None = None, name: str | None = None) -> TelloMK2:
+        """
+            Adds a drone to the fleet, before start(). name defaults to the host
+        """
+        if self._running:
+            raise RuntimeError("Drones must be added before starting the fleet")
+
+        name = host if name is None else name
+        if name in self._by_name:
+            raise ValueError("Drone already in the fleet: " + name)
+
+        drone = FleetDrone(name, TelloMK2(host, command_port))
+        drone.tello.get_emergency_stop().add_listener(lambda: self._on_drone_emergency_stop(drone))
+        self._drones.append(drone)
+        self._by_name[name] = drone
+        self._by_address[drone.address] = drone
+
+        return drone.tello
+
+    def get_drone(self, name: str) -> TelloMK2:
+        return self._by_name[name].tello
+
+    def get_names(self) -> list[str]:
+        return [drone.name for drone in self._drones]
+
+    def start(self):
+        if self._running:
+            return
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("", 0))
+        self._sock.setblocking(False)
+
+        # Commands are queued by the callers, the I/O thread is woken up by a byte on this pair
+        self._wake_recv, self._wake_send = socket.socketpair()
+        self._wake_recv.setblocking(False)
+        self._wake_send.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._sock, selectors.EVENT_READ)
+        self._selector.register(self._wake_recv, selectors.EVENT_READ)
+
+        self._reset_stats()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="TelloFleet", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+        self._wake()
+        self._thread.join()
+        self._thread = None
+
+        self._selector.close()
+        self._sock.close()
+        self._wake_recv.close()
+        self._wake_send.close()
+
+        # Commands never answered are failed, so no caller waits forever
+        for drone in self._drones:
+            if drone.inflight is not None:
+                self._fail(drone.inflight, "Fleet stopped")
+                drone.inflight = None
+            while drone.commands:
+                self._fail(drone.commands.popleft(), "Fleet stopped")
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def get_port(self) -> int:
+        """
+            Returns the local port of the command socket
+        """
+        return self._sock.getsockname()[1]
+
+    def connect(self, timeout: float = STATE_TIMEOUT) -> list[str]:
+        """
+            Enters the SDK mode on every drone and waits for its first state packet.
+            Drones that do not answer, without state or with a critical battery level are left out
+            of the RC bursts. Returns the names of the connected drones
+        """
+        self.start()
+        responses = self.broadcast_command("command")
+
+        deadline = time.monotonic() + timeout
+        for drone in self._drones:
+            if "ok" not in responses[drone.name].lower():
+                self._log(logging.ERROR, f'{drone.name}: connection refused ( {responses[drone.name]} )')
+                continue
+
+            telemetry = drone.tello.get_telemetry()
+            while not telemetry.is_fresh() and time.monotonic() < deadline:
+                telemetry.wait_for_update(max(0.0, deadline - time.monotonic()))
+
+            battery = telemetry.get_battery()
+            if not telemetry.is_fresh():
+                self._log(logging.ERROR, f'{drone.name}: no state packet received')
+            elif battery < TelloMK2.BATTERY_LEV_CRIT:
+                self._log(logging.ERROR, f'{drone.name}: battery level too low ( {battery} )')
+            else:
+                drone.connected = True
+                drone.tello.get_flight_recorder().open()
+                drone.tello.print_log(logging.INFO, "Connected to the fleet, battery level: %s", battery)
+
+        with self._rc_lock:
+            self._publish_rc()
+
+        connected = [drone.name for drone in self._drones if drone.connected]
+        self._log(logging.INFO, f'Fleet connected: {len(connected)}/{len(self._drones)} drones')
+        return connected
+
+    def end(self):
+        """
+            Lands the drones still flying and releases all the drones
+        """
+        if self._running:
+            self.land()
+        self.stop()
+
+        for drone in self._drones:
+            drone.connected = False
+            drone.tello.is_flying = False
+            drone.tello.end()
+
+    def send_command(self,
+                     name: str,
+                     command: str,
+                     timeout: float = COMMAND_TIMEOUT,
+                     retries: int = COMMAND_RETRIES) -> Future:
+        """
+            Queues an SDK command for a drone. The future is completed with the response of the drone,
+            or fails with a TelloException if no response is received after all the attempts
+        """
+        fleet_command = FleetCommand(command, timeout, retries)
+        if not self._running:
+            self._fail(fleet_command, "Fleet not started")
+            return fleet_command.future
+
+        self._by_name[name].commands.append(fleet_command)
+        self._wake()
+        return fleet_command.future
+
+    def broadcast_command(self,
+                          command: str,
+                          names: list[str] | None = None,
+                          timeout: float = COMMAND_TIMEOUT,
+                          retries: int = COMMAND_RETRIES) -> dict[str, str]:
+        """
+            Sends the same SDK command to all the drones ( or to the given ones ) and waits for all the responses.
+            Returns the response of each drone, or the error message if it did not answer
+        """
+        names = self.get_names() if names is None else names
+        futures = {name: self.send_command(name, command, timeout, retries) for name in names}
+
+        responses = {}
+        for name, future in futures.items():
+            try:
+                responses[name] = future.result()
+            except tello.TelloException as e:
+                responses[name] = str(e)
+
+        return responses
+
+    def takeoff(self, names: list[str] | None = None) -> dict[str, str]:
+        names = self._connected_names(names)
+        responses = self.broadcast_command("takeoff", names)
+        for name, response in responses.items():
+            if "ok" in response.lower():
+                self._by_name[name].tello.is_flying = True
+            else:
+                self._log(logging.ERROR, f'{name}: take-off failed ( {response} )')
+
+        return responses
+
+    def land(self, names: list[str] | None = None) -> dict[str, str]:
+        names = [name for name in self._connected_names(names) if self._by_name[name].tello.is_flying]
+        self.hover(names)
+
+        responses = self.broadcast_command("land", names)
+        for name, response in responses.items():
+            if "ok" in response.lower():
+                self._by_name[name].tello.is_flying = False
+            else:
+                self._log(logging.ERROR, f'{name}: landing failed ( {response} )')
+
+        return responses
+
+    def set_rc(self, name: str, left_right: int, forward_backward: int, up_down: int, yaw: int):
+        """
+            Changes the RC setpoint of a drone, sent from the next burst.
+            Axes are in the order used by TelloMK2.send_rc_controlx
+        """
+        self.set_rc_all({name: (left_right, forward_backward, up_down, yaw)})
+
+    def set_rc_all(self, setpoints: dict[str, tuple[int, int, int, int]] | np.ndarray):
+        """
+            Changes the RC setpoints of many drones at once: they are sent together from the next burst.
+            setpoints is a dict name -> setpoint, or an array ( drones, 4 ) in the order of get_names().
+            Setpoints are ignored while the emergency stop of the fleet or of the drone is active
+        """
+        if isinstance(setpoints, np.ndarray):
+            setpoints = {drone.name: tuple(int(axis) for axis in setpoint)
+                         for drone, setpoint in zip(self._drones, setpoints)}
+
+        # Checked under the lock taken by the stop listener, so no setpoint overwrites the zero setpoints
+        with self._rc_lock:
+            if self._emergency_stop.is_triggered():
+                return
+
+            for name, setpoint in setpoints.items():
+                drone = self._by_name[name]
+                if drone.tello.is_emergency_stopped() or setpoint == drone.setpoint:
+                    continue
+
+                drone.setpoint = setpoint
+                drone.rc_payload = self.encode_rc(*setpoint)
+                drone.tello.get_flight_recorder().record_rc(*setpoint)
+
+            self._publish_rc()
+
+    def hover(self, names: list[str] | None = None):
+        names = self.get_names() if names is None else names
+        self.set_rc_all({name: RCScheduler.ZERO_SETPOINT for name in names})
+
+    def emergency_stop(self, reason: str = ""):
+        """
+            Stops all the drones in hovering as fast as possible.
+            Setpoints are ignored until clear_emergency_stop() is called
+        """
+        self._emergency_stop.trigger(reason)
+        self._log(logging.CRITICAL, "Fleet Emergency Stop %s", reason)
+
+    def clear_emergency_stop(self):
+        if self._emergency_stop.is_triggered():
+            self._emergency_stop.clear()
+            self._log(logging.INFO, "Fleet Emergency Stop released")
+
+    def is_emergency_stopped(self) -> bool:
+        return self._emergency_stop.is_triggered()
+
+    def get_telemetry(self) -> np.ndarray:
+        """
+            Returns the last state of every drone as an array ( drones, TELEMETRY_FIELDS + 1 ),
+            in the order of get_names(). The last column is the age of the state in seconds,
+            missing values are NaN
+        """
+        telemetry = np.full((len(self._drones), len(self.TELEMETRY_FIELDS) + 1), np.nan)
+        for indx, drone in enumerate(self._drones):
+            cache = drone.tello.get_telemetry()
+            state = cache.get_state()
+            for column, field in enumerate(self.TELEMETRY_FIELDS):
+                value = state.get(field)
+                if value is not None:
+                    telemetry[indx, column] = value
+            telemetry[indx, -1] = cache.get_age()
+
+        return telemetry
+
+    def get_command_stats(self, name: str) -> dict:
+        """
+            Returns the commands sent to a drone and the latency of its responses
+            ( from the last attempt sent to the response received )
+        """
+        return self._by_name[name].get_stats()
+
+    def get_health(self) -> dict[str, dict]:
+        """
+            Returns the health of every drone: connection, freshness of the state, battery,
+            flight status and command statistics
+        """
+        now = time.perf_counter()
+        health = {}
+        for drone in self._drones:
+            telemetry = drone.tello.get_telemetry()
+            health[drone.name] = {
+                "connected": drone.connected,
+                "state_fresh": telemetry.is_fresh(),
+                "state_age": telemetry.get_age(),
+                "battery": telemetry.get_battery(),
+                "flying": drone.tello.is_flying,
+                "emergency_stop": drone.tello.is_emergency_stopped(),
+                "last_response_age": now - drone.last_response if drone.acked else float("inf"),
+                **drone.get_stats(),
+            }
+
+        return health
+
+    def get_summary(self) -> dict:
+        """
+            Returns the health of the whole fleet
+        """
+        health = self.get_health().values()
+        batteries = [drone["battery"] for drone in health if drone["battery"] >= 0]
+
+        return {
+            "drones": len(self._drones),
+            "connected": sum(drone["connected"] for drone in health),
+            "state_fresh": sum(drone["state_fresh"] for drone in health),
+            "flying": sum(drone["flying"] for drone in health),
+            "battery_min": min(batteries) if batteries else -1,
+            "latency_p95_max_ms": max((drone["latency_p95_ms"] for drone in health), default=0.0),
+            "timeouts": sum(drone["timeouts"] for drone in health),
+            "emergency_stop": self._emergency_stop.is_triggered(),
+        }
+
+    def get_rc_stats(self) -> dict:
+        """
+            Returns the statistics of the RC bursts
+                skew_*_ms = Time from the first to the last datagram of a burst
+                skew_overruns = Bursts with a skew larger than max_skew
+                overruns = Ticks started late of a whole period or more
+                send_errors / recv_errors = Socket errors, the I/O thread goes on after them
+                loop_errors = Unexpected errors of the I/O thread, logged and skipped
+        """
+        return {
+            "bursts": self._bursts,
+            "drones": len(self._rc_burst),
+            "skew_avg_ms": self._skew_sum / self._bursts * 1000 if self._bursts else 0.0,
+            "skew_max_ms": self._skew_max * 1000,
+            "skew_overruns": self._skew_overruns,
+            "overruns": self._overruns,
+            "send_errors": self._send_errors,
+            "recv_errors": self._recv_errors,
+            "loop_errors": self._loop_errors,
+            "stop_latency_ms": self._stop_latency * 1000,
+        }
+
+    @staticmethod
+    def encode_rc(left_right: int, forward_backward: int, up_down: int, yaw: int) -> bytes:
+        # Same datagram sent by TelloMK2._send_rc_setpoint through djitellopy send_rc_control
+        def clamp100(value: int) -> int:
+            return max(-100, min(100, int(value)))
+
+        return (f'rc {clamp100(left_right)} {clamp100(forward_backward)} '
+                f'{clamp100(yaw)} {clamp100(up_down)}').encode("utf-8")
+
+    def _connected_names(self, names: list[str] | None) -> list[str]:
+        names = self.get_names() if names is None else names
+        return [name for name in names if self._by_name[name].connected]
+
+    def _publish_rc(self):
+        # Called with the lock held: the I/O thread only reads the reference of the tuple
+        self._rc_burst = tuple((drone.rc_payload, drone.address, drone) for drone in self._drones if drone.connected)
+
+    def _on_emergency_stop(self):
+        # Called by the thread that triggered the stop
+        with self._rc_lock:
+            for drone in self._drones:
+                drone.setpoint = RCScheduler.ZERO_SETPOINT
+                drone.rc_payload = self.encode_rc(*drone.setpoint)
+            self._publish_rc()
+
+        self._stop_pending = True
+        self._wake()
+
+    def _on_drone_emergency_stop(self, drone: FleetDrone):
+        with self._rc_lock:
+            drone.setpoint = RCScheduler.ZERO_SETPOINT
+            drone.rc_payload = self.encode_rc(*drone.setpoint)
+            self._publish_rc()
+
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_send.send(b"\0")
+        except (BlockingIOError, AttributeError, OSError):
+            pass  # Already woken up, or not started
+
+    def _log(self, level: int, msg: str, *args):
+        if self._log_fn is not None:
+            self._log_fn(level, msg, *args)
+
+    def _reset_stats(self):
+        self._bursts = 0
+        self._skew_sum = 0.0
+        self._skew_max = 0.0
+        self._skew_overruns = 0
+        self._overruns = 0
+        self._send_errors = 0
+        self._recv_errors = 0
+        self._loop_errors = 0
+        self._stop_latency = 0.0
+
+    @staticmethod
+    def _fail(fleet_command: FleetCommand, reason: str):
+        if not fleet_command.future.done():
+            fleet_command.future.set_exception(
+                tello.TelloException(f"Command '{fleet_command.command}' was unsuccessful: {reason}"))
+
+    def _run(self):
+        next_tick = time.perf_counter()
+
+        while self._running:
+            # The thread serves every drone of the fleet: an error is logged and the loop goes on
+            try:
+                next_tick = self._run_once(next_tick)
+            except Exception as e:
+                self._loop_errors += 1
+                self._log(logging.ERROR, f'Fleet I/O error: {e!r}')
+                next_tick = max(next_tick, time.perf_counter())
+
+    def _run_once(self, next_tick: float) -> float:
+        now = time.perf_counter()
+        timeout = min(next_tick, self._dispatch_commands(now)) - now
+        for key, _ in self._selector.select(max(0.0, min(timeout, self.SELECT_TIMEOUT))):
+            if key.fileobj is self._sock:
+                self._receive_responses()
+            else:
+                self._drain_wake()
+
+        now = time.perf_counter()
+        if self._stop_pending:
+            self._stop_pending = False
+            self._send_burst()
+            self._stop_latency = time.perf_counter() - self._emergency_stop.get_trigger_time()
+            next_tick = now + self._period
+
+        elif now >= next_tick:
+            self._send_burst()
+
+            # As in RCScheduler, deadlines follow the previous deadline and not "now"
+            next_tick += self._period
+            if next_tick <= now:
+                self._overruns += 1
+                next_tick = now + self._period
+
+        return next_tick
+
+    def _send_burst(self):
+        burst = self._rc_burst
+        if not burst:
+            return
+
+        # The first drone rotates, the burst is only a loop of sendto
+        first = self._bursts % len(burst)
+        ordered = burst[first:] + burst[:first]
+        sendto = self._sock.sendto
+
+        start = time.perf_counter()
+        for payload, address, _ in ordered:
+            try:
+                sendto(payload, address)
+            except OSError:
+                self._send_errors += 1
+        skew = time.perf_counter() - start
+
+        self._bursts += 1
+        self._skew_sum += skew
+        if skew > self._skew_max:
+            self._skew_max = skew
+        if skew > self._max_skew:
+            self._skew_overruns += 1
+
+        # The pose of each drone is estimated from the setpoints sent, as TelloMK2._send_rc_setpoint does
+        for _, _, drone in burst:
+            left_right, forward_backward, up_down, yaw = drone.setpoint
+            drone.tello.get_odometry().add_setpoint(left_right, forward_backward, yaw, up_down)
+
+    def _dispatch_commands(self, now: float) -> float:
+        """
+            Sends the queued commands and retries the expired ones.
+            Returns the time of the next deadline of the commands
+        """
+        next_deadline = now + self.SELECT_TIMEOUT
+
+        for drone in self._drones:
+            fleet_command = drone.inflight
+            if fleet_command is not None and now >= fleet_command.deadline:
+                if fleet_command.attempts <= fleet_command.retries:
+                    drone.retried += 1
+                    self._send_command(drone, fleet_command, now)
+                else:
+                    drone.timeouts += 1
+                    drone.inflight = None
+                    drone.next_command = now
+                    self._fail(fleet_command, f'no response after {fleet_command.attempts} attempts')
+
+            if drone.inflight is None and drone.commands:
+                if now >= drone.next_command:
+                    self._send_command(drone, drone.commands.popleft(), now)
+                else:
+                    next_deadline = min(next_deadline, drone.next_command)
+
+            if drone.inflight is not None:
+                next_deadline = min(next_deadline, drone.inflight.deadline)
+
+        return next_deadline
+
+    def _send_command(self, drone: FleetDrone, fleet_command: FleetCommand, now: float):
+        fleet_command.attempts += 1
+        fleet_command.sent_time = now
+        fleet_command.deadline = now + fleet_command.timeout
+        drone.inflight = fleet_command
+        drone.sent += 1
+
+        try:
+            self._sock.sendto(fleet_command.payload, drone.address)
+        except OSError:
+            self._send_errors += 1
+
+    def _receive_responses(self):
+        while True:
+            try:
+                data, address = self._sock.recvfrom(self.RECV_BUFFER)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                # ICMP port unreachable of a drone that is off ( Windows ): the next datagrams are still read
+                self._recv_errors += 1
+                continue
+            except OSError as e:
+                self._recv_errors += 1
+                self._log(logging.ERROR, f'Fleet receive error: {e!r}')
+                return
+
+            now = time.perf_counter()
+            drone = self._by_address.get(address)
+            if drone is None:
+                continue
+
+            fleet_command = drone.inflight
+            if fleet_command is None:
+                # Late response of a command already expired
+                drone.unexpected += 1
+                continue
+
+            drone.inflight = None
+            drone.last_response = now
+            drone.next_command = now + self.COMMAND_INTERVAL
+            drone.record_latency(now - fleet_command.sent_time)
+            fleet_command.future.set_result(data.decode("utf-8", errors="ignore").rstrip("\r\n"))
+
+    def _drain_wake(self):
+        try:
+            while self._wake_recv.recv(512):
+                pass
+        except BlockingIOError:
+            pass
@@ -1,15 +1,29 @@
 ####################################################################################################################
 # IMPORTS
 import logging
-import os
+import threading
 import time
 import cv2  # If not working, add the path opencv2-python manually to the interpreter
 
+from concurrent.futures import Future
 from typing import Any
-from win32api import GetSystemMetrics
 
 from djitellopy import tello
 from submodules.PyUtils.Logging.ZAGLogger import ZAGLogger
+from RCScheduler import RCScheduler
+from EmergencyStop import EmergencyStop
+from TelemetryCache import TelemetryCache, StateNotifyingDict
+from FramePipeline import FramePipeline, FrameView
+from CaptureWriter import CaptureWriter
+from LogBuffer import LogBuffer
+from AsyncLog import AsyncLog
+from Odometry import Odometry
+from StageProfiler import StageProfiler
+from FlightRecorder import FlightRecorder
+from VideoDecoder import LowLatencyDecoder
+from DisplayStage import DisplayStage
+from Platform import get_screen_size, is_headless
+from CommandPipeline import CommandPipeline, CommandStep, SequenceResult, AckQueue
 
 
 ####################################################################################################################
@@ -26,42 +40,174 @@ class TelloMK2(tello.Tello):
     BATTERY_LEV_CRIT = 15
     BATTERY_LEV_WARN = 35
     LOG_NAME = "TELLO_PLUS"
+    LOG_LEVEL = logging.DEBUG
+    RC_RATE_HZ = 50
+    LOOP_STAGE = "loop"  # stage of the control tick, its rate is the loop Hz of the overlay
+    OVERLAY_REFRESH = 0.25  # seconds
+    OVERLAY_COLOR = (0, 255, 0)  # BGR
+
+    # Video backends
+    #   default     = Frames decoded by the BackgroundFrameRead of djitellopy
+    #   low_latency = Frames decoded by LowLatencyDecoder directly in the frame ring
+    VIDEO_BACKEND_DEFAULT = "default"
+    VIDEO_BACKEND_LOW_LATENCY = "low_latency"
+    VIDEO_BACKEND = VIDEO_BACKEND_DEFAULT
+    VIDEO_DECODER_THREADS = 1
+    DISPLAY_FPS = 30  # frames shown per second by show_img, independent of the control rate
+    DISPLAY_INTERPOLATION = cv2.INTER_LINEAR
+
+    # State conditions of the SDK commands, in place of fixed sleeps
+    TAKEOFF_HEIGHT = 50  # cm, height reached by the take-off
+    LANDED_HEIGHT = 10  # cm
+    SETTLE_TIMEOUT = 2.0  # seconds, maximum wait for the drone to stop before landing or after the take-off
+    LANDING_TIMEOUT = 5.0  # seconds
+    STOP_ACK_WINDOW = 0.3  # seconds, responses received after an emergency stop are not taken as acks
+    BATTERY_STOP_REASON = "battery level too low"
 
     # ---> CONSTRUCTOR
-    def __init__(self):
-        # Logger init
+    def __init__(self,
+                 host: str = tello.Tello.TELLO_IP,
+                 command_port: int | None = None,
+                 screen_size: tuple[int, int] | None = None):
+        """
+            host and command_port can be changed to connect to another drone or to a TelloSimulator.
+            screen_size is ( width, height ) of the screen where the frames are shown,
+            a GUI passes the size of its Tk root, otherwise it is queried by Platform.get_screen_size()
+        """
+        # Logger init: messages are formatted and written by a listener thread,
+        # the callers only check the level and queue the record
         self._logx = ZAGLogger(self.LOG_NAME, write_file=True)
+        self._log_buffer = LogBuffer()
+        self._async_log = AsyncLog(self.LOG_NAME, self.LOG_LEVEL)
+        self._async_log.add_sink(self._logx.print_log)
+        self._async_log.add_sink(self._log_buffer.append, with_created=True)
+        self._async_log.start()
+
+        # Timings of the hot paths, recorded only while the performance overlay is enabled
+        self._profiler = StageProfiler()
+        self._stage_rc_send = self._profiler.add_stage("rc_send")
+        self._stage_rc_log = self._profiler.add_stage("rc_log")
+        self._stage_show_resize = self._profiler.add_stage("show_resize")
+        self._stage_show_overlay = self._profiler.add_stage("show_overlay")
+        self._stage_show_imshow = self._profiler.add_stage("show_imshow")
+        self._stage_save_submit = self._profiler.add_stage("save_submit")
+        self._perf_overlay = False
+        self._overlay_lines = []
+        self._overlay_time = 0.0
 
         # Create a Tello instance and connect it to the drone
-        self._logx.print_log(logging.INFO, "Initialization...")
-        super().__init__()
+        self.print_log(logging.INFO, "Initialization...")
+        super().__init__(host)
+        if command_port is not None:
+            self.address = (host, command_port)
+
+        # RC commands are sent at a fixed rate by a dedicated thread,
+        # which is preempted by the emergency stop
+        self._emergency_stop = EmergencyStop()
+        self._rc_scheduler = RCScheduler(self._send_rc_setpoint,
+                                         self.RC_RATE_HZ,
+                                         self._emergency_stop,
+                                         self._on_emergency_stop_sent,
+                                         self.print_log)
+
+        # Telemetry is pushed by the state stream, battery levels are checked once per packet
+        self._telemetry = TelemetryCache(self.BATTERY_LEV_CRIT, self.BATTERY_LEV_WARN, self.print_log)
+        self._telemetry.on_battery_warning(self._on_battery_warning)
+        self._telemetry.on_battery_critical(self._on_battery_critical)
+        self._battery_critical = threading.Event()
+        self._acks = AckQueue()
+        self._ended = False
+        self._hook_state_stream()
+
+        # SDK commands are run in sequences by a worker, which tracks their acks
+        # and waits for state conditions instead of sleeping
+        self._command_pipeline = CommandPipeline(self.send_command_with_return,
+                                                 self._telemetry.wait_for_update,
+                                                 self.print_log)
+        self._command_pipeline.start()
+        self._setup_start = 0.0
+        self._setup_time = 0.0
+
+        # The pose is estimated from the state stream and from the RC setpoints sent
+        self._odometry = Odometry()
+        self._telemetry.on_update(self._odometry.add_state)
+
+        # Video frames are decoded and stored in a ring of buffers by a dedicated thread
+        self._frame_pipeline = FramePipeline(self._read_decoded_frame)
+        self._video_backend = self.VIDEO_BACKEND
+        self._video_decoder = None
+
+        # Frames are shown by a display stage with cached geometry, throttled to DISPLAY_FPS.
+        # In headless mode frames are still resized, but no window is opened
+        self._display = DisplayStage(screen_size if screen_size is not None else get_screen_size(),
+                                     self.DISPLAY_FPS,
+                                     self.DISPLAY_INTERPOLATION,
+                                     headless=is_headless())
+
+        # Captures are encoded and written on disk by a pool of background workers
+        self._capture_writer = CaptureWriter(log_fn=self.print_log)
+        self._capture_writer.start()
+
+        # RC setpoints, state packets and frames read are recorded on file during the flight
+        self._flight_recorder = FlightRecorder()
+        self._telemetry.on_update(self._record_state)
 
     def initialize(self):
-
-        try:
-            self._logx.print_log(logging.INFO, "Connecting to Tello...")
-            self.connect()
-        except Exception:
-            self._logx.print_log(logging.CRITICAL, "Connection refused")
+        self._setup_start = time.monotonic()
+        self._setup_time = 0.0
+
+        # A new connection ( e.g. after a battery swap ) starts without the alarms of the previous one
+        self._battery_critical.clear()
+        self._telemetry.reset_battery_alarms()
+
+        # SDK mode, the connection is completed by the first state packet
+        self.print_log(logging.INFO, "Connecting to Tello...")
+        result = self._command_pipeline.run([CommandStep("command", until=self._has_state, until_timeout=1.0)],
+                                            "Connection")
+        if not result.ok:
+            self.print_log(logging.CRITICAL, "Connection refused")
             raise Exception()
 
-        if self.get_battery() > 0:
-            self._logx.print_log(logging.INFO, "Successfully connected!")
+        battery = self.get_battery()
+        if battery > 0:
+            self.print_log(logging.INFO, "Successfully connected!")
         else:
-            self._logx.print_log(logging.ERROR, "Connection refused")
+            self.print_log(logging.ERROR, "Connection refused")
             raise Exception()
 
         # Check if drone is ready to Take-Off
-        self._logx.print_log(logging.INFO, "Battery Level:" + str(self.get_battery()))
-        if self.get_battery() >= TelloMK2.BATTERY_LEV_CRIT:
-            if self.get_battery() <= TelloMK2.BATTERY_LEV_WARN:
-                self._logx.print_log(logging.WARNING, "Low Battery Level")
-            self._logx.print_log(logging.INFO, "Ready to fly!")
+        self.print_log(logging.INFO, "Battery Level: %s", battery)
+        if battery >= TelloMK2.BATTERY_LEV_CRIT:
+            if battery <= TelloMK2.BATTERY_LEV_WARN:
+                self.print_log(logging.WARNING, "Low Battery Level")
+            self.print_log(logging.INFO, "Ready to fly!")
 
         else:
-            self._logx.print_log(logging.ERROR, "Battery level too low: unable to Take-Off")
+            self.print_log(logging.ERROR, "Battery level too low: unable to Take-Off")
             raise Exception()
 
+        self._flight_recorder.open()
+        self.print_log(logging.INFO, "Flight recording: %s", self._flight_recorder.get_path())
+
+        self._rc_scheduler.start()
+
+    def end(self):
+        # djitellopy calls end() again from __del__: a Tello already ended ( or garbage collected after
+        # a newer one took its host ) must not remove the entry of drones that the newer one uses
+        if getattr(self, "_ended", True):
+            return
+        self._ended = True
+
+        self._rc_scheduler.stop()
+        self._stop_video()
+        self._display.close()
+        self._capture_writer.stop()
+        self._flight_recorder.close()
+        if tello.drones.get(self.address[0]) is self._drone_entry:
+            super().end()
+        self._command_pipeline.stop()
+        self._async_log.stop()
+
     # ---> FUNCTIONS
     def send_rc_controlx(self,
                          left_right_velocity: int,
@@ -71,132 +217,515 @@ class TelloMK2(tello.Tello):
                          sleep_time: float):
         """
             Flying movement with the addiction of a time interval ( overloading base method )
-            It will check also battery level, starting emergency landing if it is too low
+            If the battery level is too low, the emergency landing has already been started
+            by the telemetry and any further movement will be refused
+
+            The movement only updates the setpoint of the RC scheduler, which keeps sending it
+            at a fixed rate, so the call does not block.
+            If sleep_time is greater than zero, the caller will wait for that interval
+            while the setpoint is being held.
         """
 
-        super().send_rc_control(left_right_velocity,
-                                forward_backward_velocity,
-                                yaw_velocity,
-                                up_down_velocity)
+        start = self._profiler.begin()
+
+        is_moving = (left_right_velocity != 0 or forward_backward_velocity != 0
+                     or yaw_velocity != 0 or up_down_velocity != 0)
+        if is_moving and self._battery_critical.is_set():
+            raise Exception()
+
+        if self._rc_scheduler.is_running():
+            self._rc_scheduler.set_setpoint(left_right_velocity,
+                                            forward_backward_velocity,
+                                            up_down_velocity,
+                                            yaw_velocity)
+        else:
+            self._send_rc_setpoint(left_right_velocity,
+                                   forward_backward_velocity,
+                                   up_down_velocity,
+                                   yaw_velocity)
+
+        self._flight_recorder.record_rc(left_right_velocity,
+                                        forward_backward_velocity,
+                                        up_down_velocity,
+                                        yaw_velocity)
+        self._profiler.end(self._stage_rc_send, start)
+
         if sleep_time > 0:
             time.sleep(sleep_time)
 
-        if left_right_velocity != 0 or forward_backward_velocity != 0 or yaw_velocity != 0 or up_down_velocity != 0:
-            log_msg = "Movement -> |"
-            log_msg = log_msg + f'left_right: {left_right_velocity} |'
-            log_msg = log_msg + f'forward_backward: {forward_backward_velocity} |'
-            log_msg = log_msg + f'yaw: {yaw_velocity} |'
-            log_msg = log_msg + f'up_down: {up_down_velocity} |'
-            log_msg = log_msg + f'sleep: {sleep_time} |'
+        if is_moving:
+            # The message is formatted by the log listener, and only if DEBUG is enabled
+            start = self._profiler.begin()
+            self.print_log(logging.DEBUG,
+                           "Movement -> |left_right: %s |forward_backward: %s |yaw: %s |up_down: %s |sleep: %s |",
+                           left_right_velocity,
+                           forward_backward_velocity,
+                           yaw_velocity,
+                           up_down_velocity,
+                           sleep_time)
+            self._profiler.end(self._stage_rc_log, start)
+
+    def get_rc_stats(self) -> dict:
+        return self._rc_scheduler.get_stats()
+
+    def emergency_stop(self, reason: str = ""):
+        """
+            Stops the drone in hovering as fast as possible, aborting the running replays
+            and the queued command sequences ( e.g. go missions ).
+            Movements are ignored until clear_emergency_stop() is called
+        """
+        self._emergency_stop.trigger(reason)
+        self.print_log(logging.CRITICAL, "Emergency Stop %s", reason)
 
-            self._logx.print_log(logging.DEBUG, log_msg)
+        # The SDK stop hovers also during a go or cw command, which RC setpoints do not interrupt.
+        # The command waiting for its response gives up, so it does not take the response of the stop
+        self._command_pipeline.cancel()
+        self._acks.interrupt(self.STOP_ACK_WINDOW)
+        self.send_command_without_return("stop")
 
-        if self.get_battery() < self.BATTERY_LEV_CRIT:
-            self._logx.print_log(logging.CRITICAL, "Battery level too low: Starting Emergency Landing")
-            self.land()
-            raise Exception()
+        if not self._rc_scheduler.is_running():
+            self._send_rc_setpoint(*RCScheduler.ZERO_SETPOINT)
+            self._on_emergency_stop_sent(time.perf_counter() - self._emergency_stop.get_trigger_time())
+
+    def clear_emergency_stop(self) -> bool:
+        """
+            Releases the emergency stop, unless the battery level is too low:
+            the stop of the emergency landing is kept until a new connection.
+            Returns if the stop is not active anymore
+        """
+        if not self._emergency_stop.is_triggered():
+            return True
+
+        if self._battery_critical.is_set():
+            self.print_log(logging.WARNING, "Emergency Stop kept: battery level too low")
+            return False
+
+        self._emergency_stop.clear()
+        self.print_log(logging.INFO, "Emergency Stop released")
+        return True
+
+    def is_emergency_stopped(self) -> bool:
+        return self._emergency_stop.is_triggered()
+
+    def get_emergency_stop(self) -> EmergencyStop:
+        return self._emergency_stop
+
+    def _on_emergency_stop_sent(self, latency: float):
+        self.print_log(logging.CRITICAL, "Emergency Stop sent in %.2f ms", latency * 1000)
+
+    def get_battery(self) -> int:
+        """
+            Returns the battery level cached from the state stream ( overloading base method )
+        """
+        battery = self._telemetry.get_battery()
+        if battery < 0:
+            battery = super().get_battery()
+        return battery
+
+    def get_telemetry(self) -> TelemetryCache:
+        return self._telemetry
+
+    def get_odometry(self) -> Odometry:
+        return self._odometry
+
+    def _hook_state_stream(self):
+        # djitellopy stores each parsed state packet with  drones[host]['state'] = state
+        # and each response with  drones[host]['responses'].append(response)
+        host = self.address[0]
+        self._drone_entry = StateNotifyingDict(tello.drones[host], self._telemetry.update)
+        self._drone_entry["responses"] = self._acks
+        tello.drones[host] = self._drone_entry
+
+    def _on_battery_warning(self, battery: int):
+        self.print_log(logging.WARNING, "Low Battery Level: %s", battery)
+
+    def _on_battery_critical(self, battery: int):
+        # Fired by the state receiver thread: landing is blocking, so it runs on its own thread
+        self._battery_critical.set()
+        self.print_log(logging.CRITICAL, "Battery level too low: Starting Emergency Landing")
+        if self.is_flying:
+            threading.Thread(target=self._emergency_land, name="EmergencyLanding", daemon=True).start()
+
+    def _emergency_land(self):
+        self._emergency_stop.trigger(self.BATTERY_STOP_REASON)
+        self.land()
+
+    def _send_rc_setpoint(self,
+                          left_right_velocity: int,
+                          forward_backward_velocity: int,
+                          up_down_velocity: int,
+                          yaw_velocity: int):
+        super().send_rc_control(left_right_velocity,
+                                forward_backward_velocity,
+                                yaw_velocity,
+                                up_down_velocity)
+        self._odometry.add_setpoint(left_right_velocity,
+                                    forward_backward_velocity,
+                                    yaw_velocity,
+                                    up_down_velocity)
 
     def takeoff(self):
         """
-            Start Take-Off with the addiction of a waiting interval of 2 secs.
+            Start Take-Off, waiting for the drone to reach TAKEOFF_HEIGHT and to stop ( at most SETTLE_TIMEOUT secs ).
             In this way, the drone will takes-off avoiding unwanted movements
         """
 
-        self._logx.print_log(logging.INFO, "Starting Take-Off")
+        self.print_log(logging.INFO, "Starting Take-Off")
+
+        # Zero setpoint, so the drone hovers as soon as it is in the air
+        self.send_rc_controlx(0, 0, 0, 0, 0)
+        self.run_commands([CommandStep("takeoff",
+                                       until=self._is_hovering,
+                                       timeout=self.TAKEOFF_TIMEOUT,
+                                       until_timeout=self.SETTLE_TIMEOUT,
+                                       required=False)],
+                          "Take-Off")
+        self.is_flying = True
 
-        super().takeoff()
-        self.send_rc_controlx(0, 0, 0, 0, 2)
+        if self._setup_start > 0 and self._setup_time == 0:
+            self._setup_time = time.monotonic() - self._setup_start
+            self.print_log(logging.INFO, "Mission setup completed in %.2f s", self._setup_time)
 
-        self._logx.print_log(logging.INFO, "Take-Off completed")
+        self.print_log(logging.INFO, "Take-Off completed")
 
     def land(self):
         """
-            Start landing with the addiction of a waiting interval of 2 secs.
+            Start landing after the drone has stopped ( at most SETTLE_TIMEOUT secs ),
+            waiting for the drone to be on the ground.
             In this way, the drone will land avoiding unwanted movements
         """
 
-        self._logx.print_log(logging.INFO, "Starting Landing")
+        self.print_log(logging.INFO, "Starting Landing")
 
-        self.send_rc_controlx(0, 0, 0, 0, 2)
-        super().land()
+        self.send_rc_controlx(0, 0, 0, 0, 0)
+        self.run_commands([CommandStep(None, until=self._is_still, until_timeout=self.SETTLE_TIMEOUT, required=False),
+                           CommandStep("land", until=self._is_landed, until_timeout=self.LANDING_TIMEOUT, required=False)],
+                          "Landing")
+        self.is_flying = False
 
-        self._logx.print_log(logging.INFO, "Landing completed")
+        self.print_log(logging.INFO, "Landing completed")
 
     def start_streaming(self):
         if not self.stream_on:
-            self.streamon()
-            time.sleep(0.3)
-            self._logx.print_log(logging.INFO, "Streaming: ON")
+            # The decoder starts as soon as the stream is acknowledged, frames are read when they arrive
+            self.run_commands([CommandStep("streamon")], "Streaming ON")
+            self.stream_on = True
+            self._start_video()
+            self.print_log(logging.INFO, "Streaming: ON ( %s )", self._video_backend)
         else:
-            self._logx.print_log(logging.WARNING, "Streaming already ON")
+            self.print_log(logging.WARNING, "Streaming already ON")
 
     def stop_streaming(self):
         if self.stream_on:
-            self.streamoff()
-            time.sleep(0.3)
-            self._logx.print_log(logging.INFO, "Streaming: OFF")
+            self._stop_video()
+            self.run_commands([CommandStep("streamoff")], "Streaming OFF")
+            self.stream_on = False
+
+            # As djitellopy streamoff does
+            if self.background_frame_read is not None:
+                self.background_frame_read.stop()
+                self.background_frame_read = None
+            self.print_log(logging.INFO, "Streaming: OFF")
         else:
-            self._logx.print_log(logging.WARNING, "Streaming already OFF")
+            self.print_log(logging.WARNING, "Streaming already OFF")
+
+    def send_command_with_return(self, command: str, timeout: float = tello.Tello.RESPONSE_TIMEOUT) -> str:
+        """
+            Sends an SDK command and waits for its response ( overloading base method ).
+            The caller is woken up by the response, instead of checking for it every 0.1 secs
+        """
+        interval = self.TIME_BTW_COMMANDS - (time.time() - self.last_received_command_timestamp)
+        if interval > 0:
+            time.sleep(interval)
+
+        # A late response of an expired command, or of a stop, would be taken as the response of this one
+        self._acks.wait_quiet()
+        tello.client_socket.sendto(command.encode("utf-8"), self.address)
+
+        response = self._acks.wait_pop(timeout)
+        if response is None:
+            return f"Aborting command '{command}'. Did not receive a response after {timeout} seconds"
+        if response is AckQueue.INTERRUPTED:
+            return f"Aborting command '{command}'. Interrupted by the emergency stop"
+
+        self.last_received_command_timestamp = time.time()
+        return response.decode("utf-8", errors="ignore").rstrip("\r\n")
+
+    def run_commands(self, steps: list[CommandStep], name: str = "") -> SequenceResult:
+        """
+            Runs a sequence of SDK commands after the sequences already queued, and waits for its end.
+            Raises TelloException if a step fails
+        """
+        result = self._command_pipeline.run(steps, name)
+        self.print_log(logging.DEBUG, "%s completed in %.3f s", name, result.total_time)
+
+        if not result.ok:
+            failed = result.steps[-1] if result.steps else None
+            if failed is None or failed.ok:
+                raise tello.TelloException(f"{name}: cancelled")
+            raise tello.TelloException(f"{name}: command '{failed.command}' unsuccessful after "
+                                       f"{failed.attempts} attempts ( {failed.response} )")
+        return result
+
+    def submit_commands(self, steps: list[CommandStep], name: str = "") -> Future:
+        """
+            Queues a sequence of SDK commands without waiting, the future is completed with its SequenceResult
+        """
+        return self._command_pipeline.submit(steps, name)
+
+    def get_command_stats(self) -> dict:
+        """
+            Returns the statistics of the command pipeline and the mission setup time
+        """
+        stats = self._command_pipeline.get_stats()
+        stats["setup_s"] = self._setup_time
+        return stats
+
+    def get_setup_time(self) -> float:
+        """
+            Returns the seconds from the start of initialize() to the end of the first take-off, 0 before it
+        """
+        return self._setup_time
+
+    def _has_state(self) -> bool:
+        return self._telemetry.get_packets() > 0
+
+    def _is_still(self) -> bool:
+        # Speeds of the state stream, in dm/s
+        state = self._telemetry.get_state()
+        return state.get("vgx", 0) == 0 and state.get("vgy", 0) == 0 and state.get("vgz", 0) == 0
+
+    def _is_hovering(self) -> bool:
+        return self._telemetry.get_state_field("h", 0) >= self.TAKEOFF_HEIGHT and self._is_still()
+
+    def _is_landed(self) -> bool:
+        return self._telemetry.get_state_field("h", 0) <= self.LANDED_HEIGHT
+
+    def set_video_backend(self, backend: str):
+        """
+            Selects the video backend ( VIDEO_BACKEND_DEFAULT or VIDEO_BACKEND_LOW_LATENCY ),
+            used from the next start_streaming()
+        """
+        if backend not in (self.VIDEO_BACKEND_DEFAULT, self.VIDEO_BACKEND_LOW_LATENCY):
+            raise ValueError("Unsupported video backend: " + backend)
+        self._video_backend = backend
+
+    def get_video_backend(self) -> str:
+        return self._video_backend
+
+    def _start_video(self):
+        if self._video_backend == self.VIDEO_BACKEND_LOW_LATENCY:
+            # The decoder listens on the video port in place of the BackgroundFrameRead of djitellopy
+            self._video_decoder = LowLatencyDecoder(self._frame_pipeline.get_ring(),
+                                                    self.VS_UDP_IP,
+                                                    self.vs_udp_port,
+                                                    self.VIDEO_DECODER_THREADS)
+            self._video_decoder.start()
+        else:
+            self._frame_pipeline.start()
+
+    def _stop_video(self):
+        self._frame_pipeline.stop()
+        if self._video_decoder is not None:
+            self._video_decoder.stop()
 
     def get_img(self) -> Any | None:
         """
-            Returns the frame captured by tello.
+            Returns the latest frame captured by tello.
+            The frame is a read-only view of the frame ring: copy it if it must be modified or kept
         """
-        img = None
-        if self.stream_on:
-            img = self.get_frame_read().frame
+        frame_view = self.get_frame()
+        if frame_view is None:
+            return None
+
+        return frame_view.frame
+
+    def get_frame(self) -> FrameView | None:
+        """
+            Returns the latest frame with its sequence number and capture timestamp
+        """
+        if not self.stream_on:
+            return None
+
+        frame_view = self._frame_pipeline.latest()
+        if frame_view is not None:
+            self._flight_recorder.record_frame(frame_view.seq, frame_view.timestamp)
 
-        return img
+        return frame_view
+
+    def get_frame_stats(self) -> dict:
+        """
+            Returns the statistics of the frame ring and, with the low latency backend,
+            of the decoder ( see LowLatencyDecoder.get_stats )
+        """
+        stats = self._frame_pipeline.get_stats()
+        stats["backend"] = self._video_backend
+        if self._video_backend == self.VIDEO_BACKEND_LOW_LATENCY and self._video_decoder is not None:
+            stats.update(self._video_decoder.get_stats())
+        return stats
+
+    def _read_decoded_frame(self) -> Any | None:
+        return self.get_frame_read().frame
 
     def show_img(self, resize_x: int, resize_y: int) -> Any | None:
         """
             It will show with CV2 the captured frame on you screen.
             If resize params are given, the image will be resized
                 for example 720 x 480.
-            If zero is passed, it will use the half of resolution of your screen
+            If zero is passed, it will use the size of the window ( half of resolution of your screen at start )
+
+            Frames are shown at most DISPLAY_FPS times per second: when it is not time
+            to show a new frame, nothing is done and None is returned.
+            The resized image is a buffer reused by the next call
         """
+        if not self._display.is_due():
+            return None
+
         img = self.get_img()
         if img is None:
             return img
 
-        width = int(GetSystemMetrics(0) / 2)
-        height = int(GetSystemMetrics(1) / 2)
+        start = self._profiler.begin()
+        resized_img = self._display.resize(img, resize_x, resize_y)
+        self._profiler.end(self._stage_show_resize, start)
 
-        if resize_x > 0:
-            width = resize_x
+        if self._perf_overlay:
+            start = self._profiler.begin()
+            self._draw_overlay(resized_img)
+            self._profiler.end(self._stage_show_overlay, start)
 
-        if resize_y > 0:
-            height = resize_y
+        start = self._profiler.begin()
+        self._display.show(resized_img)
+        self._profiler.end(self._stage_show_imshow, start)
 
-        resized_img = cv2.resize(img, (width, height))
+        return [img, resized_img]
 
-        cv2.imshow("Tello Frame", resized_img)
-        cv2.waitKey(1)
+    def set_display_options(self, fps: float | None = None, interpolation: int | None = None):
+        """
+            Changes the maximum FPS of show_img ( 0 shows every frame ) and the cv2 interpolation of the resize
+        """
+        if fps is not None:
+            self._display.set_target_fps(fps)
+        if interpolation is not None:
+            self._display.set_interpolation(interpolation)
 
-        return [img, resized_img]
+    def get_display(self) -> DisplayStage:
+        return self._display
 
-    def save_img(self, img):
+    def save_img(self, frame_view: FrameView | None = None):
         """
-            Save image on your desktop
+            Queues the frame to be saved in the captures directory ( by default the latest one ).
+            The frame is written by a background worker, so the call does not block
         """
 
-        if img is None:
-            self._logx.print_log(logging.ERROR, "Unable to save Img. No frame captured")
+        if frame_view is None:
+            frame_view = self.get_frame()
+
+        if frame_view is None:
+            self.print_log(logging.ERROR, "Unable to save Img. No frame captured")
             return
 
-        img_name = f'\\{time.time()}.jpg'
-        out_path = os.path.join(os.path.join(os.environ['USERPROFILE']), 'Desktop')
-        out_path = out_path + '\\TelloCaptures'
-        if not os.path.isdir(out_path):
-            os.makedirs(out_path)
+        start = self._profiler.begin()
+        self._capture_writer.submit(frame_view)
+        self._profiler.end(self._stage_save_submit, start)
 
-        out_path = out_path + img_name
+    def set_capture_writer(self, capture_writer: CaptureWriter):
+        """
+            Replaces the capture writer, for example to change output directory or format
+        """
+        self._capture_writer.stop()
+        self._capture_writer = capture_writer
+        self._capture_writer.start()
 
-        cv2.imwrite(out_path, img)
-        time.sleep(0.3)
+    def get_capture_stats(self) -> dict:
+        return self._capture_writer.get_stats()
 
-        log_msg = "Frame captured: " + out_path
-        self._logx.print_log(logging.INFO, log_msg)
+    def get_flight_recorder(self) -> FlightRecorder:
+        return self._flight_recorder
 
-    def get_log_entries(self):
-        return self._logx.get_log_entries()
+    def set_flight_recorder(self, flight_recorder: FlightRecorder):
+        """
+            Replaces the flight recorder, for example to change output directory.
+            If the recording is running, it continues on a new file of the new recorder
+        """
+        was_open = self._flight_recorder.is_open()
+        self._flight_recorder.close()
+        self._flight_recorder = flight_recorder
+        if was_open:
+            self._flight_recorder.open()
+
+    def _record_state(self, state: dict):
+        # Resolved on every packet, the recorder can be replaced
+        self._flight_recorder.record_state(state)
+
+    def set_perf_overlay(self, enabled: bool):
+        """
+            Enables the timings of the hot paths and the performance overlay of the video window
+        """
+        if enabled and not self._profiler.is_enabled():
+            self._profiler.reset()
+        self._profiler.set_enabled(enabled)
+        self._perf_overlay = enabled
+        self._overlay_time = 0.0
+
+    def is_perf_overlay(self) -> bool:
+        return self._perf_overlay
+
+    def get_profiler(self) -> StageProfiler:
+        return self._profiler
+
+    def get_overlay_lines(self) -> list[str]:
+        """
+            Returns the lines of the performance overlay: loop Hz, video FPS, dropped frames
+            and the latency of each stage. Lines are rebuilt at most every OVERLAY_REFRESH seconds
+        """
+        now = time.monotonic()
+        if now - self._overlay_time >= self.OVERLAY_REFRESH:
+            self._overlay_lines = self._format_overlay()
+            self._overlay_time = now
+
+        return self._overlay_lines
+
+    def _format_overlay(self) -> list[str]:
+        stats = self._profiler.get_stats()
+        frame_stats = self.get_frame_stats()
+        loop_hz = stats[self.LOOP_STAGE]["hz"] if self.LOOP_STAGE in stats else 0.0
+
+        lines = [f'Loop: {loop_hz:.0f} Hz | Video: {frame_stats["fps"]:.1f} FPS | Dropped: {frame_stats["dropped"]}']
+        if "latency_avg_ms" in frame_stats:
+            lines.append(f'Decode: avg {frame_stats["latency_avg_ms"]:.2f} ms | p95 {frame_stats["latency_p95_ms"]:.2f} ms'
+                         f' | skipped: {frame_stats["skipped"]}')
+        for name, stage in stats.items():
+            lines.append(f'{name}: avg {stage["avg_ms"]:.2f} ms | p95 {stage["p95_ms"]:.2f} ms | max {stage["max_ms"]:.2f} ms')
+
+        return lines
+
+    def _draw_overlay(self, img):
+        for indx, line in enumerate(self.get_overlay_lines()):
+            cv2.putText(img, line, (10, 20 + indx * 18), cv2.FONT_HERSHEY_SIMPLEX, 0.45,
+                        self.OVERLAY_COLOR, 1, cv2.LINE_AA)
+
+    def print_log(self, level: int, msg: str, *args):
+        """
+            Logs msg % args. Nothing is formatted if the level is disabled,
+            otherwise the formatting and the writing are done by the log listener thread
+        """
+        self._async_log.log(level, msg, *args)
+
+    def set_log_level(self, level: int):
+        self._async_log.set_level(level)
+
+    def is_log_enabled(self, level: int) -> bool:
+        return self._async_log.is_enabled_for(level)
+
+    def get_log_entries(self, limit: int | None = None) -> list[str]:
+        """
+            Returns the last log entries retained in memory, at most LogBuffer.DEFAULT_CAPACITY
+        """
+        return self._log_buffer.get_texts(limit)
+
+    def entries_since(self, seq: int) -> list[tuple[int, str, str]]:
+        """
+            Returns the log entries added after the sequence number seq as (seq, level_name, text)
+        """
+        return self._log_buffer.entries_since(seq)
@@ -0,0 +1,431 @@
+####################################################################################################################
+# IMPORTS
+import argparse
+import heapq
+import math
+import random
+import socket
+import threading
+import time
+import numpy as np
+
+
+####################################################################################################################
+# CORE
+class TelloSimulator:
+    """
+        Local simulator of the Tello SDK, to run TelloMK2 and Cockpit without a drone.
+
+        It answers the SDK commands on the command port, sends state packets to the client
+        on the state port ( 8890 ) and optionally a test-pattern video stream on the video port ( 11111 ).
+        Latency and packet loss can be injected on every packet, in both directions.
+
+        Usage with TelloMK2: only the host has to be changed, e.g.  TelloMK2(host="192.168.10.2").
+        djitellopy binds the port 8889 on all the interfaces of the ground station, so a simulator
+        on the same machine needs another command port:  TelloMK2(host="127.0.0.2", command_port=9889).
+        On Linux every 127.x.x.x address is a loopback address, so more simulators can run
+        side by side with a different host each.
+
+        Video modes:
+            None = No video
+            h264 = Test pattern encoded in H.264 with PyAV, decodable by djitellopy
+            raw  = Test pattern as raw BGR frames split in datagrams, for custom receivers
+    """
+
+    # ---> CONSTANTS
+    COMMAND_PORT = 8889
+    STATE_PORT = 8890
+    VIDEO_PORT = 11111
+    VIDEO_SIZE = (960, 720)
+    VIDEO_FPS = 30
+    VIDEO_MODES = (None, "h264", "raw")
+    DATAGRAM_SIZE = 1460
+    TAKEOFF_HEIGHT = 80  # cm
+    RC_SPEED_SCALE = 1.0  # cm/s per RC unit
+    RC_YAW_SCALE = 1.0  # deg/s per RC unit
+    BATTERY_DRAIN = 0.05  # % per second while flying
+
+    # Query commands and the state value they answer with
+    QUERIES = {
+        "battery?": lambda sim: str(int(sim.battery)),
+        "speed?": lambda sim: str(sim.speed),
+        "time?": lambda sim: f'{int(sim.flight_time)}s',
+        "height?": lambda sim: f'{int(sim.position[2] / 10)}dm',
+        "temp?": lambda sim: "60~63C",
+        "attitude?": lambda sim: f'pitch:0;roll:0;yaw:{int(sim.yaw)};',
+        "baro?": lambda sim: f'{sim.position[2] / 100:.2f}',
+        "tof?": lambda sim: f'{max(10, int(sim.position[2]))}mm',
+        "wifi?": lambda sim: "90",
+        "sdk?": lambda sim: "20",
+        "sn?": lambda sim: "0TQZSIMULATOR",
+    }
+
+    # ---> CONSTRUCTOR
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 command_port: int = COMMAND_PORT,
+                 state_port: int = STATE_PORT,
+                 video_port: int = VIDEO_PORT,
+                 state_rate_hz: float = 10,
+                 video: str | None = None,
+                 latency: float = 0.0,
+                 latency_jitter: float = 0.0,
+                 packet_loss: float = 0.0,
+                 battery: float = 100):
+
+        if video not in self.VIDEO_MODES:
+            raise ValueError(f'Unsupported video mode: {video}')
+
+        self._host = host
+        self._command_port = command_port
+        self._state_port = state_port
+        self._video_port = video_port
+        self._state_period = 1.0 / state_rate_hz
+        self._video = video
+        self._latency = latency
+        self._latency_jitter = latency_jitter
+        self._packet_loss = packet_loss
+
+        # Drone state
+        self.battery = battery
+        self.speed = 10
+        self.flight_time = 0.0
+        self.position = np.zeros(3)  # cm
+        self.velocity = np.zeros(3)  # cm/s
+        self.yaw = 0.0
+        self.yaw_rate = 0.0
+        self.is_flying = False
+        self.stream_on = False
+        self._last_physics = time.monotonic()
+        self._physics_lock = threading.RLock()
+
+        self._client_ip = None
+        self._command_socket = None
+        self._send_socket = None
+
+        self._outbox = []  # Heap of ( send_time, counter, data, address, socket )
+        self._outbox_counter = 0
+        self._outbox_cond = threading.Condition()
+
+        self._threads = []
+        self._running = False
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"commands": 0, "rc": 0, "dropped_in": 0, "dropped_out": 0, "state_sent": 0, "frames_sent": 0}
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self._running:
+            return
+
+        self._command_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._command_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._command_socket.bind((self._host, self._command_port))
+        self._command_socket.settimeout(0.2)
+
+        # State and video are sent from the simulator host, so the client can recognize the drone
+        self._send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._send_socket.bind((self._host, 0))
+
+        self._running = True
+        targets = [self._run_commands, self._run_outbox, self._run_state]
+        if self._video is not None:
+            targets.append(self._run_video)
+
+        for target in targets:
+            thread = threading.Thread(target=target, name=f'TelloSimulator-{target.__name__}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+        with self._outbox_cond:
+            self._outbox_cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+        self._command_socket.close()
+        self._send_socket.close()
+
+    def get_address(self) -> tuple[str, int]:
+        return self._host, self._command_port
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def handle_command(self, command: str) -> str | None:
+        """
+            Applies an SDK command to the simulated drone and returns the response,
+            None for the commands without response ( rc ).
+            Malformed arguments ( e.g. "speed abc" ) get "error", as from the real drone
+        """
+        with self._physics_lock:
+            try:
+                return self._handle_command(command)
+            except (ValueError, TypeError):
+                return "error"
+
+    def get_state_packet(self) -> str:
+        with self._physics_lock:
+            self._update_physics()
+            # Velocities are in dm/s with x forward and y left as on the Tello, heights in cm, barometer in m
+            return (f'pitch:0;roll:0;yaw:{int(self.yaw)};'
+                    f'vgx:{int(self.velocity[1] / 10)};vgy:{int(-self.velocity[0] / 10)};'
+                    f'vgz:{int(self.velocity[2] / 10)};'
+                    f'templ:60;temph:63;tof:{max(10, int(self.position[2]))};h:{int(self.position[2])};'
+                    f'bat:{int(self.battery)};baro:{self.position[2] / 100:.2f};time:{int(self.flight_time)};'
+                    f'agx:0.00;agy:0.00;agz:-1000.00;\r\n')
+
+    def _handle_command(self, command: str) -> str | None:
+        self._update_physics()
+        words = command.strip().split()
+        if not words:
+            return "error"
+
+        name, args = words[0], words[1:]
+
+        if name == "rc":
+            self._count("rc")
+            if len(args) == 4 and self.is_flying:
+                left_right, forward_backward, up_down, yaw = (int(arg) for arg in args)
+                self._set_rc(left_right, forward_backward, up_down, yaw)
+            return None
+
+        self._count("commands")
+        if name in self.QUERIES:
+            return self.QUERIES[name](self)
+
+        if name == "command":
+            return "ok"
+        if name == "takeoff":
+            self.is_flying = True
+            self.position[2] = self.TAKEOFF_HEIGHT
+            return "ok"
+        if name in ("land", "emergency"):
+            self.is_flying = False
+            self.velocity[:] = 0
+            self.yaw_rate = 0
+            self.position[2] = 0
+            return "ok"
+        if name == "streamon":
+            self.stream_on = True
+            return "ok"
+        if name == "streamoff":
+            self.stream_on = False
+            return "ok"
+        if name == "speed" and len(args) == 1:
+            self.speed = int(args[0])
+            return "ok"
+        if name in ("up", "down", "left", "right", "forward", "back", "cw", "ccw") and len(args) == 1:
+            return self._move(name, int(args[0]))
+        if name == "go" and len(args) >= 3:
+            if not self.is_flying:
+                return "error Not flying"
+            # go x y z: x forward, y left, z up
+            self.position += self._to_map_frame(-int(args[1]), int(args[0]), int(args[2]))
+            return "ok"
+        if name in ("stop", "motoron", "motoroff", "setresolution", "setfps", "setbitrate", "downvision"):
+            return "ok"
+
+        return "error"
+
+    def _set_rc(self, left_right: int, forward_backward: int, up_down: int, yaw: int):
+        self.velocity[:] = self._to_map_frame(left_right, forward_backward, up_down) * self.RC_SPEED_SCALE
+        self.yaw_rate = yaw * self.RC_YAW_SCALE
+
+    def _move(self, direction: str, value: int) -> str:
+        if not self.is_flying:
+            return "error Not flying"
+
+        if direction in ("cw", "ccw"):
+            self.yaw = (self.yaw + (value if direction == "cw" else -value)) % 360
+            return "ok"
+
+        left_right = {"left": -value, "right": value}.get(direction, 0)
+        forward_backward = {"forward": value, "back": -value}.get(direction, 0)
+        up_down = {"up": value, "down": -value}.get(direction, 0)
+        self.position += self._to_map_frame(left_right, forward_backward, up_down)
+        return "ok"
+
+    def _to_map_frame(self, left_right: float, forward_backward: float, up_down: float) -> np.ndarray:
+        heading = math.radians(self.yaw)
+        return np.array((forward_backward * math.sin(heading) + left_right * math.cos(heading),
+                         forward_backward * math.cos(heading) - left_right * math.sin(heading),
+                         up_down))
+
+    def _update_physics(self):
+        now = time.monotonic()
+        dt = now - self._last_physics
+        self._last_physics = now
+
+        if self.is_flying:
+            self.position += self.velocity * dt
+            self.position[2] = max(0.0, self.position[2])
+            self.yaw = (self.yaw + self.yaw_rate * dt) % 360
+            self.flight_time += dt
+            self.battery = max(0.0, self.battery - self.BATTERY_DRAIN * dt)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _is_lost(self) -> bool:
+        return self._packet_loss > 0 and random.random() < self._packet_loss
+
+    def _send_later(self, data: bytes, address: tuple[str, int], sock: socket.socket | None = None):
+        # Every outgoing packet goes through the outbox, which applies latency and loss
+        if sock is None:
+            sock = self._send_socket
+
+        if self._is_lost():
+            self._count("dropped_out")
+            return
+
+        delay = self._latency
+        if self._latency_jitter > 0:
+            delay += random.uniform(0, self._latency_jitter)
+
+        if delay <= 0:
+            sock.sendto(data, address)
+            return
+
+        with self._outbox_cond:
+            self._outbox_counter += 1
+            heapq.heappush(self._outbox, (time.monotonic() + delay, self._outbox_counter, data, address, sock))
+            self._outbox_cond.notify()
+
+    def _run_outbox(self):
+        while self._running:
+            with self._outbox_cond:
+                if not self._outbox:
+                    self._outbox_cond.wait(0.2)
+                    continue
+
+                send_time = self._outbox[0][0]
+                delay = send_time - time.monotonic()
+                if delay > 0:
+                    self._outbox_cond.wait(delay)
+                    continue
+
+                _, _, data, address, sock = heapq.heappop(self._outbox)
+
+            sock.sendto(data, address)
+
+    def _run_commands(self):
+        while self._running:
+            try:
+                data, address = self._command_socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if self._is_lost():
+                self._count("dropped_in")
+                continue
+
+            self._client_ip = address[0]
+            response = self.handle_command(data.decode("utf-8", errors="ignore"))
+            if response is not None:
+                # Responses go back from the command socket, as the real drone does
+                self._send_later(response.encode("utf-8"), address, self._command_socket)
+
+    def _run_state(self):
+        next_tick = time.monotonic()
+        while self._running:
+            if self._client_ip is not None:
+                packet = self.get_state_packet().encode("ASCII")
+                self._send_later(packet, (self._client_ip, self._state_port))
+                self._count("state_sent")
+
+            next_tick += self._state_period
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def _run_video(self):
+        encoder = self._create_h264_encoder() if self._video == "h264" else None
+        frame_period = 1.0 / self.VIDEO_FPS
+        frame_indx = 0
+
+        next_tick = time.monotonic()
+        while self._running:
+            if self.stream_on and self._client_ip is not None:
+                frame = self._test_pattern(frame_indx)
+                if encoder is None:
+                    payload = [frame.tobytes()]
+                else:
+                    payload = self._encode_h264(encoder, frame, frame_indx)
+
+                address = (self._client_ip, self._video_port)
+                for data in payload:
+                    for offset in range(0, len(data), self.DATAGRAM_SIZE):
+                        self._send_later(data[offset:offset + self.DATAGRAM_SIZE], address)
+
+                frame_indx += 1
+                self._count("frames_sent")
+
+            next_tick += frame_period
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def _test_pattern(self, frame_indx: int) -> np.ndarray:
+        # Moving color bars, with the frame counter encoded in the first row
+        width, height = self.VIDEO_SIZE
+        bars = np.arange(width, dtype=np.uint16)[None, :] + frame_indx * 8
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = (bars % 256).astype(np.uint8)
+        frame[:, :, 1] = ((bars // 2) % 256).astype(np.uint8)
+        frame[:, :, 2] = np.arange(height, dtype=np.uint16)[:, None] % 256
+        frame[0, :4, 0] = np.frombuffer(frame_indx.to_bytes(4, "big"), dtype=np.uint8)
+        return frame
+
+    def _create_h264_encoder(self):
+        import av  # Optional dependency, only needed for the h264 video mode
+
+        width, height = self.VIDEO_SIZE
+        encoder = av.CodecContext.create("h264", "w")
+        encoder.width = width
+        encoder.height = height
+        encoder.pix_fmt = "yuv420p"
+        encoder.framerate = self.VIDEO_FPS
+        encoder.gop_size = self.VIDEO_FPS  # A key frame every second, as the Tello, so a late client can join
+        encoder.options = {"tune": "zerolatency", "preset": "ultrafast"}
+        return encoder
+
+    @staticmethod
+    def _encode_h264(encoder, frame: np.ndarray, frame_indx: int) -> list[bytes]:
+        import av
+
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = frame_indx
+        return [bytes(packet) for packet in encoder.encode(video_frame)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tello SDK simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--command-port", type=int, default=TelloSimulator.COMMAND_PORT)
+    parser.add_argument("--state-rate", type=float, default=10)
+    parser.add_argument("--video", choices=["h264", "raw"], default=None)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of packet loss")
+    cli_args = parser.parse_args()
+
+    simulator = TelloSimulator(host=cli_args.host,
+                               command_port=cli_args.command_port,
+                               state_rate_hz=cli_args.state_rate,
+                               video=cli_args.video,
+                               latency=cli_args.latency,
+                               latency_jitter=cli_args.jitter,
+                               packet_loss=cli_args.loss)
+    simulator.start()
+    print(f'Tello simulator listening on {simulator.get_address()}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
@@ -0,0 +1,193 @@
+####################################################################################################################
+# IMPORTS
+import select
+import socket
+import threading
+import time
+import numpy as np
+
+from FramePipeline import FrameRing
+
+
+####################################################################################################################
+# CORE
+class LowLatencyDecoder:
+    """
+        Low-latency video backend: receives the H.264 stream of the Tello on UDP and decodes it
+        with PyAV on the CPU, writing the frames directly in the slots of a FrameRing.
+
+        The stream is not opened with a demuxer, which buffers and probes the stream before
+        returning the first frame: the datagrams are joined in frames by the receiving thread.
+        The Tello splits every frame in datagrams of DATAGRAM_SIZE bytes, so a shorter datagram
+        closes the frame, which is decoded without waiting for the next one.
+
+        All the datagrams already received are read before converting: every frame is decoded,
+        since the following ones refer to it, but only the newest is converted to RGB and published
+        ( the channel order of FrameRing ).
+        The timestamp of a frame is the arrival of its first datagram, so the latency reported
+        is from the network to the frame ready in the ring.
+    """
+
+    # ---> CONSTANTS
+    DATAGRAM_SIZE = 1460
+    RECV_BUFFER = 512 * 1024  # bytes, socket receive buffer
+    DATAGRAM_BUFFER = 65536  # bytes, larger than any UDP datagram
+    MAX_FRAME_SIZE = 1024 * 1024  # bytes, a larger frame means the end of a frame has been lost
+    WAIT_TIMEOUT = 0.1  # seconds
+    LATENCY_SAMPLES = 128
+
+    # Flags of FFmpeg AVCodecContext
+    CODEC_FLAG_LOW_DELAY = 1 << 19
+    CODEC_FLAG2_FAST = 1 << 0
+
+    # ---> CONSTRUCTOR
+    def __init__(self, ring: FrameRing, host: str = "0.0.0.0", port: int = 11111, threads: int = 1):
+        """
+            threads = Threads of the decoder, slice threading is used so no frame is delayed.
+                      0 lets FFmpeg choose
+        """
+        self._ring = ring
+        self._address = (host, port)
+        self._threads = threads
+
+        self._thread = None
+        self._running = False
+
+        self._latencies = np.zeros(self.LATENCY_SAMPLES)
+        self._reset_stats()
+
+    # ---> FUNCTIONS
+    def start(self):
+        if self.is_running():
+            return
+
+        self._running = True
+        self._reset_stats()
+        self._thread = threading.Thread(target=self._run, name="LowLatencyDecoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.is_running():
+            return
+
+        self._running = False
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_stats(self) -> dict:
+        """
+            Returns the statistics of the decoder
+                decoded = Frames decoded
+                published = Frames converted and published in the ring
+                skipped = Frames decoded but not published, because a newer one was already received
+                errors = Frames that could not be decoded ( e.g. before the first key frame )
+                latency_*_ms = Time from the first datagram of a frame to the frame in the ring
+        """
+        count = min(self._published, self.LATENCY_SAMPLES)
+        latencies = self._latencies[:count] * 1000
+
+        return {
+            "decoded": self._decoded,
+            "published": self._published,
+            "skipped": self._skipped,
+            "errors": self._errors,
+            "latency_last_ms": self._latency_last * 1000,
+            "latency_avg_ms": float(latencies.mean()) if count else 0.0,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if count else 0.0,
+            "latency_max_ms": float(latencies.max()) if count else 0.0,
+        }
+
+    def _reset_stats(self):
+        self._decoded = 0
+        self._published = 0
+        self._skipped = 0
+        self._errors = 0
+        self._latency_last = 0.0
+
+    def _create_codec(self):
+        import av  # Optional dependency, only needed by this backend
+
+        codec = av.CodecContext.create("h264", "r")
+        codec.thread_type = "SLICE"
+        codec.thread_count = self._threads
+        codec.flags |= self.CODEC_FLAG_LOW_DELAY
+        codec.flags2 |= self.CODEC_FLAG2_FAST
+        return codec
+
+    def _run(self):
+        import av
+
+        codec = self._create_codec()
+        reformatter = av.video.reformatter.VideoReformatter()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECV_BUFFER)
+        sock.bind(self._address)
+        sock.setblocking(False)
+
+        datagram = bytearray(self.DATAGRAM_BUFFER)
+        datagram_view = memoryview(datagram)
+        frame_data = bytearray()
+        frame_start = 0.0
+
+        try:
+            while self._running:
+                readable, _, _ = select.select([sock], [], [], self.WAIT_TIMEOUT)
+                if not readable:
+                    continue
+
+                # Every datagram already received is read, only the last frame decoded is published
+                latest = None
+                latest_start = 0.0
+                while True:
+                    try:
+                        size = sock.recv_into(datagram)
+                    except BlockingIOError:
+                        break
+
+                    if not frame_data:
+                        frame_start = time.monotonic()
+                    frame_data += datagram_view[:size]
+
+                    if size < self.DATAGRAM_SIZE or len(frame_data) > self.MAX_FRAME_SIZE:
+                        for frame in self._decode(codec, av.Packet(bytes(frame_data))):
+                            if latest is not None:
+                                self._skipped += 1
+                            latest = frame
+                            latest_start = frame_start
+                        frame_data.clear()
+
+                if latest is not None:
+                    self._publish(reformatter.reformat(latest, format="rgb24"), latest_start)
+        finally:
+            sock.close()
+
+    def _decode(self, codec, packet) -> list:
+        import av
+
+        try:
+            frames = codec.decode(packet)
+        except av.error.FFmpegError:
+            self._errors += 1
+            return []
+
+        self._decoded += len(frames)
+        return frames
+
+    def _publish(self, rgb_frame, frame_start: float):
+        # The plane rows can be padded: only the pixels are copied in the slot of the ring
+        height, width = rgb_frame.height, rgb_frame.width
+        plane = rgb_frame.planes[0]
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(height, plane.line_size)
+
+        slot = self._ring.acquire((height, width, 3), np.uint8)
+        np.copyto(slot, rows[:, :width * 3].reshape(height, width, 3))
+        self._ring.commit(frame_start)
+
+        latency = time.monotonic() - frame_start
+        self._latencies[self._published % self.LATENCY_SAMPLES] = latency
+        self._latency_last = latency
+        self._published += 1
@@ -0,0 +1,10 @@
+####################################################################################################################
+# IMPORTS
+import os
+import sys
+
+
+# The modules of MK2 import each other by name, and the project root holds the submodules
+MK2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MK2_DIR)
+sys.path.insert(1, os.path.dirname(MK2_DIR))
@@ -0,0 +1,28 @@
+####################################################################################################################
+# IMPORTS
+import numpy as np
+
+from CaptureWriter import CaptureWriter
+from FramePipeline import FrameView
+
+
+####################################################################################################################
+# TESTS
+def make_frame(seq: int) -> FrameView:
+    return FrameView(seq, 0.0, np.zeros((4, 4, 3), dtype=np.uint8))
+
+
+def test_dropped_frame_can_be_submitted_again(tmp_path):
+    # Workers not started: the queue of one frame stays full
+    writer = CaptureWriter(out_dir=tmp_path, img_format="npy", queue_size=1)
+
+    assert writer.submit(make_frame(1))
+    assert not writer.submit(make_frame(1))
+    assert not writer.submit(make_frame(2))
+
+    writer.start()
+    writer.stop()
+    assert writer.submit(make_frame(2))
+
+    stats = writer.get_stats()
+    assert (stats["dropped"], stats["duplicates"]) == (1, 1)
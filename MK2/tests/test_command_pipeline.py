@@ -0,0 +1,41 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+
+from CommandPipeline import AckQueue, CommandPipeline, CommandStep
+
+
+####################################################################################################################
+# TESTS
+def test_step_does_not_take_the_ack_of_an_interrupting_command():
+    acks = AckQueue()
+    sent = []
+
+    def send(command, timeout):
+        acks.wait_quiet()
+        sent.append(command)
+        response = acks.wait_pop(timeout)
+        if response is None or response is AckQueue.INTERRUPTED:
+            return "error"
+        return response.decode()
+
+    def emergency_stop():
+        # The stop is sent while the go is waiting for its response, and the drone answers the stop first
+        time.sleep(0.05)
+        pipeline.cancel()
+        acks.interrupt(0.1)
+        acks.append(b"ok")
+
+    pipeline = CommandPipeline(send)
+    threading.Thread(target=emergency_stop).start()
+    result = pipeline.run([CommandStep("go 100 0 0 50", timeout=1.0, retries=2)], "go")
+
+    assert not result.ok
+    assert sent == ["go 100 0 0 50"]  # not sent again after the cancel
+
+    # The responses of the interrupted commands are not taken by the next command
+    acks.append(b"error")
+    threading.Timer(0.15, acks.append, (b"ok",)).start()
+    assert pipeline.run([CommandStep("command", timeout=1.0)], "next").ok
+    assert acks == []
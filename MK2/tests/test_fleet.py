@@ -0,0 +1,77 @@
+####################################################################################################################
+# IMPORTS
+import time
+import pytest
+
+from djitellopy import tello
+from FlightRecorder import FlightRecorder
+from TelloFleet import TelloFleet
+from TelloSimulator import TelloSimulator
+
+
+####################################################################################################################
+# FIXTURES
+@pytest.fixture
+def simulators():
+    simulators = [TelloSimulator(host=host, command_port=9889, state_rate_hz=20) for host in ("127.0.0.2", "127.0.0.3")]
+    for simulator in simulators:
+        simulator.start()
+    try:
+        yield simulators
+    finally:
+        for simulator in simulators:
+            simulator.stop()
+
+
+@pytest.fixture
+def fleet(tmp_path):
+    fleet = TelloFleet()
+    try:
+        yield fleet
+    finally:
+        fleet.end()
+
+
+def add_drones(fleet: TelloFleet, simulators: list[TelloSimulator], record_dir: str):
+    for simulator in simulators:
+        drone = fleet.add_drone(*simulator.get_address())
+        drone.set_flight_recorder(FlightRecorder(out_dir=record_dir))
+
+
+####################################################################################################################
+# TESTS
+def test_fleet_flies_two_simulators(simulators, fleet, tmp_path):
+    add_drones(fleet, simulators, str(tmp_path))
+
+    assert len(fleet.connect()) == 2
+    assert all(response == "ok" for response in fleet.takeoff().values())
+    assert all(simulator.is_flying for simulator in simulators)
+
+    # Opposite setpoints on the left_right axis, sent together in the bursts
+    first, second = fleet.get_names()
+    fleet.set_rc_all({first: (40, 0, 0, 0), second: (-40, 0, 0, 0)})
+    time.sleep(0.5)
+    fleet.hover()
+
+    assert simulators[0].position[0] > 5
+    assert simulators[1].position[0] < -5
+    assert all(response.strip().isdigit() for response in fleet.broadcast_command("battery?").values())
+
+    fleet.land()
+    assert not any(simulator.is_flying for simulator in simulators)
+    assert fleet.get_rc_stats()["loop_errors"] == 0
+
+
+def test_fleet_keeps_serving_with_a_drone_off(simulators, fleet, tmp_path):
+    # No simulator on 127.0.0.5: its commands expire, the other drones are still served
+    add_drones(fleet, simulators[:1], str(tmp_path))
+    fleet.add_drone("127.0.0.5", 9889, name="off")
+    fleet.start()
+
+    with pytest.raises(tello.TelloException):
+        fleet.send_command("off", "command", timeout=0.2, retries=1).result()
+
+    assert fleet.send_command(fleet.get_names()[0], "command").result(timeout=2) == "ok"
+    assert fleet.is_running()
+    assert fleet.get_command_stats("off")["timeouts"] == 1
+    assert fleet.get_rc_stats()["loop_errors"] == 0
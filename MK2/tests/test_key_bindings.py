@@ -0,0 +1,41 @@
+####################################################################################################################
+# IMPORTS
+import json
+from pathlib import Path
+
+import pygame
+
+from KeyBindings import KeyBindings
+
+
+####################################################################################################################
+# TESTS
+KB_MAP = Path(__file__).resolve().parents[2] / "res" / "kb_map.json"
+
+
+class Keys:
+    """
+        Key states as returned by pygame.key.get_pressed()
+    """
+
+    def __init__(self, *pressed: int):
+        self._pressed = set(pressed)
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self._pressed
+
+
+def test_keypress_between_two_ticks_is_fired_once():
+    bindings = KeyBindings(json.loads(KB_MAP.read_text())["kb_map"])
+    key = pygame.K_t  # "takeoff" of kb_map.json
+
+    # Pressed and released between two ticks of the commands: the input is sampled 3 times
+    bindings.update(Keys(key))
+    bindings.update(Keys(key))
+    bindings.update(Keys())
+    assert bindings.is_fired("takeoff")
+    assert not bindings.is_held("takeoff")
+
+    bindings.clear_fired()
+    bindings.update(Keys())
+    assert not bindings.is_fired("takeoff")
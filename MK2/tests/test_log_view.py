@@ -0,0 +1,52 @@
+####################################################################################################################
+# IMPORTS
+from LogBuffer import LogBuffer
+from LogView import LogView
+
+
+####################################################################################################################
+# TESTS
+class FakeText:
+    """
+        Text widget keeping the inserted lines
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def tag_configure(self, tag, **options):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, *args):
+        # Pairs of ( text, tag )
+        self.lines.extend((text, tag) for text, tag in zip(args[::2], args[1::2]))
+
+    def delete(self, first, last):
+        del self.lines[:int(last.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+def test_refresh_inserts_only_new_entries_and_keeps_max_lines():
+    log_buffer = LogBuffer()
+    text = FakeText()
+    log_view = LogView(text, max_lines=3)
+
+    log_buffer.append(20, "first")
+    log_buffer.append(40, "second")
+    assert log_view.refresh(log_buffer) == 2
+    assert log_view.refresh(log_buffer) == 0
+    assert [tag for _, tag in text.lines] == ["INFO", "ERROR"]
+
+    for indx in range(3):
+        log_buffer.append(5, f'entry {indx}')
+    assert log_view.refresh(log_buffer) == 3
+
+    # Level 5 has no color: the lines are inserted without a tag
+    assert len(text.lines) == 3
+    assert [tag for _, tag in text.lines] == [(), (), ()]
+    assert text.lines[-1][0].endswith("entry 2\n")
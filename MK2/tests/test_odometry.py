@@ -0,0 +1,49 @@
+####################################################################################################################
+# IMPORTS
+import time
+import pytest
+
+from Odometry import Odometry
+from TelloSimulator import TelloSimulator
+
+
+####################################################################################################################
+# TESTS
+def test_full_batches_are_integrated_without_calling_integrate():
+    odometry = Odometry()
+
+    # Forward only, without state packets the setpoints are integrated
+    for _ in range(3 * Odometry.BATCH_SIZE + 10):
+        odometry.add_setpoint(0, 100, 0, 0)
+
+    x, y, _, _ = odometry.get_pose()
+    assert y > 0
+    assert odometry.get_dropped() == 0
+
+    # The samples of the partial batch are still integrated by integrate()
+    odometry.integrate()
+    assert odometry.get_pose()[1] > y
+
+
+def test_state_velocities_are_forward_and_left():
+    odometry = Odometry()
+
+    # 1 m/s forward ( vgx ) and 0.5 m/s left ( vgy ) for 0.1 s: the map has x right and y forward
+    for _ in range(3):
+        odometry.add_state({"vgx": 10, "vgy": 5, "vgz": 0, "yaw": 0, "tof": 50})
+        odometry.integrate()
+        time.sleep(0.05)
+
+    x, y, _, _ = odometry.get_pose()
+    assert y > 0
+    assert x == pytest.approx(-y / 2)
+
+
+def test_simulator_state_packet_uses_the_axes_of_the_tello():
+    simulator = TelloSimulator()
+    simulator.handle_command("takeoff")
+    simulator.handle_command("rc 20 50 0 0")  # right and forward
+
+    state = dict(field.split(":") for field in simulator.get_state_packet().strip().strip(";").split(";"))
+    assert int(state["vgx"]) > 0  # forward
+    assert int(state["vgy"]) < 0  # right is a negative left
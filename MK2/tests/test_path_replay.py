@@ -0,0 +1,48 @@
+####################################################################################################################
+# IMPORTS
+import pytest
+
+from MovementLog import MovementLog
+from PathReplay import ReplayPlan
+
+
+####################################################################################################################
+# TESTS
+@pytest.fixture
+def movement_log():
+    # 3 ticks forward, 2 ticks left, 1 tick up, at 0.1 s per tick
+    log = MovementLog()
+    timestamp = 0.0
+    for setpoint in [(0, 30, 0, 0)] * 3 + [(-20, 0, 0, 0)] * 2 + [(0, 0, 10, 0)]:
+        log.append(*setpoint, timestamp=timestamp)
+        timestamp += 0.1
+    return log
+
+
+def test_plan_follows_the_runs_of_the_log(movement_log):
+    plan = ReplayPlan.from_log(movement_log)
+
+    steps = [plan.get_step(step) for step in range(len(plan))]
+    assert [setpoint for setpoint, _ in steps] == [(0, 30, 0, 0), (-20, 0, 0, 0), (0, 0, 10, 0)]
+    assert [duration for _, duration in steps] == pytest.approx([0.3, 0.2, 0.1])
+
+
+def test_reversed_plan_flies_back_with_the_axes_inverted(movement_log):
+    plan = ReplayPlan.from_log(movement_log, reverse=True)
+
+    steps = [plan.get_step(step) for step in range(len(plan))]
+    assert [setpoint for setpoint, _ in steps] == [(0, 0, -10, 0), (20, 0, 0, 0), (0, -30, 0, 0)]
+    assert [duration for _, duration in steps] == pytest.approx([0.1, 0.2, 0.3])
+    assert plan.get_duration() == pytest.approx(0.6)
+
+
+def test_aborted_return_home_keeps_the_runs_not_flown_back(movement_log):
+    # A return home aborted during its second step has flown back only the newest run
+    plan = ReplayPlan.from_log(movement_log, reverse=True)
+    assert len(plan) == len(movement_log)
+
+    movement_log.drop_newest(2 - 1)
+
+    plan = ReplayPlan.from_log(movement_log, reverse=True)
+    assert [plan.get_step(step)[0] for step in range(len(plan))] == [(20, 0, 0, 0), (0, -30, 0, 0)]
+    assert movement_log.get_ticks() == 5
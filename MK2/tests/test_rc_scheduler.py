@@ -0,0 +1,56 @@
+####################################################################################################################
+# IMPORTS
+import threading
+import time
+
+from EmergencyStop import EmergencyStop
+from RCScheduler import RCScheduler
+
+
+####################################################################################################################
+# TESTS
+def test_send_errors_are_counted_and_the_scheduler_keeps_ticking():
+    sent = []
+    logged = []
+
+    def send(*setpoint):
+        # The first sends fail, as a sendto while the WiFi is down
+        if send.failures < 3:
+            send.failures += 1
+            raise OSError("Network is unreachable")
+        sent.append(setpoint)
+    send.failures = 0
+
+    scheduler = RCScheduler(send, rate_hz=200, log_fn=lambda level, msg: logged.append(msg))
+    scheduler.start()
+    scheduler.set_setpoint(10, 0, 0, 0)
+    time.sleep(0.1)
+    scheduler.stop()
+
+    stats = scheduler.get_stats()
+    assert stats["send_errors"] == 3
+    assert stats["sent"] == len(sent) > 0
+    assert len(logged) == 2  # the outage and the recovery
+
+
+def test_stop_triggered_during_set_setpoint_is_not_overwritten():
+    class RacingStop(EmergencyStop):
+        """
+            The stop is triggered by another thread right after set_setpoint has checked it
+        """
+
+        def is_triggered(self) -> bool:
+            triggered = super().is_triggered()
+            if not triggered:
+                trigger_thread = threading.Thread(target=self.trigger, args=("race",))
+                trigger_thread.start()
+                trigger_thread.join(0.1)
+            return triggered
+
+    emergency_stop = RacingStop()
+    scheduler = RCScheduler(lambda *setpoint: None, emergency_stop=emergency_stop)
+    scheduler.set_setpoint(50, 0, 0, 0)
+    time.sleep(0.2)
+
+    assert emergency_stop.is_triggered()
+    assert scheduler.get_setpoint() == RCScheduler.ZERO_SETPOINT
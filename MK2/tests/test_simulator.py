@@ -0,0 +1,106 @@
+####################################################################################################################
+# IMPORTS
+import socket
+import time
+import numpy as np
+import pytest
+
+from FlightRecorder import FlightRecorder
+from Mission import Mission
+from TelloMK2 import TelloMK2
+from TelloSimulator import TelloSimulator
+
+
+####################################################################################################################
+# FIXTURES
+@pytest.fixture
+def flying_tello(tmp_path):
+    simulator = TelloSimulator(host="127.0.0.4", command_port=9889, state_rate_hz=20)
+    simulator.start()
+
+    drone = TelloMK2(host="127.0.0.4", command_port=9889)
+    drone.set_flight_recorder(FlightRecorder(out_dir=str(tmp_path)))
+    drone.initialize()
+    drone.takeoff()
+    try:
+        yield drone, simulator
+    finally:
+        drone.land()
+        drone.end()
+        simulator.stop()
+
+
+####################################################################################################################
+# TESTS
+def test_go_mission_reaches_last_waypoint(flying_tello):
+    # Waypoints in the map frame of Odometry: x right, y forward. The go commands carry y as left
+    drone, simulator = flying_tello
+    mission = Mission({"name": "go_right", "mode": "go", "waypoints": [{"x": 50, "y": 100, "z": 30}]})
+    start = simulator.position.copy()
+
+    result = drone.run_commands(mission.compile_commands(), mission.name)
+
+    assert result.ok
+    np.testing.assert_allclose(simulator.position - start, (50, 100, 30), atol=1)
+
+
+def test_go_mission_with_turn_flies_in_the_map_frame(flying_tello):
+    drone, simulator = flying_tello
+    mission = Mission({"name": "go_turn", "mode": "go",
+                       "waypoints": [{"x": 0, "y": 60}, {"yaw": 90}, {"x": 40, "y": 20}]})
+    start = simulator.position.copy()
+
+    result = drone.run_commands(mission.compile_commands(), mission.name)
+
+    assert result.ok
+    assert simulator.yaw == pytest.approx(90)
+    np.testing.assert_allclose(simulator.position - start, (40, 20, 0), atol=1)
+
+
+def test_battery_stop_is_kept_until_a_new_connection(tmp_path):
+    simulator = TelloSimulator(host="127.0.0.6", command_port=9889, state_rate_hz=20)
+    simulator.start()
+    drone = TelloMK2(host="127.0.0.6", command_port=9889)
+    drone.set_flight_recorder(FlightRecorder(out_dir=str(tmp_path)))
+    try:
+        drone.initialize()
+        drone.takeoff()
+
+        # A stop of the pilot is released
+        drone.emergency_stop("test")
+        assert drone.clear_emergency_stop()
+
+        # The emergency landing for the battery stops the drone and lands it
+        simulator.battery = 5
+        deadline = time.monotonic() + 5
+        while simulator.is_flying and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert not simulator.is_flying
+        assert drone.get_emergency_stop().get_reason() == TelloMK2.BATTERY_STOP_REASON
+        assert not drone.clear_emergency_stop()
+        assert drone.is_emergency_stopped()
+    finally:
+        drone.end()
+        simulator.stop()
+
+
+def test_malformed_commands_get_error_and_the_simulator_keeps_answering():
+    simulator = TelloSimulator(host="127.0.0.7", command_port=9889)
+    simulator.start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(2)
+    try:
+        responses = {}
+        # rc setpoints are parsed only while flying
+        for command in ("command", "takeoff", "speed abc", "rc 1 2 x 4", "forward 1.5", "battery?"):
+            sock.sendto(command.encode("utf-8"), simulator.get_address())
+            responses[command] = sock.recvfrom(1024)[0].decode("utf-8")
+
+        # The battery drains while flying
+        assert responses.pop("battery?").isdigit()
+        assert responses == {"command": "ok", "takeoff": "ok", "speed abc": "error", "rc 1 2 x 4": "error",
+                             "forward 1.5": "error"}
+    finally:
+        sock.close()
+        simulator.stop()
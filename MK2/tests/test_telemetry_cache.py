@@ -0,0 +1,36 @@
+####################################################################################################################
+# IMPORTS
+from TelemetryCache import TelemetryCache
+
+
+####################################################################################################################
+# TESTS
+def test_failing_callback_does_not_stop_the_others():
+    logged = []
+    received = []
+    telemetry = TelemetryCache(battery_crit=10, battery_warn=20, log_fn=lambda level, msg: logged.append(msg))
+
+    def failing(state):
+        raise ValueError("broken")
+
+    telemetry.on_update(failing)
+    telemetry.on_update(received.append)
+    telemetry.update({"bat": 80})
+    telemetry.update({"bat": 79})
+
+    assert [state["bat"] for state in received] == [80, 79]
+    assert telemetry.get_callback_errors() == 2
+    assert len(logged) == 2
+
+
+def test_battery_alarms_fire_again_after_reset():
+    fired = []
+    telemetry = TelemetryCache(battery_crit=10, battery_warn=20)
+    telemetry.on_battery_critical(fired.append)
+
+    telemetry.update({"bat": 5})
+    telemetry.update({"bat": 5})
+    telemetry.reset_battery_alarms()
+    telemetry.update({"bat": 5})
+
+    assert fired == [5, 5]